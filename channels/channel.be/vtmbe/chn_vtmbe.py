@@ -698,14 +698,10 @@ class Channel(chn_class.Channel):
         json = JsonHelper(data)
         json_items = json.get_value("response", "items")
         count = json.get_value("response", "total")
-        for i in range(100, count, 100):
-            url = "%s&from=%s" % (self.mainListUri, i)
-            Logger.debug("Retrieving more items from: %s", url)
-            more_data = UriHandler.open(url)
-            more_json = JsonHelper(more_data)
-            more_items = more_json.get_value("response", "items")
-            if more_items:
-                json_items += more_items
+        urls = ["%s&from=%s" % (self.mainListUri, i) for i in range(100, count, 100)]
+        Logger.debug("Retrieving more items from %s pages", len(urls))
+        json_items += self._fetch_pages(
+            urls, lambda d: JsonHelper(d).get_value("response", "items"), show_progress=False)
 
         Logger.debug("Added: %s extra items", len(json_items))
         return json, items
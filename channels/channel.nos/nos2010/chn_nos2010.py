@@ -652,7 +652,7 @@ class Channel(chn_class.Channel):
             item.description = image_data.get("description")
         return item
 
-    def create_api_page_layout(self, result_set: dict) -> Optional[MediaItem]:
+    def create_api_page_layout(self, result_set: dict) -> Optional[chn_class.DeferredItem]:
         if "guid" in result_set:
             guid = result_set["guid"]
         else:
@@ -661,11 +661,6 @@ class Channel(chn_class.Channel):
         include_premium = 'false' if AddonSettings.hide_premium_items() else 'true'
         url = (f"https://npo.nl/start/api/domain/page-collection?collectionType={page_type}"
                f"&collectionId={guid}&partyId=1&layoutType=PAGE&includePremiumContent={include_premium}")
-        info = UriHandler.open(url)
-        info = JsonHelper(info)
-        title = info.get_value("title")
-        if not title or title.strip() == "" and "layoutId=programmas" in self.parentItem.url:
-            title = LanguageHelper.get_localized_string(LanguageHelper.Categories)
 
         if page_type == "SERIES":
             content_type = contenttype.TVSHOWS
@@ -677,7 +672,17 @@ class Channel(chn_class.Channel):
             Logger.error(f"Missing for page type: {page_type}")
             return None
 
-        item = FolderItem(title, url, content_type=content_type)
+        # The title is in the collection itself, fetch them all at once after all items are created.
+        item = FolderItem("", url, content_type=content_type)
+        return chn_class.DeferredItem(item, url, self.__set_page_layout_title)
+
+    def __set_page_layout_title(self, item: MediaItem, data: str) -> MediaItem:
+        info = JsonHelper(data)
+        title = info.get_value("title")
+        if not title or title.strip() == "" and "layoutId=programmas" in self.parentItem.url:
+            title = LanguageHelper.get_localized_string(LanguageHelper.Categories)
+
+        item.name = title.strip()
         return item
 
     def create_api_season_item(self, result_set: dict) -> Optional[MediaItem]:
@@ -846,9 +851,10 @@ class Channel(chn_class.Channel):
         date = self.parentItem.metaData["date"]
 
         epg_data = None
-        for guid, title in channels.items():
-
-            data = JsonHelper(UriHandler.open(f"https://npo.nl/start/api/domain/guide-channel?guid={guid}&date={date}"))
+        urls = [f"https://npo.nl/start/api/domain/guide-channel?guid={guid}&date={date}" for guid in channels]
+        results = UriHandler.open_many(urls, max_workers=8)
+        for title, result in zip(channels.values(), results):
+            data = JsonHelper(result.data)
             for item in data.json:
                 item["channel"] = title
             if not epg_data:
@@ -1326,7 +1332,7 @@ class Channel(chn_class.Channel):
         :return: Formatted stations
         :rtype: list
         """
-        channel_data = JsonHelper(UriHandler.open(f"https://npo.nl/start/api/domain/guide-channels"))
+        channel_data = self.__get_guide_channels()
         parent_item = MediaItem("Live", "https://www.npostart.nl/live", media_type=mediatype.FOLDER)
         items = []
         iptv_streams = []
@@ -1370,21 +1376,25 @@ class Channel(chn_class.Channel):
         :rtype: dict
         """
 
-        channel_data = JsonHelper(UriHandler.open(f"https://npo.nl/start/api/domain/guide-channels"))
+        channel_data = self.__get_guide_channels()
         parent = MediaItem("EPG", "https://start-api.npo.nl/epg/", media_type=mediatype.FOLDER)
         iptv_epg = dict()
         media_items = []
 
+        # Fetch 3 days in the past and in the future for all channels at once.
+        start = datetime.datetime.now() - datetime.timedelta(days=3)
+        dates = [(start + datetime.timedelta(i)).strftime("%d-%m-%Y") for i in range(0, 6, 1)]
+        guide_urls = [
+            f"https://npo.nl/start/api/domain/guide-channel?guid={livestream['guid']}&date={date}"
+            for livestream in channel_data.json for date in dates
+        ]
+        guide_results = iter(UriHandler.open_many(guide_urls, max_workers=8))
+
         for livestream in channel_data.json:
             iptv_epg[livestream["guid"]] = []
 
-            # Fetch 3 days in the past and in the future
-            start = datetime.datetime.now() - datetime.timedelta(days=3)
-            for i in range(0, 6, 1):
-                air_date = start + datetime.timedelta(i)
-                date = air_date.strftime("%d-%m-%Y")
-                guid = livestream["guid"]
-                guide_data = JsonHelper(UriHandler.open(f"https://npo.nl/start/api/domain/guide-channel?guid={guid}&date={date}"))
+            for _ in dates:
+                guide_data = JsonHelper(next(guide_results).data)
 
                 for item in guide_data.json:
                     item["channel"] = livestream["title"]
@@ -1415,6 +1425,17 @@ class Channel(chn_class.Channel):
         parameter_parser.pickler.store_media_items(parent.guid, parent, media_items)
         return iptv_epg
 
+    def __get_guide_channels(self) -> JsonHelper:
+        """ Retrieves the live channels. They rarely change and IPTV Manager requests them for
+        both the streams and the EPG, so an expired cached copy is used while it is refreshed in
+        the background.
+
+        :return: The live channels.
+
+        """
+
+        return JsonHelper(UriHandler.open("https://npo.nl/start/api/domain/guide-channels", background_refresh=True))
+
     def __has_premium(self) -> bool:
         if self.__has_premium_cache is None:
             if not self.loggedOn:
@@ -18,12 +18,11 @@ from resources.lib.helpers.jsonhelper import JsonHelper
 from resources.lib.helpers.htmlentityhelper import HtmlEntityHelper
 from resources.lib.helpers.languagehelper import LanguageHelper
 from resources.lib.logger import Logger
-from resources.lib.retroconfig import Config
 from resources.lib.streams.mpd import Mpd
 from resources.lib.webdialogue import WebDialogue
-from resources.lib.xbmcwrapper import XbmcWrapper, XbmcDialogProgressWrapper
+from resources.lib.xbmcwrapper import XbmcWrapper
 from resources.lib.streams.m3u8 import M3u8
-from resources.lib.urihandler import UriHandler
+from resources.lib.urihandler import UriHandler, UriRequest
 from resources.lib.helpers.subtitlehelper import SubtitleHelper
 
 
@@ -221,45 +220,27 @@ class Channel(chn_class.Channel):
     def fetch_mainlist_pages(self, data: str) -> Tuple[str, List[MediaItem]]:
         items = []
         data = JsonHelper(data)
-        page_data = data
-        count = 0
-
-        item_count = page_data.get_value("data", "mediaIndex", "contentList", "pageInfo", "totalCount")
-        number_of_pages = math.ceil(1.0 * item_count / self.__max_page_size)
-
-        # Use a progress bar
-        status = LanguageHelper.get_localized_string(LanguageHelper.FetchMultiApi)
-        updated = LanguageHelper.get_localized_string(LanguageHelper.PageOfPages)
-        progress = XbmcDialogProgressWrapper("{} - {}".format(Config.appName, self.channelName), status)
-
-        try:
-            while count < 25:
-                count += 1
-                if progress.progress_update(count, number_of_pages, int(count * 100 / number_of_pages), False, updated.format(count, number_of_pages)):
-                    break
-
-                next_offset = page_data.get_value("data", "mediaIndex", "contentList", "pageInfo", "nextPageOffset")
-                if not next_offset or next_offset <= 0:
-                    break
-
-                tvshow_url, tvshow_data = self.__get_api_query(
-                    "MediaIndex",
-                    {
-                        "input": {
-                            "letterFilters": list("ABCDEFGHIJKLMNOPQRSTUVWXYZ"),
-                            "limit": self.__max_page_size, "offset": next_offset}
-                    }
-                )
-                new_data = UriHandler.open(
-                    tvshow_url, additional_headers=self.httpHeaders, json=tvshow_data,
-                    force_cache_duration=60 * 60)
-
-                page_data = JsonHelper(new_data)
-                data_items = page_data.get_value(*self.currentParser.Parser)
-                list_items = data.get_value(*self.currentParser.Parser)
-                list_items += data_items
-        finally:
-            progress.close()
+
+        # The total count gives all the page offsets up front, so fetch them concurrently.
+        item_count = data.get_value("data", "mediaIndex", "contentList", "pageInfo", "totalCount")
+        number_of_pages = min(math.ceil(1.0 * item_count / self.__max_page_size), 26)
+        page_requests = []
+        for page in range(1, number_of_pages):
+            tvshow_url, tvshow_data = self.__get_api_query(
+                "MediaIndex",
+                {
+                    "input": {
+                        "letterFilters": list("ABCDEFGHIJKLMNOPQRSTUVWXYZ"),
+                        "limit": self.__max_page_size, "offset": page * self.__max_page_size}
+                }
+            )
+            page_requests.append(UriRequest(
+                tvshow_url, additional_headers=self.httpHeaders, json=tvshow_data,
+                force_cache_duration=60 * 60))
+
+        parser = self.currentParser.Parser
+        list_items = data.get_value(*parser)
+        list_items += self._fetch_pages(page_requests, lambda d: JsonHelper(d).get_value(*parser))
 
         Logger.debug("Pre-Processing finished")
         return data, items
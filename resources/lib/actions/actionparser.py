@@ -92,7 +92,7 @@ class ActionParser(object):
                 and self.pickler.is_pickle_store_id(self.params[keyword.PICKLE]):
             Logger.debug("Replacing PickleStore pickle '%s' with full pickle", self.params[keyword.PICKLE])
             self.params[keyword.STORE_ID] = self.params[keyword.PICKLE]
-            self.params[keyword.PICKLE] = self.pickler.pickle_media_item(self.media_item)
+            self.params[keyword.PICKLE] = self.pickler.pickle_media_item(self.media_item, use_dictionary=True)
         elif keyword.PICKLE in self.params:
             self.params[keyword.STORE_ID] = self.params[keyword.PICKLE]
 
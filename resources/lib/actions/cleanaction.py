@@ -39,6 +39,7 @@ class CleanAction(AddonAction):
         Logger.info("Cleaning: Cache objects in cache folder")
         env_ctrl = EnvController(Logger.instance())
         env_ctrl.cache_clean_up(Config.cacheDir, 0)
+        UriHandler.clean_up_cache(0)
 
     def __init__(self, parameter_parser):
         """ Cleans the cache and cookies
@@ -128,9 +128,6 @@ class FolderAction(AddonAction):
             ok = ok and xbmcplugin.addDirectoryItems(self.handle, kodi_items, len(kodi_items))
             watcher.lap("items send to Kodi")
 
-            if ok and parent_guid is not None:
-                self.parameter_parser.pickler.store_media_items(parent_guid, selected_item, media_items)
-
             watcher.stop()
 
             self.__add_sort_method_to_handle(self.handle, media_items)
@@ -139,6 +136,10 @@ class FolderAction(AddonAction):
 
             cache_to_disk = selected_item.cacheToDisc if selected_item else True
             xbmcplugin.endOfDirectory(self.handle, ok, cacheToDisc=cache_to_disk)
+
+            # Store the items after Kodi was told the listing is complete.
+            if ok and parent_guid is not None:
+                self.parameter_parser.pickler.defer_store_media_items(parent_guid, selected_item, media_items)
         except Exception:
             Logger.error("Plugin::Error Processing FolderList", exc_info=True)
             XbmcWrapper.show_notification(
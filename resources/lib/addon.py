@@ -49,7 +49,8 @@ def run_addon():
         ignore_ssl_errors = AddonSettings.ignore_ssl_errors()
         UriHandler.create_uri_handler(cache_dir=cache_dir,
                                       cookie_jar=os.path.join(Config.profileDir, "cookiejar.dat"),
-                                      ignore_ssl_errors=ignore_ssl_errors)
+                                      ignore_ssl_errors=ignore_ssl_errors,
+                                      cache_backend="sqlite")
 
         # start texture handler
         TextureHandler.set_texture_handler(Config, Logger.instance(), UriHandler.instance())
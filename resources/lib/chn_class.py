@@ -5,6 +5,7 @@ from typing import Tuple
 
 from typing import Callable
 import urllib.parse as parse
+from collections import namedtuple
 from typing import Optional, List, Union
 
 from resources.lib.actions import keyword, action
@@ -12,11 +13,12 @@ from resources.lib.mediaitem import MediaItem, FolderItem, MediaStream
 from resources.lib import contenttype
 from resources.lib import mediatype
 from resources.lib.regexer import Regexer
-from resources.lib.xbmcwrapper import XbmcWrapper
+from resources.lib.xbmcwrapper import XbmcWrapper, XbmcDialogProgressWrapper
 from resources.lib.retroconfig import Config
 from resources.lib.logger import Logger
-from resources.lib.urihandler import UriHandler
+from resources.lib.urihandler import UriHandler, UriRequest
 from resources.lib.parserdata import ParserData
+from resources.lib.parserindex import ParserIndex
 from resources.lib.textures import TextureHandler
 
 from resources.lib.helpers.htmlentityhelper import HtmlEntityHelper
@@ -30,7 +32,13 @@ Preprocessor = Union[
     Callable[[str], PreProcessorResult],
     Callable[[JsonHelper], PreProcessorResult]
 ]
-CreatorResult = Union[MediaItem, FolderItem, None, Union[List[MediaItem], List[FolderItem]]]
+# A MediaItem that a Creator returns together with the request (an UriRequest or url) that is
+# needed to complete it. The requests of all DeferredItems of a DataParser are done concurrently
+# after its Creator was called for all results. Then `enrich(item, data)` is called with the data
+# of the response, and it returns the completed item, or None to remove the item.
+DeferredItem = namedtuple("DeferredItem", ["item", "request", "enrich"])
+
+CreatorResult = Union[MediaItem, FolderItem, DeferredItem, None, Union[List[MediaItem], List[FolderItem]]]
 Creator = Union[
     Callable[[List[str]], CreatorResult],
     Callable[[Dict], CreatorResult]
@@ -113,6 +121,7 @@ class Channel:
         # self.dataHandlers = dict()
         # self.updateHandlers = dict()
         self.dataParsers = dict()
+        self.__parser_index = None      # : the dispatch index for the dataParsers
 
         self.episodeItemRegex = ''      # : used for the ParseMainList
         self.episodeItemJson = None     # : used for the ParseMainList
@@ -327,45 +336,34 @@ class Channel:
                         handler_json = JsonHelper(handler_data, Logger.instance())
 
                 Logger.trace(data_parser.Parser)
-                parser_results = handler_json.json
-                for parser in data_parser.Parser:
-                    # Find the right elements
-                    if isinstance(parser, tuple):
-                        # We need to match a key in a list of objects.
-                        key, value, index = parser
-                        parser_results = [p for p in parser_results if p.get(key) == value]
-                        if not parser_results:
-                            parser_results = []
-                            break
-                        if index is not None:
-                            parser_results = parser_results[index]
-
-                    elif isinstance(parser_results, list):
-                        parser_results = parser_results[parser]
-                    else:
-                        parser_results = parser_results.get(parser)
-
-                    if not parser_results:
-                        parser_results = []
-                        break
-
-                if not isinstance(parser_results, (tuple, list)):
-                    # if there is just one match, return that as a list
-                    parser_results = [parser_results]
+                # The parser path was compiled when the DataParser was added.
+                parser_results = data_parser.JsonParser(handler_json.json)
             else:
                 if isinstance(handler_data, JsonHelper):
                     raise ValueError("Cannot perform Regex Parser on JsonHelper.")
                 else:
-                    parser_results = Regexer.do_regex(data_parser.Parser, handler_data)
+                    # Stream the matches, so the Creator is called while the data is scanned.
+                    parser_results = Regexer.iter_regex(data_parser.Parser, handler_data)
 
-            Logger.debug("[DataParsers] Processing DataParser.Creator for %s items", len(parser_results))
+            Logger.debug("[DataParsers] Processing DataParser.Creator")
+            result_count = 0
+            deferred_items = []
             for parser_result in parser_results:
+                result_count += 1
                 handler_result = data_parser.Creator(parser_result)
                 if handler_result is not None:
                     if isinstance(handler_result, list):
                         items += handler_result
+                    elif isinstance(handler_result, DeferredItem):
+                        # Keep the position, the item is enriched after all results were created.
+                        deferred_items.append((len(items), handler_result))
+                        items.append(handler_result.item)
                     else:
                         items.append(handler_result)
+            Logger.debug("[DataParsers] Processed DataParser.Creator for %s items", result_count)
+
+            if deferred_items:
+                items = self.__enrich_deferred_items(items, deferred_items)
 
             if data_parser.PostProcessor:
                 Logger.debug("[DataParsers] Processing DataParser.PostProcessor")
@@ -391,56 +389,10 @@ class Channel:
             Logger.trace("Post-processing returned %d items", len(items))
         self.currentParser = None
 
-        # Hide premium. First consider a channel setting, otherwise overall.
-        hide_premium = self.filter_premium()
-        hide_premium = AddonSettings.hide_premium_items() if hide_premium is None else hide_premium
-
-        # should we exclude DRM/GEO?
-        hide_geo_locked = AddonSettings.hide_geo_locked_items_for_location(self.language)
-        hide_drm_protected = AddonSettings.hide_drm_items()
-        hide_folders = AddonSettings.hide_restricted_folders()
-        type_to_exclude = []
-        if not hide_folders:
-            type_to_exclude = mediatype.FOLDER_TYPES
-
-        old_count = len(items)
-        if hide_drm_protected:
-            Logger.debug("Hiding DRM items")
-            items = [i for i in items if not i.isDrmProtected or i.media_type in type_to_exclude]
-        if hide_geo_locked:
-            Logger.debug("Hiding GEO Locked items due to GEO region: %s", self.language)
-            items = [i for i in items if not i.isGeoLocked or i.media_type in type_to_exclude]
-        if hide_premium:
-            Logger.debug("Hiding Premium items")
-            items = [i for i in items if not i.isPaid or i.media_type in type_to_exclude]
-
-        # Local import for performance
-        from resources.lib.cloaker import Cloaker
-        cloaker = Cloaker(self, AddonSettings.store(LOCAL), logger=Logger.instance())
-        if not AddonSettings.show_cloaked_items():
-            Logger.debug("Hiding Cloaked items")
-            items = [i for i in items if not cloaker.is_cloaked(i.url)]
-        else:
-            cloaked_items = [i for i in items if cloaker.is_cloaked(i.url)]
-            for c in cloaked_items:
-                c.isCloaked = True
-
+        # Filter and de-duplicate the items in a single pass, keeping the order of the first
+        # occurrence (dicts keep their insertion order).
         items_length = len(items)
-        if items_length != old_count:
-            Logger.info("Hidden %s items due to DRM/GEO/Premium/cloak filter (Hide Folders=%s)",
-                        old_count - items_length, hide_folders)
-
-        # In order to get a better performance in de-duplicating and keeping the sort order
-        # we first need to store the order in a lookup table. Then we use sorted(set()) and
-        # use that lookup table for sorting. Using sorted(set(), items.index) this will be
-        # an O(n) (for the index()) times O(n*log(n)) (for the sorted) = O(n^2*log(n)!.
-        # The dictionary lookup (O(1)) saves us an O(n).
-        # See https://wiki.python.org/moin/TimeComplexity
-        sorted_order = {}
-        for i in range(0, items_length):
-            sorted_order[items[i]] = i
-        items = sorted(set(items), key=sorted_order.get)
-
+        items = list(dict.fromkeys(self.__get_visible_items(items)))
         Logger.trace("Found '%d' items of which '%d' are unique.", items_length, len(items))
 
         # Check for grouping or not
@@ -505,6 +457,56 @@ class Channel:
 
         return items
 
+    def __get_visible_items(self, items: List[MediaItem]):
+        """ Filters out the DRM protected, GEO locked, premium and cloaked items, depending on
+        the settings. The settings are only read once.
+
+        :param items: The items to filter.
+
+        :return: A generator with the items that should be shown.
+        :rtype: Iterator[MediaItem]
+
+        """
+
+        # Hide premium. First consider a channel setting, otherwise overall.
+        hide_premium = self.filter_premium()
+        hide_premium = AddonSettings.hide_premium_items() if hide_premium is None else hide_premium
+
+        # should we exclude DRM/GEO?
+        hide_geo_locked = AddonSettings.hide_geo_locked_items_for_location(self.language)
+        hide_drm_protected = AddonSettings.hide_drm_items()
+        hide_folders = AddonSettings.hide_restricted_folders()
+        type_to_exclude = ()
+        if not hide_folders:
+            type_to_exclude = mediatype.FOLDER_TYPES
+
+        # Local import for performance
+        from resources.lib.cloaker import Cloaker
+        cloaker = Cloaker(self, AddonSettings.store(LOCAL), logger=Logger.instance())
+        show_cloaked = AddonSettings.show_cloaked_items()
+        Logger.debug("Hiding DRM=%s, GEO Locked=%s (GEO region: %s), Premium=%s, Cloaked=%s items",
+                     hide_drm_protected, hide_geo_locked, self.language, hide_premium, not show_cloaked)
+
+        hidden = 0
+        for item in items:
+            if (hide_drm_protected and item.isDrmProtected
+                    or hide_geo_locked and item.isGeoLocked
+                    or hide_premium and item.isPaid) and item.media_type not in type_to_exclude:
+                hidden += 1
+                continue
+
+            if cloaker.is_cloaked(item.url):
+                if not show_cloaked:
+                    hidden += 1
+                    continue
+                item.isCloaked = True
+
+            yield item
+
+        if hidden:
+            Logger.info("Hidden %s items due to DRM/GEO/Premium/cloak filter (Hide Folders=%s)",
+                        hidden, hide_folders)
+
     def process_video_item(self, item):
         """ Process a video item using the required dataparsers
 
@@ -1013,6 +1015,8 @@ class Channel:
         data.Updater = updater
         data.PostProcessor = postprocessor
         data.IsJson = json
+        if json and parser is not None:
+            data.JsonParser = JsonHelper.compile_parser(parser)
         data.MatchType = match_type
         data.LogOnRequired = requires_logon
 
@@ -1020,8 +1024,57 @@ class Channel:
             self.dataParsers[url].append(data)
         else:
             self.dataParsers[url] = [data]
+
+        # The dispatch index needs to include the new DataParser.
+        self.__parser_index = None
         return
 
+    def _fetch_pages(self, page_requests: List[Union[UriRequest, str]],
+                     page_parser: Callable[[str], Optional[list]],
+                     max_workers: int = 4, show_progress: bool = True) -> list:
+        """ Fetches the additional pages of a listing concurrently. Use this when all pages are
+        known up front, for example because the API returns the total number of items.
+
+        The pages are fetched with bounded parallelism and their results are merged in page order.
+        The progress dialog shows the number of fetched pages and cancelling it stops fetching the
+        pages that were not started yet. Pages that failed or were cancelled are skipped.
+
+        :param page_requests:   The requests (or just URLs) for the pages, in page order.
+        :param page_parser:     Returns the results (e.g. a list of JSON objects) from the data
+                                of a page.
+        :param max_workers:     The maximum number of pages to fetch concurrently.
+        :param show_progress:   Show a progress dialog that allows cancelling.
+
+        :return: The results of all fetched pages, in page order.
+
+        """
+
+        if not page_requests:
+            return []
+
+        progress = self.__create_pages_progress() if show_progress else None
+        try:
+            results = UriHandler.open_many(
+                page_requests, max_workers=max_workers,
+                progress=None if progress is None else
+                lambda fetched, total: self.__update_pages_progress(progress, fetched, total))
+        finally:
+            if progress is not None:
+                progress.close()
+
+        page_results = []
+        for page, result in enumerate(results, start=1):
+            if result is None:
+                Logger.debug("Skipping page %s: fetching was cancelled.", page)
+                continue
+            if result.status.error:
+                Logger.warning("Skipping page %s: %s", page, result.status.reason)
+                continue
+            page_results += page_parser(result.data) or []
+
+        Logger.debug("Fetched %s results from %s pages", len(page_results), len(page_requests))
+        return page_results
+
     def _get_setting(self, setting_id, value_for_none=None):
         """ Retrieves channel specific settings. Just to prevent us from importing AddonSettings in all channels.
 
@@ -1066,6 +1119,50 @@ class Channel:
 
         return url
 
+    def __enrich_deferred_items(self, items: List[MediaItem],
+                                deferred_items: List[Tuple[int, DeferredItem]]) -> List[MediaItem]:
+        """ Performs the requests of the DeferredItems concurrently and enriches their items
+        with the responses.
+
+        :param items:           All items, including the items of the DeferredItems.
+        :param deferred_items:  The position in `items` and the DeferredItem.
+
+        :return: The items with the enriched items at their original position.
+
+        """
+
+        Logger.debug("[DataParsers] Fetching data for %s deferred items", len(deferred_items))
+        results = UriHandler.open_many([d.request for _, d in deferred_items], max_workers=8)
+
+        enriched_items = {}
+        for (index, deferred_item), result in zip(deferred_items, results):
+            enriched_items[index] = deferred_item.enrich(deferred_item.item, result.data)
+
+        enriched = []
+        for index, item in enumerate(items):
+            item = enriched_items.get(index, item)
+            if item is not None:
+                enriched.append(item)
+        return enriched
+
+    def __create_pages_progress(self) -> XbmcDialogProgressWrapper:
+        status = LanguageHelper.get_localized_string(LanguageHelper.FetchMultiApi)
+        return XbmcDialogProgressWrapper("{} - {}".format(Config.appName, self.channelName), status)
+
+    def __update_pages_progress(self, progress: XbmcDialogProgressWrapper, page: int, pages: int) -> bool:
+        """ Updates the progress dialog for fetching pages.
+
+        :param progress:    The progress dialog.
+        :param page:        The number of the current page.
+        :param pages:       The total number of pages.
+
+        :return: True if fetching was cancelled.
+
+        """
+
+        updated = LanguageHelper.get_localized_string(LanguageHelper.PageOfPages)
+        return progress.progress_update(page, pages, int(page * 100 / pages), False, updated.format(page, pages))
+
     def __get_data_parsers(self, url: str, parser_label: Optional[str] = None) -> List[ParserData]:
         """ Fetches a list of dataparsers that are valid for this URL. The Parsers and Creators can then
         be used to parse the data from the url. The first match is returned.
@@ -1098,17 +1195,14 @@ class Channel:
             else:
                 Logger.warning("no DataParser was found keyword [%s]. Continuing with other options.", url)
         else:
-            # make sure we sort by keylength and then start with the longest one.
-            keys = sorted(self.dataParsers.keys(), key=len, reverse=True)
-            # watch.lap("DataParsers sorted")
+            # the index finds the longest key that has matching DataParsers.
+            if self.__parser_index is None:
+                self.__parser_index = ParserIndex.get_index(self.dataParsers)
 
-            # filter them in order
-            for key in keys:
-                # for each key we see if we have filtered results
+            key = self.__parser_index.find(url)
+            if key is not None:
                 data_parsers = [d for d in self.dataParsers[key] if d.matches(url)]
-                if data_parsers:
-                    Logger.trace("Found %s direct DataParsers matches", len(data_parsers))
-                    break
+                Logger.trace("Found %s direct DataParsers matches", len(data_parsers))
             # watch.lap("DataParsers filtered")
 
         if not data_parsers:
@@ -0,0 +1,161 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import io
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    # Not available on most Kodi platforms, zlib is used there.
+    zstandard = None
+
+IDENTITY = "identity"
+ZLIB = "zlib"
+ZSTD = "zstd"
+
+# The number of compressed bytes that are read at once.
+CHUNK_SIZE = 64 * 1024
+# Content types that are already compressed and are stored as-is.
+COMPRESSED_CONTENT_TYPES = ("image/", "video/", "audio/", "application/zip")
+
+_compressors = {
+    ZLIB: lambda: zlib.compressobj(1),
+}
+_decompressors = {
+    ZLIB: lambda: zlib.decompressobj(),
+}
+if zstandard is not None:
+    _compressors[ZSTD] = lambda: zstandard.ZstdCompressor(level=3).compressobj()
+    _decompressors[ZSTD] = lambda: zstandard.ZstdDecompressor().decompressobj()
+
+# The codec to use for new cache entries: zstd if it is available, zlib otherwise.
+DEFAULT_CODEC = ZSTD if zstandard is not None else ZLIB
+
+
+def get_codecs():
+    """ Returns the names of all available codecs.
+
+    :return: The available codecs, including the `IDENTITY` codec.
+    :rtype: list[str]
+
+    """
+
+    return [IDENTITY] + sorted(_compressors.keys())
+
+
+def get_codec_for(codec, content_type):
+    """ Returns the codec to use for a response with a specific content type.
+
+    :param str codec:           The preferred codec.
+    :param str content_type:    The content type of the response.
+
+    :return: The codec to use.
+    :rtype: str
+
+    """
+
+    if content_type and content_type.lower().startswith(COMPRESSED_CONTENT_TYPES):
+        return IDENTITY
+    return codec or IDENTITY
+
+
+def write(codec, chunks, fp):
+    """ Compresses data and writes it to a file-like object.
+
+    :param str codec:                   The codec to use.
+    :param iterable[bytes] chunks:      The data to write.
+    :param io.IOBase fp:                The file-like object to write to.
+
+    :return: The number of (uncompressed) bytes that were written.
+    :rtype: int
+
+    """
+
+    size = 0
+    if codec == IDENTITY:
+        for chunk in chunks:
+            fp.write(chunk)
+            size += len(chunk)
+        return size
+
+    compressor = _compressors[codec]()
+    for chunk in chunks:
+        fp.write(compressor.compress(chunk))
+        size += len(chunk)
+    fp.write(compressor.flush())
+    return size
+
+
+def open_reader(codec, fp):
+    """ Returns a file-like object that decompresses the data while it is being read.
+
+    :param str|None codec:  The codec that was used. None is the same as `IDENTITY`.
+    :param io.IOBase fp:    The file-like object with the compressed data.
+
+    :return: A file-like object with the decompressed data.
+    :rtype: io.RawIOBase
+
+    """
+
+    if codec is None or codec == IDENTITY:
+        return fp
+
+    return _DecompressingReader(fp, _decompressors[codec]())
+
+
+def decode(codec, data):
+    """ Decompresses data at once.
+
+    :param str|None codec:  The codec that was used. None is the same as `IDENTITY`.
+    :param bytes data:      The compressed data.
+
+    :return: The decompressed data.
+    :rtype: bytes
+
+    """
+
+    if codec is None or codec == IDENTITY:
+        return data
+
+    decompressor = _decompressors[codec]()
+    return decompressor.decompress(data) + decompressor.flush()
+
+
+class _DecompressingReader(io.RawIOBase):
+    def __init__(self, fp, decompressor):
+        """ A readable file-like object that decompresses chunks of data when they are read.
+
+        :param io.IOBase fp:    The file-like object with the compressed data.
+        :param decompressor:    A decompression object with `decompress()` and `flush()` methods.
+
+        """
+
+        super(_DecompressingReader, self).__init__()
+        self.__fp = fp
+        self.__decompressor = decompressor
+        self.__buffer = b""
+        self.__offset = 0
+        self.__eof = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while self.__offset >= len(self.__buffer) and not self.__eof:
+            data = self.__fp.read(CHUNK_SIZE)
+            if data:
+                self.__buffer = self.__decompressor.decompress(data)
+            else:
+                self.__buffer = self.__decompressor.flush()
+                self.__eof = True
+            self.__offset = 0
+
+        size = min(len(b), len(self.__buffer) - self.__offset)
+        b[:size] = self.__buffer[self.__offset:self.__offset + size]
+        self.__offset += size
+        return size
+
+    def close(self):
+        if not self.closed:
+            self.__fp.close()
+        super(_DecompressingReader, self).close()
@@ -6,22 +6,46 @@ import requests.utils
 from requests.adapters import HTTPAdapter, DEFAULT_POOLSIZE, DEFAULT_RETRIES, DEFAULT_POOLBLOCK
 from requests.structures import CaseInsensitiveDict
 
+import io
 import json
 import hashlib
+import queue
+import threading
+import time
 
+from . import cachecodec
+from .memorycache import MemoryCache
 from .streamcache import StreamCache
 from resources.lib.logger import Logger
 
+# The freshness of a cached response.
+FRESH = "fresh"                                 # : Valid and can be returned.
+STALE_WHILE_REVALIDATE = "stale-while-revalidate"   # : Expired, return it and refresh it.
+STALE_IF_ERROR = "stale-if-error"               # : Expired, but can be returned on errors.
+EXPIRED = "expired"                             # : Expired and must be retrieved again.
+
+# The number of seconds after which an idle background refresh thread stops.
+REFRESH_IDLE_TIMEOUT = 5
+
 
 class CacheHTTPAdapter(HTTPAdapter):
 
-    def __init__(self, cache_store, force_cache_duration,
+    def __init__(self, cache_store, force_cache_duration=None, memory_cache=None,
+                 codec=cachecodec.DEFAULT_CODEC, max_pending_refreshes=16,
                  pool_connections=DEFAULT_POOLSIZE, pool_maxsize=DEFAULT_POOLSIZE,
                  max_retries=DEFAULT_RETRIES, pool_block=DEFAULT_POOLBLOCK):
         """ Creates a Caching HTTP Adapter for the Requests module.
 
+        The adapter is meant to be long-lived and mounted on a persistent session, so its
+        connection pools are reused. The cache behaviour can be changed per request (and per
+        thread) using `set_request_options()`.
+
         :param StreamCache cache_store:         The Cache store to use.
-        :param int|None force_cache_duration:   Should a forced cache duration be used?
+        :param int|None force_cache_duration:   The default forced cache duration (if any).
+        :param MemoryCache|None memory_cache:   An in-memory cache that is used before the
+                                                cache store (if any).
+        :param str codec:                       The codec that is used to compress the bodies.
+        :param int max_pending_refreshes:       The maximum number of queued background refreshes.
 
         :param int pool_connections:            Size of connection pool.
         :param int pool_maxsize:                Maximum number of active connections.
@@ -31,55 +55,177 @@ class CacheHTTPAdapter(HTTPAdapter):
         """
 
         self.cache_store = cache_store                      # type: StreamCache
-        self.force_cache_duration = force_cache_duration    # type: int
+        self.default_cache_duration = force_cache_duration  # type: int
+        self.memory_cache = memory_cache                    # type: MemoryCache
+        self.codec = codec
+
+        # The per request options are stored per thread, so a shared adapter can be used from
+        # multiple threads.
+        self.__request_options = threading.local()
+
+        # Expired responses that are refreshed in the background by a single worker thread.
+        self.__refresh_queue = queue.Queue(maxsize=max_pending_refreshes)
+        self.__refresh_lock = threading.Lock()
+        self.__refresh_thread = None
+        self.__pending_refreshes = set()
 
         super(CacheHTTPAdapter, self).__init__(pool_connections, pool_maxsize, max_retries,
                                                pool_block)
 
+    @property
+    def force_cache_duration(self):
+        """ The forced cache duration for the current request (thread).
+
+        :rtype: int|None
+
+        """
+
+        force_cache_duration = getattr(self.__request_options, "force_cache_duration", None)
+        if force_cache_duration is None:
+            return self.default_cache_duration
+        return force_cache_duration
+
+    @property
+    def no_cache(self):
+        """ Is the cache disabled for the current request (thread).
+
+        :rtype: bool
+
+        """
+
+        return getattr(self.__request_options, "no_cache", False)
+
+    @property
+    def background_refresh(self):
+        """ Should an expired response be returned at once and refreshed in the background for
+        the current request (thread).
+
+        :rtype: bool
+
+        """
+
+        return getattr(self.__request_options, "background_refresh", False)
+
+    def set_request_options(self, no_cache=False, force_cache_duration=None,
+                            background_refresh=False, negative_cache_ttl=None):
+        """ Sets the cache options for the next requests that are done from the current thread.
+
+        :param bool no_cache:                   Should cache be disabled.
+        :param int|None force_cache_duration:   Should a forced cache duration be used?
+        :param bool background_refresh:         Return an expired cached response at once and
+                                                refresh it in the background.
+        :param int|None negative_cache_ttl:     The number of seconds to cache a failed (4xx or
+                                                5xx) response. Failures are not cached by default.
+
+        """
+
+        self.__request_options.no_cache = no_cache
+        self.__request_options.force_cache_duration = force_cache_duration
+        self.__request_options.background_refresh = background_refresh
+        self.__request_options.negative_cache_ttl = negative_cache_ttl
+
+    def wait_for_refreshes(self, timeout=None):
+        """ Blocks until all queued background refreshes are done.
+
+        :param float|None timeout:  The maximum number of seconds to wait.
+
+        :return: Indication whether all refreshes were done.
+        :rtype: bool
+
+        """
+
+        refresh_queue = self.__refresh_queue
+        with refresh_queue.all_tasks_done:
+            return refresh_queue.all_tasks_done.wait_for(
+                lambda: not refresh_queue.unfinished_tasks, timeout)
+
     def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        if self.no_cache:
+            Logger.trace("Cache disabled for: %s", request.url)
+            return super(CacheHTTPAdapter, self).send(request, stream, timeout, verify, cert, proxies)
+
+        stale_response = None
         try:
             if request.method == "GET":
-                response = self.__get_cached_response(request)
-                if response:
+                response, freshness = self.__get_cached_response(request)
+                if freshness == FRESH:
+                    self.cache_store.cacheHits += 1
+                    return response
+
+                if freshness == STALE_WHILE_REVALIDATE:
                     self.cache_store.cacheHits += 1
+                    self.__schedule_refresh(request, dict(
+                        stream=False, timeout=timeout, verify=verify, cert=cert, proxies=proxies))
                     return response
+
+                if freshness == STALE_IF_ERROR:
+                    stale_response = response
         except:
             Logger.error("Error retrieving cache for %s", request.url, exc_info=True)
 
         # Actually send a request
         Logger.debug("Retrieving data from: %s", request.url)
-        response = super(CacheHTTPAdapter, self).send(request, stream, timeout, verify, cert, proxies)
+        try:
+            response = super(CacheHTTPAdapter, self).send(
+                request, stream, timeout, verify, cert, proxies)
+        except requests.RequestException:
+            if stale_response is None:
+                raise
+            Logger.warning("Request failed. Using Stale-If-Error response for: %s",
+                           request.url, exc_info=True)
+            self.cache_store.cacheHits += 1
+            return stale_response
+
+        if stale_response is not None and response.status_code >= 500:
+            Logger.warning("Request failed with '%s %s'. Using Stale-If-Error response for: %s",
+                           response.status_code, response.reason, request.url)
+            response.close()
+            self.cache_store.cacheHits += 1
+            return stale_response
 
         try:
             # Cache it if it was a cacheable response
             cache_data = self.__extract_cache_data(response.headers)
+            negative_cache_ttl = self.__get_negative_cache_ttl(response.status_code)
             if self.__should_cache(response, cache_data):
                 self.__store_response(request, response, cache_data)
+            elif request.method == "GET" and negative_cache_ttl > 0:
+                Logger.debug("Storing negative cache for %s seconds", negative_cache_ttl)
+                self.__store_response(request, response,
+                                      {"max-age": negative_cache_ttl, "negative": True})
 
             if response.status_code == 304:
-                Logger.debug("304 Response found. Prolonging the %s", response.url)
                 self.cache_store.cacheHits += 1
-                response = self.__get_cached_response(request, no_check=True)
+                response = self.__prolong_response(request, response)
         except:
             Logger.error("Error storing cache for %s", request.url, exc_info=True)
 
         return response
 
     def __get_cached_response(self, req, no_check=False):
+        """ Retrieves a cached response and determines its freshness.
+
+        :param requests.PreparedRequest req:    The request.
+        :param bool no_check:                   Do not check the freshness.
+
+        :return: The cached response (or None) and its freshness.
+        :rtype: tuple[requests.Response|None,str]
+
+        """
+
         body_key, meta_key = self.__get_cache_keys(req)
-        if not self.cache_store.has_cache_key(meta_key) or not \
-                self.cache_store.has_cache_key(body_key):
+        entry = self.__get_cache_entry(body_key, meta_key)
+        if entry is None:
             Logger.debug("No-Cache-Hit: %s", req.url)
-            return None
+            return None, EXPIRED
 
-        with self.cache_store.get(meta_key) as fd:
-            meta = json.load(fd)
+        meta, body, stored = entry
         headers = CaseInsensitiveDict(data=meta["headers"])
         cache_data = meta.get("cache_data")
 
         resp = requests.Response()
         resp.url = meta.get("url", req.url)
-        resp.raw = self.cache_store.get(body_key)
+        resp.raw = io.BytesIO(body)
         resp.status_code = meta["status"]
         resp.reason = meta.get("reason")
         resp.headers = headers
@@ -87,26 +233,152 @@ class CacheHTTPAdapter(HTTPAdapter):
         resp.request = req
 
         if no_check:
-            return resp
+            return resp, FRESH
 
         # Determine the maximum age and then check if the cache if valid or not.
         Logger.trace("Cache-Data: %s", cache_data)
         valid_in_seconds = 3600
-        if self.force_cache_duration is not None:
+        if cache_data.get("negative"):
+            # Failures are only used for requests that have negative caching enabled.
+            valid_in_seconds = self.__get_negative_cache_ttl(resp.status_code)
+        elif self.force_cache_duration is not None:
             valid_in_seconds = self.force_cache_duration
         elif 'max-age' in cache_data:
             valid_in_seconds = cache_data['max-age']
 
-        if self.cache_store.is_expired(meta_key, valid_in_seconds):
-            if self.__must_revalidate(cache_data):
-                Logger.debug("Stale-Cache hit found. Revalidating")
+        age = time.time() - stored
+        if age <= valid_in_seconds:
+            Logger.debug("Cache-Hit: %s", req.url)
+            return resp, FRESH
+
+        if cache_data.get("negative"):
+            Logger.debug("Expired Negative-Cache-Hit: %s", req.url)
+            return None, EXPIRED
+
+        if self.__must_revalidate(cache_data):
+            Logger.debug("Stale-Cache hit found. Revalidating")
+            if "etag" in cache_data:
                 req.headers["If-None-Match"] = headers["etag"]
-            else:
-                Logger.debug("Expired Cache-Hit: %s", req.url)
-            return None
+            if "last-modified" in cache_data:
+                req.headers["If-Modified-Since"] = headers["last-modified"]
+
+        stale_seconds = age - valid_in_seconds
+        if self.background_refresh or \
+                stale_seconds <= cache_data.get("stale-while-revalidate", 0):
+            Logger.debug("Stale-While-Revalidate Cache-Hit: %s", req.url)
+            return resp, STALE_WHILE_REVALIDATE
+
+        if stale_seconds <= cache_data.get("stale-if-error", 0):
+            Logger.debug("Stale-If-Error Cache-Hit: %s", req.url)
+            return resp, STALE_IF_ERROR
+
+        Logger.debug("Expired Cache-Hit: %s", req.url)
+        return None, EXPIRED
+
+    def __get_cache_entry(self, body_key, meta_key):
+        """ Retrieves a cached response from the memory cache, or, if it is not present there,
+        from the cache store. Responses from the cache store are decompressed and added to the
+        memory cache, so only the cache store holds compressed bodies.
+
+        :param str body_key:    The key of the body.
+        :param str meta_key:    The key of the meta data.
+
+        :return: The decoded meta data, the decompressed body and the time it was stored (or None).
+        :rtype: tuple[dict,bytes,float]|None
+
+        """
+
+        if self.memory_cache is not None:
+            entry = self.memory_cache.get(meta_key)
+            if entry is not None:
+                return entry
+
+        # Hold the lock of the entry, so a response that is stored meanwhile is not replaced
+        # by this one in the memory cache.
+        with self.cache_store.lock_entry(meta_key):
+            store_entry = self.cache_store.get_entry(body_key, meta_key)
+            if store_entry is None:
+                return None
+
+            with store_entry.meta as fd:
+                meta = fd.read()
+            meta_data = json.loads(meta)
+            with store_entry.body as fd:
+                body = cachecodec.decode(meta_data.get("codec"), fd.read())
+
+            entry = (meta_data, body, store_entry.stored)
+            if self.memory_cache is not None:
+                self.memory_cache.set(meta_key, entry, len(meta) + len(body))
+        return entry
+
+    def __get_negative_cache_ttl(self, status_code):
+        """ Determines how long a failed response should be cached for the current request.
+
+        :param int status_code:     The HTTP status code of the response.
+
+        :return: The number of seconds to cache the response (0 means not cached).
+        :rtype: int
+
+        """
+
+        if status_code < 400:
+            return 0
+        return getattr(self.__request_options, "negative_cache_ttl", None) or 0
 
-        Logger.debug("Cache-Hit: %s", req.url)
-        return resp
+    def __schedule_refresh(self, request, send_kwargs):
+        """ Queues a request to refresh an expired cached response in the background. Requests
+        that are already queued, or requests that do not fit in the queue are ignored.
+
+        :param requests.PreparedRequest request:    The request to refresh.
+        :param dict send_kwargs:                    The keyword arguments for the `send()` call.
+
+        """
+
+        with self.__refresh_lock:
+            if request.url in self.__pending_refreshes:
+                Logger.trace("Refresh already pending for: %s", request.url)
+                return
+
+            try:
+                self.__refresh_queue.put_nowait((request.copy(), send_kwargs))
+            except queue.Full:
+                Logger.warning("Refresh queue is full. Not refreshing: %s", request.url)
+                return
+
+            self.__pending_refreshes.add(request.url)
+            if self.__refresh_thread is None:
+                self.__refresh_thread = threading.Thread(
+                    target=self.__refresh_worker, name="CacheRefresh", daemon=True)
+                self.__refresh_thread.start()
+
+    def __refresh_worker(self):
+        """ Retrieves and stores the queued requests until the queue was idle for a while. """
+
+        while True:
+            try:
+                request, send_kwargs = self.__refresh_queue.get(timeout=REFRESH_IDLE_TIMEOUT)
+            except queue.Empty:
+                with self.__refresh_lock:
+                    if self.__refresh_queue.empty():
+                        self.__refresh_thread = None
+                        return
+                continue
+
+            try:
+                Logger.debug("Refreshing in the background: %s", request.url)
+                response = super(CacheHTTPAdapter, self).send(request, **send_kwargs)
+                cache_data = self.__extract_cache_data(response.headers)
+                if self.__should_cache(response, cache_data):
+                    self.__store_response(request, response, cache_data)
+                elif response.status_code == 304:
+                    response = self.__prolong_response(request, response)
+                response.close()
+            except:
+                Logger.error("Error refreshing %s", request.url, exc_info=True)
+            finally:
+                with self.__refresh_lock:
+                    self.__pending_refreshes.discard(request.url)
+                self.__refresh_queue.task_done()
 
     def __extract_cache_data(self, headers):
         """ Extracts cache data from the `cache-control` headers.
@@ -142,8 +414,11 @@ class CacheHTTPAdapter(HTTPAdapter):
             #     cache_data['must-revalidate'] = True
             cache_data['etag'] = headers['etag']
 
+        if "last-modified" in headers:
+            cache_data['last-modified'] = headers['last-modified']
+
         if cache_data:
-            Logger.debug("Found cache-control and etag data: %s", cache_data)
+            Logger.debug("Found cache-control, etag and last-modified data: %s", cache_data)
         return cache_data
 
     def __should_cache(self, res, cache_data):
@@ -221,11 +496,36 @@ class CacheHTTPAdapter(HTTPAdapter):
         Logger.debug("Storing cache for: %s", res.url)
         body_key, meta_key = self.__get_cache_keys(req)
 
-        # Store the body as a binary file and reset the raw and _content_consumed attributes
-        # of the response so we can reuse it again
-        with self.cache_store.set(body_key) as fp:
-            for chunk in res.iter_content(chunk_size=128):
-                fp.write(chunk)
+        # Write the (compressed) body and the meta data, but only store them once both are
+        # complete.
+        codec = cachecodec.get_codec_for(self.codec, res.headers.get("content-type"))
+        body_fp = self.cache_store.set(body_key)
+        meta_fp = None
+        try:
+            chunks = res.iter_content(chunk_size=cachecodec.CHUNK_SIZE)
+            size = cachecodec.write(codec, chunks, body_fp)
+
+            # store all headers and cache-data and store it in a json file
+            data = {
+                "body": body_key,
+                "url": res.url,
+                "headers": dict(
+                    (k, v) for k, v in res.headers.items()
+                ),
+                "status": res.status_code,
+                "reason": res.reason,
+                "encoding": res.encoding,
+                "cache_data": cache_data,
+                "codec": codec,
+                "size": size
+            }
+            meta_fp = self.cache_store.set(meta_key)
+            meta_fp.write(json.dumps(data, indent=2).encode())
+        except:
+            body_fp.discard()
+            if meta_fp is not None:
+                meta_fp.discard()
+            raise
 
         # we need to restore some original response protected members and the raw content. The
         # latter is an urllib3 response, but we can use an BytesIO as long as we add some required
@@ -234,30 +534,72 @@ class CacheHTTPAdapter(HTTPAdapter):
         if hasattr(res.raw, '_original_response'):
             original_response = res.raw._original_response
 
-        # set the raw content so we can use it again
-        res.raw = self.cache_store.get(body_key)
+        # Store the body and meta data together, so readers never get the body of one response
+        # with the meta data of another one. Then reset the raw and _content_consumed attributes
+        # of the response so we can reuse it again.
+        with self.cache_store.lock_entry(meta_key):
+            self.cache_store.store_entry(body_fp, meta_fp)
+            if self.memory_cache is not None:
+                self.memory_cache.remove(meta_key)
+            res.raw = cachecodec.open_reader(codec, self.cache_store.get(body_key))
         res._content_consumed = False
         if original_response:
             res.raw._original_response = original_response
+        Logger.trace(data)
+        return
+
+    def __store_meta(self, meta_key, meta):
+        """ Stores the meta data of a response. This also resets the time it was stored.
+
+        :param str meta_key:    The key of the meta data.
+        :param dict meta:       The meta data.
+
+        """
 
-        # store all headers and cache-data and store it in a json file
-        data = {
-            "body": body_key,
-            "url": res.url,
-            "headers": dict(
-                (k, v) for k, v in res.headers.items()
-            ),
-            "status": res.status_code,
-            "reason": res.reason,
-            "encoding": res.encoding,
-            "cache_data": cache_data
-        }
         with self.cache_store.set(meta_key) as fp:
-            json_str = json.dumps(data, indent=2)
+            json_str = json.dumps(meta, indent=2)
             fp.write(json_str.encode())
-        Logger.trace(data)
+        Logger.trace(meta)
 
-        return
+    def __prolong_response(self, req, res):
+        """ Prolongs a cached response after the server responded with a 304 Not Modified. The
+        cache headers of the 304 response replace the stored ones.
+
+        :param requests.PreparedRequest req:    The request.
+        :param requests.Response res:           The 304 response.
+
+        :return: The cached response, or the 304 response if nothing was cached.
+        :rtype: requests.Response
+
+        """
+
+        body_key, meta_key = self.__get_cache_keys(req)
+        # Prevent another thread from storing a new body in the meantime.
+        with self.cache_store.lock_entry(meta_key):
+            entry = self.__get_cache_entry(body_key, meta_key)
+            if entry is None:
+                Logger.warning("304 Response found, but no cached response for %s", res.url)
+                return res
+
+            Logger.debug("304 Response found. Prolonging the %s", res.url)
+            meta, body, _ = entry
+            meta = dict(meta)
+            meta["headers"] = dict(meta["headers"])
+            for header in ("cache-control", "etag", "last-modified", "expires", "date"):
+                if header in res.headers:
+                    meta["headers"][header] = res.headers[header]
+            meta["cache_data"] = self.__extract_cache_data(CaseInsensitiveDict(meta["headers"]))
+
+            if self.memory_cache is not None:
+                self.memory_cache.remove(meta_key)
+            self.__store_meta(meta_key, meta)
+
+        self.cache_store.revalidations += 1
+        self.cache_store.bytesSaved += meta.get("size", len(body))
+        res.close()
+
+        response, _ = self.__get_cached_response(req, no_check=True)
+        return response
 
     def __must_revalidate(self, cache_data):
         """ Checks if a cached response should be revalidated
@@ -265,8 +607,8 @@ class CacheHTTPAdapter(HTTPAdapter):
         Arguments:
         meta_data : dict - the response to check.
 
-        If True is returned the response has a must-revalidate cache parameters
-        and an ETAG.
+        If True is returned the response has an ETAG or a Last-Modified value that can be
+        used for a conditional request.
 
         """
 
@@ -281,8 +623,9 @@ class CacheHTTPAdapter(HTTPAdapter):
         #     if "etag" in cache_data:
         #         return True
 
-        # always revalidate a etag as many sites don't provide the ....-revalidate option.
-        if "etag" in cache_data:
+        # always revalidate a etag or last-modified as many sites don't provide the
+        # ....-revalidate option.
+        if "etag" in cache_data or "last-modified" in cache_data:
             return True
 
         return False
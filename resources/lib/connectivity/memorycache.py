@@ -0,0 +1,109 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import threading
+from collections import OrderedDict
+
+# The default maximum size (in bytes) of all values in the memory cache.
+DEFAULT_MEMORY_SIZE = 8 * 1024 * 1024
+
+
+class MemoryCache(object):
+    def __init__(self, max_size=DEFAULT_MEMORY_SIZE):
+        """ An in-process least recently used cache that is bounded by the size of its values.
+
+        :param int max_size:    The maximum number of bytes to keep in memory.
+
+        """
+
+        self.maxSize = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self.__lock = threading.Lock()
+        self.__items = OrderedDict()
+
+    @property
+    def hit_ratio(self):
+        """ The ratio of lookups that were found in the memory cache.
+
+        :rtype: float
+
+        """
+
+        lookups = self.hits + self.misses
+        if not lookups:
+            return 0.0
+        return float(self.hits) / lookups
+
+    def get(self, key):
+        """ Retrieves a value and marks it as most recently used.
+
+        :param str key:     The key to retrieve.
+
+        :return: The value or None if it was not present.
+
+        """
+
+        with self.__lock:
+            item = self.__items.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+
+            self.__items.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def set(self, key, value, size):
+        """ Stores a value and evicts the least recently used values if the cache is full.
+
+        Values that are larger than the maximum size are not stored.
+
+        :param str key:     The key to store the value under.
+        :param value:       The value to store.
+        :param int size:    The size (in bytes) of the value.
+
+        """
+
+        with self.__lock:
+            self.__remove(key)
+            if size > self.maxSize:
+                return
+
+            self.__items[key] = (value, size)
+            self.size += size
+            while self.size > self.maxSize:
+                evicted_key = next(iter(self.__items))
+                self.__remove(evicted_key)
+                self.evictions += 1
+
+    def remove(self, key):
+        """ Removes a value from the cache.
+
+        :param str key:     The key to remove.
+
+        """
+
+        with self.__lock:
+            self.__remove(key)
+
+    def clear(self):
+        """ Removes all values from the cache. """
+
+        with self.__lock:
+            self.__items.clear()
+            self.size = 0
+
+    def __remove(self, key):
+        item = self.__items.pop(key, None)
+        if item is not None:
+            self.size -= item[1]
+
+    def __len__(self):
+        return len(self.__items)
+
+    def __str__(self):
+        return "Memory cache [{0} items, {1}/{2} bytes, hit ratio {3:.2f}]".format(
+            len(self.__items), self.size, self.maxSize, self.hit_ratio)
@@ -0,0 +1,71 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import threading
+
+from resources.lib.logger import Logger
+
+
+class SingleFlight(object):
+    def __init__(self):
+        """ Coalesces identical calls that are in-flight at the same time: the first caller for a
+        key does the actual call, callers that arrive with the same key while it is running wait
+        for it and share its result (or exception).
+
+        """
+
+        self.flights = 0        # : The number of calls that were actually executed.
+        self.hits = 0           # : The number of calls that shared the result of an in-flight call.
+
+        self.__lock = threading.Lock()
+        self.__calls = dict()   # type: dict[tuple, _Call]
+
+    def do(self, key, func):
+        """ Executes `func` or waits for an identical in-flight call and returns its result.
+
+        :param tuple key:       The key that identifies identical calls.
+        :param function func:   The function to call if no identical call is in-flight.
+
+        :return: The result of the call.
+
+        """
+
+        with self.__lock:
+            call = self.__calls.get(key)
+            if call is None:
+                call = _Call()
+                self.__calls[key] = call
+                self.flights += 1
+                is_leader = True
+            else:
+                self.hits += 1
+                is_leader = False
+
+        if not is_leader:
+            Logger.debug("Waiting for in-flight call for %s", key[0])
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.__lock:
+                del self.__calls[key]
+            call.done.set()
+
+    def __str__(self):
+        return "SingleFlight [flights={0}, hits={1}]".format(self.flights, self.hits)
+
+
+class _Call(object):
+    __slots__ = ["done", "result", "error"]
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
@@ -0,0 +1,326 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import io
+import os
+import sqlite3
+import threading
+import time
+
+from .streamcache import CacheEntry, LOCK_STRIPES
+from resources.lib.logger import Logger
+from resources.lib.sqlitepool import SqlitePool
+
+# The default maximum size (in bytes) of all cached values.
+DEFAULT_MAX_SIZE = 100 * 1024 * 1024
+# The minimum number of seconds between two updates of the last access time of a value.
+ACCESS_RESOLUTION = 60
+# The maximum number of idle database connections that are kept open for reuse.
+MAX_IDLE_CONNECTIONS = 4
+
+
+class SqliteStreamCache(object):
+    DatabaseName = "www.db"
+
+    def __init__(self, cache_path, max_size=DEFAULT_MAX_SIZE):
+        """ Creates a cache store that keeps all cached values in a single SQLite database.
+
+        It implements the same interface as the `StreamCache`. The database is opened in WAL
+        mode so multiple threads and processes can read while another one writes. Threads borrow
+        a connection from a small pool for each operation, so short-lived worker threads do not
+        leave connections behind.
+
+        The values of a single response (the `<hash>.body` and `<hash>.meta` keys) are grouped
+        by their hash. The body and meta data of a response are stored in a single transaction
+        (see `store_entry()`) and read with a single query, so other processes never see the
+        body of one response with the meta data of another one. Within a process, they also
+        share a striped lock (see `lock_entry()`). If the total size of all values exceeds
+        `max_size`, the least recently used responses are evicted. The total size is kept as a running total and only queried
+        from the database when it is opened and when the store appears to be full.
+
+        :param str cache_path:  The folder in which the database is stored.
+        :param int max_size:    The maximum number of bytes to store.
+
+        """
+
+        self.cacheHits = 0
+        self.revalidations = 0      # : The number of 304 Not Modified responses.
+        self.bytesSaved = 0         # : The number of body bytes that 304 responses saved.
+        self.maxSize = max_size
+        self.cachePath = os.path.join(cache_path, SqliteStreamCache.DatabaseName)
+        if not os.path.isdir(cache_path):
+            os.makedirs(cache_path)
+
+        self.__locks = [threading.RLock() for _ in range(LOCK_STRIPES)]
+        self.__pool = SqlitePool(self.cachePath, MAX_IDLE_CONNECTIONS)
+        self.__size_lock = threading.Lock()
+
+        # Make sure the schema exists and start with the current size.
+        with self.__pool.connection() as connection:
+            self.__create_schema(connection)
+            self.__total_size = self.__get_total_size(connection)
+
+    def set(self, key):
+        """ Returns a writable file-like object. The value is stored when it is closed.
+
+        :param str key:     The key to store the value under.
+
+        :rtype: io.BytesIO
+
+        """
+
+        return _SqliteCacheWriter(key, lambda value: self.__store([(key, value)]))
+
+    def store_entry(self, body_fp, meta_fp):
+        """ Stores the body and meta data of a response in a single transaction.
+
+        :param _SqliteCacheWriter body_fp:  The writer of the body (see `set()`).
+        :param _SqliteCacheWriter meta_fp:  The writer of the meta data (see `set()`).
+
+        """
+
+        self.__store([(body_fp.key, body_fp.getvalue()), (meta_fp.key, meta_fp.getvalue())])
+        body_fp.discard()
+        meta_fp.discard()
+
+    def get(self, key):
+        """ Retrieves the value of a key.
+
+        :param str key:     The key to retrieve.
+
+        :return: The stored value.
+        :rtype: io.BytesIO
+
+        """
+
+        with self.__pool.connection() as connection:
+            row = connection.execute("SELECT value FROM cache WHERE key = ?", (key, )).fetchone()
+        if row is None:
+            raise KeyError(key)
+        return io.BytesIO(row[0])
+
+    def get_entry(self, body_key, meta_key):
+        """ Retrieves the body and meta data of a response in a single query.
+
+        :param str body_key:    The key of the body.
+        :param str meta_key:    The key of the meta data.
+
+        :return: The cache entry or None if either of the keys was not present.
+        :rtype: CacheEntry|None
+
+        """
+
+        with self.lock_entry(meta_key), self.__pool.connection() as connection:
+            rows = connection.execute(
+                "SELECT key, value, stored, last_access FROM cache WHERE key IN (?, ?)",
+                (body_key, meta_key)).fetchall()
+            if len(rows) != 2:
+                return None
+
+            values = dict((row[0], row[1:]) for row in rows)
+            body, _, _ = values[body_key]
+            meta, stored, last_access = values[meta_key]
+
+            # Prevent a write for every cache hit.
+            now = time.time()
+            if last_access + ACCESS_RESOLUTION < now:
+                connection.execute("UPDATE cache SET last_access = ? WHERE hash = ?",
+                                   (now, self.__get_hash(meta_key)))
+        return CacheEntry(io.BytesIO(body), io.BytesIO(meta), stored)
+
+    def lock_entry(self, key):
+        """ Returns the lock that serialises the reads and writes of the entry (the body and
+        the meta data) that a key belongs to.
+
+        :param str key:     A `<hash>.body` or `<hash>.meta` key.
+
+        :rtype: threading.RLock
+
+        """
+
+        return self.__locks[hash(self.__get_hash(key)) % LOCK_STRIPES]
+
+    def is_expired(self, key, seconds=3600):
+        with self.__pool.connection() as connection:
+            row = connection.execute("SELECT stored FROM cache WHERE key = ?", (key, )).fetchone()
+        if row is None:
+            return False
+
+        return row[0] + seconds < time.time()
+
+    def has_cache_key(self, key):
+        """ Returns if a key is present (expired or not) in the cache.
+
+        :param str key:     The key to use to check the cache values.
+
+        :rtype: bool
+
+        """
+
+        with self.__pool.connection() as connection:
+            row = connection.execute("SELECT 1 FROM cache WHERE key = ?", (key, )).fetchone()
+        return row is not None
+
+    def clean_up(self, cache_time):
+        """ Removes all values that were stored more than `cache_time` seconds ago.
+
+        :param int cache_time:  The minimum age (in seconds) of the values that will be removed.
+
+        """
+
+        with self.__pool.connection() as connection:
+            cursor = connection.execute(
+                "DELETE FROM cache WHERE stored < ?", (time.time() - cache_time, ))
+            Logger.info("Removed %s values from %s", cursor.rowcount, self)
+            if cache_time <= 0:
+                connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            with self.__size_lock:
+                self.__total_size = self.__get_total_size(connection)
+
+    def close(self):
+        """ Closes all idle database connections. Connections that are in use are closed when
+        they are returned, if the pool is full. """
+
+        self.__pool.close()
+
+    def __store(self, values):
+        """ Stores the values of an entry in a single transaction and evicts the least recently
+        used values if the store is full.
+
+        :param list[tuple[str,bytes]] values:   The keys and the values to store.
+
+        """
+
+        now = time.time()
+        with self.lock_entry(values[0][0]), self.__pool.connection() as connection:
+            size = 0
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                for key, value in values:
+                    row = connection.execute("SELECT size FROM cache WHERE key = ?", (key, )).fetchone()
+                    connection.execute(
+                        "INSERT OR REPLACE INTO cache (key, hash, size, stored, last_access, value) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        (key, self.__get_hash(key), len(value), now, now, sqlite3.Binary(value)))
+                    size += len(value) - (row[0] if row else 0)
+                connection.execute("COMMIT")
+            except:
+                connection.execute("ROLLBACK")
+                raise
+
+            with self.__size_lock:
+                self.__total_size += size
+                if self.__total_size > self.maxSize:
+                    self.__evict(connection)
+
+    def __evict(self, connection):
+        """ Evicts the least recently used responses if the size exceeds the maximum size.
+
+        The running total does not include the values that other processes stored or removed,
+        so the actual size is determined first. To prevent evicting on every store, the size is
+        reduced to 90% of the maximum size. Must be called while holding the size lock.
+
+        :param sqlite3.Connection connection:   The connection to use.
+
+        """
+
+        total_size = self.__total_size = self.__get_total_size(connection)
+        if total_size <= self.maxSize:
+            return
+
+        target_size = self.maxSize * 0.9
+        evicted = []
+        rows = connection.execute(
+            "SELECT hash, SUM(size), MAX(last_access) AS accessed FROM cache "
+            "GROUP BY hash ORDER BY accessed").fetchall()
+        for key_hash, size, _ in rows:
+            if total_size <= target_size:
+                break
+            evicted.append((key_hash, ))
+            total_size -= size
+
+        connection.execute("BEGIN")
+        try:
+            connection.executemany("DELETE FROM cache WHERE hash = ?", evicted)
+            connection.execute("COMMIT")
+        except sqlite3.Error:
+            connection.execute("ROLLBACK")
+            raise
+        self.__total_size = total_size
+        Logger.debug("Evicted %s responses from %s", len(evicted), self)
+
+    def __get_total_size(self, connection):
+        """ Returns the total size of all values in the database.
+
+        :param sqlite3.Connection connection:   The connection to use.
+
+        :rtype: int
+
+        """
+
+        return connection.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+
+    def __create_schema(self, connection):
+        """ Creates the tables and indices if they do not exist yet.
+
+        :param sqlite3.Connection connection:   The connection to use.
+
+        """
+
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY NOT NULL, "
+            "hash TEXT NOT NULL, "
+            "size INTEGER NOT NULL, "
+            "stored REAL NOT NULL, "
+            "last_access REAL NOT NULL, "
+            "value BLOB NOT NULL)")
+        connection.execute("CREATE INDEX IF NOT EXISTS ix_cache_hash ON cache (hash)")
+        connection.execute("CREATE INDEX IF NOT EXISTS ix_cache_size ON cache (size)")
+        connection.execute("CREATE INDEX IF NOT EXISTS ix_cache_stored ON cache (stored)")
+        connection.execute(
+            "CREATE INDEX IF NOT EXISTS ix_cache_last_access ON cache (last_access)")
+
+    def __get_hash(self, key):
+        """ Returns the hash part of a `<hash>.body` or `<hash>.meta` key.
+
+        :param str key:     The key.
+
+        :rtype: str
+
+        """
+
+        return key.rsplit(".", 1)[0]
+
+    def __str__(self):
+        return "SQLite cache store [{0}]".format(self.cachePath)
+
+
+class _SqliteCacheWriter(io.BytesIO):
+    def __init__(self, key, store_callback):
+        """ A BytesIO that passes its value to the `store_callback` when closed. If an exception
+        occurs within a `with` block, the value is discarded.
+
+        :param str key:                         The key to store the value under.
+        :param (bytes) -> None store_callback:  The method that stores the value.
+
+        """
+
+        super(_SqliteCacheWriter, self).__init__()
+        self.key = key
+        self.__store_callback = store_callback
+
+    def close(self):
+        if not self.closed:
+            self.__store_callback(self.getvalue())
+        super(_SqliteCacheWriter, self).close()
+
+    def discard(self):
+        """ Closes the writer without storing the value. """
+
+        super(_SqliteCacheWriter, self).close()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
@@ -3,57 +3,105 @@
 import os
 import io
 import datetime
+import tempfile
 import threading
+import time
+from collections import namedtuple
 
-# lock object to use.
-cacheLock = threading.RLock()
+from resources.lib.logger import Logger
 
+# The body and meta data of a cached response and the time it was stored.
+CacheEntry = namedtuple("CacheEntry", ["body", "meta", "stored"])
 
-def locked_read_write(origfunc):
-    """ Decorator to execute function with a lock to prevent threading issues. """
+# The number of locks that are used to serialise the reads and writes of entries within a process.
+LOCK_STRIPES = 32
+# The number of times a replace is retried when the target file is in use (Windows only).
+REPLACE_RETRIES = 5
 
-    def execute_locked(*args, **kwargs):
-        """ The method that is called when the Decorator is executed.
 
-        Arguments:
-        *args     : List[Object] - A list of arguments that will be used to
-                                   substitute parameters in the message.
-
-        Keyword Arguments:
-        **kwargs  : Dictionary   - List of additional keyword arguments. Possible
-                                   values are: "error = True"
-
-        """
+class StreamCache(object):
+    def __init__(self, cache_path):
+        """ Creates a cache store that keeps each cached value in its own file.
 
-        cacheLock.acquire()
-        try:
-            # noinspection PyArgumentList
-            return origfunc(*args, **kwargs)
-        finally:
-            cacheLock.release()
+        Values are written to a temporary file that replaces the actual file when it is closed,
+        so readers (in this or other processes) always see complete values. The body and meta
+        data of a response (the `<hash>.body` and `<hash>.meta` keys) share a striped lock, so
+        within a process, `get_entry` never returns the body of one response with the meta data
+        of another one. Writers that store both should close them while holding `lock_entry()`.
 
-    return execute_locked
+        :param str cache_path:  The folder in which the `www` cache folder is created.
 
+        """
 
-class StreamCache(object):
-    def __init__(self, cache_path):
         self.cacheHits = 0
+        self.revalidations = 0      # : The number of 304 Not Modified responses.
+        self.bytesSaved = 0         # : The number of body bytes that 304 responses saved.
         self.cachePath = os.path.join(cache_path, "www")
-        if not os.path.isdir(self.cachePath):
-            os.makedirs(self.cachePath)
+        os.makedirs(self.cachePath, exist_ok=True)
+
+        self.__locks = [threading.RLock() for _ in range(LOCK_STRIPES)]
 
-    @locked_read_write
     def set(self, key):
+        """ Returns a writable file-like object. The value is stored when it is closed.
+
+        :param str key:     The key to store the value under.
+
+        :rtype: _AtomicFileWriter
+
+        """
+
         file_name = os.path.join(self.cachePath, key)
-        fp = io.open(file_name, mode="w+b")
-        return fp
+        return _AtomicFileWriter(file_name, self.__get_lock(key))
 
-    @locked_read_write
     def get(self, key):
         file_name = os.path.join(self.cachePath, key)
         with io.open(file_name, mode="rb") as fp:
             return io.BytesIO(fp.read())
 
+    def get_entry(self, body_key, meta_key):
+        """ Retrieves the body and meta data of a response.
+
+        :param str body_key:    The key of the body.
+        :param str meta_key:    The key of the meta data.
+
+        :return: The cache entry or None if either of the keys was not present.
+        :rtype: CacheEntry|None
+
+        """
+
+        try:
+            with self.__get_lock(meta_key):
+                stored = os.path.getmtime(os.path.join(self.cachePath, meta_key))
+                return CacheEntry(self.get(body_key), self.get(meta_key), stored)
+        except OSError:
+            return None
+
+    def store_entry(self, body_fp, meta_fp):
+        """ Stores the body and meta data of a response together. Each of them replaces its
+        file atomically, and within a process, they are replaced while holding the lock of the
+        entry.
+
+        :param _AtomicFileWriter body_fp:   The writer of the body (see `set()`).
+        :param _AtomicFileWriter meta_fp:   The writer of the meta data (see `set()`).
+
+        """
+
+        with self.__get_lock(os.path.basename(meta_fp.name)):
+            body_fp.close()
+            meta_fp.close()
+
+    def lock_entry(self, key):
+        """ Returns the lock that serialises the reads and writes of the entry (the body and
+        the meta data) that a key belongs to.
+
+        :param str key:     A `<hash>.body` or `<hash>.meta` key.
+
+        :rtype: threading.RLock
+
+        """
+
+        return self.__get_lock(key)
+
     def is_expired(self, key, seconds=3600):
         file_name = os.path.join(self.cachePath, key)
         if not os.path.isfile(file_name):
@@ -79,5 +127,98 @@ class StreamCache(object):
         file_name = os.path.join(self.cachePath, key)
         return os.path.isfile(file_name)
 
+    def clean_up(self, cache_time):
+        """ The loose cache files are removed by `EnvController.cache_clean_up()` together with
+        the other files in the cache folder, so there is nothing to do here.
+
+        :param int cache_time:  The minimum age (in seconds) of the values that will be removed.
+
+        """
+
+        pass
+
+    def close(self):
+        pass
+
+    def __get_lock(self, key):
+        """ Returns the lock for the stripe that the entry of the key belongs to.
+
+        :param str key:     The key.
+
+        :rtype: threading.RLock
+
+        """
+
+        return self.__locks[hash(key.rsplit(".", 1)[0]) % LOCK_STRIPES]
+
     def __str__(self):
         return "Cache store [{0}]".format(self.cachePath)
+
+
+class _AtomicFileWriter(object):
+    def __init__(self, file_name, lock):
+        """ A writable file that is written to a temporary file. When it is closed, the temporary
+        file replaces the actual file. If an exception occurs within a `with` block, the temporary
+        file is discarded.
+
+        :param str file_name:           The file to write.
+        :param threading.RLock lock:    The lock to hold while replacing the file.
+
+        """
+
+        self.__file_name = file_name
+        self.__lock = lock
+
+        fd, self.__temp_name = tempfile.mkstemp(
+            dir=os.path.dirname(file_name), prefix="{}.".format(os.path.basename(file_name)),
+            suffix=".tmp")
+        self.__fp = io.open(fd, mode="wb")
+
+    @property
+    def closed(self):
+        return self.__fp.closed
+
+    @property
+    def name(self):
+        return self.__file_name
+
+    def write(self, data):
+        return self.__fp.write(data)
+
+    def close(self):
+        if self.__fp.closed:
+            return
+
+        self.__fp.close()
+        with self.__lock:
+            self.__replace()
+
+    def discard(self):
+        """ Closes and removes the temporary file without replacing the actual file. """
+
+        if not self.__fp.closed:
+            self.__fp.close()
+        if os.path.exists(self.__temp_name):
+            os.remove(self.__temp_name)
+
+    def __replace(self):
+        # On Windows a file cannot be replaced while it is opened by a reader. Readers only hold
+        # files for a short while, so retry a few times.
+        for attempt in range(REPLACE_RETRIES):
+            try:
+                os.replace(self.__temp_name, self.__file_name)
+                return
+            except PermissionError:
+                time.sleep(0.01 * (attempt + 1))
+
+        Logger.warning("Could not replace cache file: %s", self.__file_name)
+        self.discard()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
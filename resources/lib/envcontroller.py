@@ -269,6 +269,11 @@ class EnvController:
                     current_dir = root
 
                 for basename in files:
+                    # SQLite databases (such as the http cache) clean up their own content.
+                    if fnmatch.fnmatch(basename, "*.db") or fnmatch.fnmatch(basename, "*.db-*"):
+                        Logger.trace("Skipping database: %s", basename)
+                        continue
+
                     if fnmatch.fnmatch(basename, mask):
                         filename = os.path.join(root, basename)
                         Logger.trace("Inspecting: %s", filename)
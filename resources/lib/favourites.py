@@ -39,7 +39,7 @@ class Favourites:
             file_name = self.__filePattern % (channel.guid, item.guid)
 
         file_path = os.path.join(self.FavouriteFolder, file_name)
-        pickle = self.__pickler.pickle_media_item(item)
+        pickle = self.__pickler.pickle_media_item(item, use_dictionary=True)
 
         # Just double check for folder existence
         if not os.path.isdir(self.FavouriteFolder):
@@ -64,12 +64,14 @@ class Favourites:
 
         """
 
-        path_mask = os.path.join(self.FavouriteFolder, "*-%s.xotfav" % (item.guid, ))
+        # Favourites that were added by older versions use the legacy guid of the item.
+        for guid in (item.guid, item.legacy_guid):
+            path_mask = os.path.join(self.FavouriteFolder, "*-%s.xotfav" % (guid, ))
 
-        Logger.debug("Removing favourites for mask: %s", path_mask)
-        for fav in glob.glob(path_mask):
-            Logger.trace("Removing item %s\nFileName: %s", item, fav)
-            os.remove(fav)
+            Logger.debug("Removing favourites for mask: %s", path_mask)
+            for fav in glob.glob(path_mask):
+                Logger.trace("Removing item %s\nFileName: %s", item, fav)
+                os.remove(fav)
         return
 
     def list(self, channel=None):
@@ -3,7 +3,7 @@
 
 import re
 import json
-from typing import Dict, List, Union, Optional, Any
+from typing import Callable, Dict, List, Union, Optional, Any, Sequence, Tuple
 
 
 #noinspection PyShadowingNames
@@ -216,6 +216,70 @@ class JsonHelper(object):
 
         return data
 
+    @staticmethod
+    def compile_parser(parser: Sequence[Union[str, int, Tuple[str, Any, Optional[int]]]]) -> Callable[[Any], list]:
+        """ Compiles a DataParser parser path into a function that returns the parser results
+        from JSON data.
+
+        The elements of the path are dictionary keys or list indexes. A tuple (key, value, index)
+        filters a list of dictionaries on the value of the key. If the index is a number, from
+        the resulting list that index will be used, otherwise the full list will be used. If an
+        element yields nothing, the results are empty.
+
+        :param parser: The parser path.
+
+        :return: A function that takes the JSON data and returns the list of results.
+
+        """
+
+        if not parser:
+            return lambda data: data if isinstance(data, (tuple, list)) else [data]
+
+        # The filters are precompiled, the keys and indexes are used as they are.
+        steps = tuple(
+            (JsonHelper.__compile_filter(*element), None) if isinstance(element, tuple) else (None, element)
+            for element in parser
+        )
+
+        def parse(data):
+            for list_filter, element in steps:
+                if list_filter is not None:
+                    data = list_filter(data)
+                elif isinstance(data, list):
+                    data = data[element]
+                else:
+                    data = data.get(element)
+
+                if not data:
+                    return []
+
+            if not isinstance(data, (tuple, list)):
+                # if there is just one match, return that as a list
+                return [data]
+            return data
+        return parse
+
+    @staticmethod
+    def __compile_filter(key, value, index):
+        """ Compiles a (key, value, index) parser element that matches a key in a list of
+        dictionaries.
+
+        :param str key:             The key to match.
+        :param any value:           The value the key should have.
+        :param int|None index:      The index of the result to use, or None for all results.
+
+        :return: A function that takes a list of dictionaries and returns the result(s).
+        :rtype: function
+
+        """
+
+        def filter_list(data):
+            results = [d for d in data if d.get(key) == value]
+            if not results or index is None:
+                return results
+            return results[index]
+        return filter_list
+
     @staticmethod
     def dump(dictionary, pretty_print=True, sort_keys=False):
         """ Dumps a JSON object to a string
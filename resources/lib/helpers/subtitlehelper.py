@@ -79,7 +79,8 @@ class SubtitleHelper(object):
                 return local_complete_path
 
             Logger.trace("Opening Subtitle URL")
-            raw = UriHandler.open(url)
+            # Missing subtitles are requested again for each stream, so cache the failures.
+            raw = UriHandler.open(url, negative_cache_ttl=300)
             if UriHandler.instance().status.error:
                 Logger.warning("Could not retrieve subtitle from %s", url)
                 return ""
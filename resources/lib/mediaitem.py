@@ -1,9 +1,11 @@
 # coding=utf-8  # NOSONAR
 # SPDX-License-Identifier: GPL-3.0-or-later
 
+import hashlib
 from datetime import datetime
 from functools import reduce
 from random import getrandbits
+from types import MemberDescriptorType
 from typing import Optional, Dict, Any, List, Union
 
 import xbmcgui
@@ -21,7 +23,6 @@ from resources.lib.streams.adaptive import Adaptive
 from resources.lib.proxyinfo import ProxyInfo
 
 
-# Don't make this an MediaItem(object) as it breaks the pickles
 class MediaItem:
     """Main class that represent items that are retrieved in Retrospect. They are used
     to fill the lists and have MediaStreams in this hierarchy:
@@ -33,6 +34,19 @@ class MediaItem:
 
     """
 
+    # The attributes are stored in slots to reduce the memory usage of large listings. Other
+    # attributes (only set by some channels) are stored in the `__dict__`. The pickled state is
+    # still a dict (see `__getstate__`), so all older pickles can be depickled.
+    __slots__ = (
+        "name", "tv_show_title", "url", "actionUrl", "postData", "postJson",
+        "description", "thumb", "fanart", "icon", "poster",
+        "__date", "__timestamp", "__expires_datetime",
+        "dontGroup", "isLive", "cacheToDisc", "isGeoLocked", "isDrmProtected", "isPaid",
+        "season", "episode", "__infoLabels", "complete", "items", "HttpHeaders",
+        "isCloaked", "metaData", "media_type", "content_type", "streams", "subtitle",
+        "__guid", "__guid_value", "__dict__"
+    )
+
     actionUrl: Optional[str]
     cacheToDisc: bool
     complete: bool
@@ -67,6 +81,13 @@ class MediaItem:
     LabelTvShowTitle = "TVShowTitle"
     ExpiresAt = LanguageHelper.get_localized_string(LanguageHelper.ExpiresAt)
 
+    # The version of the compact pickle state (see `__getstate__`) and the default values.
+    __state_version_key = "state_version"
+    __state_version = 1
+    __default_state = None
+    __mutable_state_keys = None
+    __slot_keys = None
+
     #noinspection PyShadowingBuiltins
     def __init__(self, title, url, media_type=mediatype.FOLDER, depickle=False, tv_show_title=None):
         """ Creates a new MediaItem.
@@ -165,6 +186,17 @@ class MediaItem:
 
         return self.__guid_value
 
+    @property
+    def legacy_guid(self):
+        """ Returns the GUID that older versions used for this item: the MD5 of the name and the
+        MD5 of the url. It is only used to find the items of older favourites and Kodi bookmarks.
+
+        :rtype: str
+
+        """
+
+        return "%s%s" % (EncodingHelper.encode_md5(self.name), EncodingHelper.encode_md5(self.url or ""))
+
     def add_stream(self, url, bitrate=0, subtitle=None):
         """ Appends a single stream to  this MediaItem.
 
@@ -708,12 +740,13 @@ class MediaItem:
         return
 
     def __set_guids(self):
-        """ Generates a Unique Identifier based on Time and Random Integers """
+        """ Generates a Unique Identifier based on the name and url of the item. """
 
         try:
-            self.__guid = "%s%s" % (
-                EncodingHelper.encode_md5(self.name), EncodingHelper.encode_md5(self.url or ""))
-            self.__guid_value = int("0x%s" % (self.guid,), 0)
+            digest = hashlib.blake2b(
+                "{}\0{}".format(self.name, self.url or "").encode(), digest_size=16).digest()
+            self.__guid = digest.hex().upper()
+            self.__guid_value = int.from_bytes(digest, "big")
 
             # For live items and search, append a random part to the textual guid, as these items
             # actually have different content for the same URL.
@@ -930,14 +963,51 @@ class MediaItem:
 
         return name
 
+    def __getstate__(self):
+        """ Returns a compact state for pickling: only the values that differ from the values of
+        a new MediaItem are included. The `name`, `url` and `media_type` are always included, so
+        the state can also be depickled by versions that do not know the compact state.
+
+        :return: The state to pickle.
+        :rtype: dict
+
+        """
+
+        defaults = MediaItem.__get_default_state()
+        state = {key: value for key, value in self.__get_values()
+                 if key not in defaults or value != defaults[key]}
+        state["name"] = self.name
+        state["url"] = self.url
+        state["media_type"] = self.media_type
+        state[MediaItem.__state_version_key] = MediaItem.__state_version
+
+        # The guid value can be derived from the guid, unless a random part was added to the guid.
+        if self.__guid and self.__guid_value == int(self.__guid, 16):
+            del state["_MediaItem__guid_value"]
+        return state
+
     def __setstate__(self, state):
         """ Sets the current MediaItem's state based on the pickled value. However, it also adds
         newly added class variables so old items won't brake. This happens with depickling.
 
-        @param dict state: a default Pickle __dict__
+        @param dict state: a default Pickle __dict__ or a compact state from `__getstate__`
 
         """
 
+        if state.pop(MediaItem.__state_version_key, None):
+            # A compact state only contains the values that differ from the defaults.
+            defaults = MediaItem.__get_default_state()
+            values = dict(defaults)
+            for key in MediaItem.__mutable_state_keys:
+                if key not in state:
+                    values[key] = defaults[key].copy()
+            values.update(state)
+            for key, value in values.items():
+                setattr(self, key, value)
+            if self.__guid and not self.__guid_value:
+                self.__guid_value = int(self.__guid, 16)
+            return
+
         # Convert older `MediaItem.type` to the new `mediatype` values.
         media_type = state.get("type")
         if media_type == "audio":
@@ -949,13 +1019,52 @@ class MediaItem:
         elif media_type == "video":
             media_type = mediatype.VIDEO
 
-        m = MediaItem(state["name"], state["url"], media_type=media_type, depickle=False)
-        self.__dict__ = m.__dict__
-        self.__dict__.update(state)
+        MediaItem.__init__(self, state["name"], state["url"], media_type=media_type, depickle=False)
+        for key, value in state.items():
+            setattr(self, key, value)
 
         # Any modification/fixes for older version could be done here
         return
 
+    def __get_values(self):
+        """ Returns all the attributes of the item: the values of the slots and the `__dict__`.
+
+        :return: The (name, value) of each attribute.
+        :rtype: list[tuple[str,Any]]
+
+        """
+
+        if MediaItem.__slot_keys is None:
+            # The names of the slots, with the private names mangled.
+            MediaItem.__slot_keys = [
+                key for key, value in vars(MediaItem).items() if isinstance(value, MemberDescriptorType)]
+
+        values = []
+        for key in MediaItem.__slot_keys:
+            try:
+                values.append((key, getattr(self, key)))
+            except AttributeError:
+                # Not all slots are set while depickling.
+                pass
+        values.extend(self.__dict__.items())
+        return values
+
+    @staticmethod
+    def __get_default_state():
+        """ Returns the state of a new MediaItem, used for the compact pickle state.
+
+        :return: The values of a new MediaItem. These should not be modified.
+        :rtype: dict
+
+        """
+
+        if MediaItem.__default_state is None:
+            defaults = dict(MediaItem("", "").__get_values())
+            MediaItem.__mutable_state_keys = [
+                key for key, value in defaults.items() if isinstance(value, (dict, list))]
+            MediaItem.__default_state = defaults
+        return MediaItem.__default_state
+
     # Because this happens at pickle-time, it could still lead to issues if the __init__() would
     # change. The result for __reduce__() will be the same as with the __setstate_() solution.
     # def __reduce__(self):
@@ -971,6 +1080,8 @@ class MediaItem:
 
 
 class FolderItem(MediaItem):
+    __slots__ = ()
+
     def __init__(self, title, url, content_type, media_type=mediatype.FOLDER, depickle=False):
         """ Creates a new FolderItem.
 
@@ -997,10 +1108,12 @@ class FolderItem(MediaItem):
         self.content_type = content_type
 
 
-# Don't make this an MediaItem(object) as it breaks the pickles
 class MediaStream:
     """Class that represents a Mediastream with <url> and a specific <bitrate>"""
 
+    # See the `MediaItem.__slots__`.
+    __slots__ = ("Url", "Bitrate", "Properties", "Adaptive", "HttpHeaders", "__dict__")
+
     def __init__(self, url, bitrate=0, *args):
         """Initialises a new MediaStream
 
@@ -1037,6 +1150,32 @@ class MediaStream:
         Logger.debug("Adding stream property: %s = %s", name, value)
         self.Properties.append((name, value))
 
+    def __getstate__(self):
+        """ Returns the state for pickling, the same as the `__dict__` of streams without slots.
+
+        :return: The state to pickle.
+        :rtype: dict
+
+        """
+
+        state = {key: getattr(self, key) for key in MediaStream.__slots__[:-1]}
+        state.update(self.__dict__)
+        return state
+
+    def __setstate__(self, state):
+        """ Sets the state of a depickled stream. Values that were added later get their
+        default value if they were not present in older pickles.
+
+        :param dict state: The pickled state.
+
+        """
+
+        self.Properties = []
+        self.Adaptive = False
+        self.HttpHeaders = dict()
+        for key, value in state.items():
+            setattr(self, key, value)
+
     def __eq__(self, other):
         """ Checks 2 items for Equality
 
@@ -7,7 +7,7 @@ import re
 class ParserData(object):
     __slots__ = ["Name", "Match", "PreProcessor", "PostProcessor",
                  "Parser", "Creator", "Updater", "Label",
-                 "IsJson", "MatchType", "LogOnRequired"]
+                 "IsJson", "MatchType", "LogOnRequired", "JsonParser", "__regex"]
 
     # define them here so we can just refer to them instead of using the strings all
     # over the place. The values are self explaining.
@@ -30,8 +30,10 @@ class ParserData(object):
         self.Updater = None
         self.PostProcessor = None
         self.IsJson = False
+        self.JsonParser = None
         self.LogOnRequired = False
         self.MatchType = ParserData.MatchStart
+        self.__regex = None
 
     def is_video_updater_only(self):
         """ Return whether only this instance is used for updating only
@@ -91,7 +93,9 @@ class ParserData(object):
         if self.MatchType == ParserData.MatchExact:
             return url == self.Match
         if self.MatchType == ParserData.MatchRegex:
-            return re.match(self.Match, url, re.DOTALL + re.IGNORECASE) is not None
+            if self.__regex is None:
+                self.__regex = re.compile(self.Match, re.DOTALL | re.IGNORECASE)
+            return self.__regex.match(url) is not None
         else:
             return self.Match in url
 
@@ -0,0 +1,158 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from resources.lib.parserdata import ParserData
+
+# The key in a trie node that holds the rank of the match that ends in that node.
+_END = None
+
+
+class ParserIndex(object):
+    """ Dispatch index to quickly find the DataParser key that matches an URL. """
+
+    # The indexes are shared by all channels with the same DataParser registrations.
+    __indexes = dict()
+    __indexes_lock = threading.Lock()
+
+    def __init__(self, signature: Tuple[Tuple[str, Tuple[str, ...]], ...]):
+        """ Creates an index for the DataParser keys and their match types.
+
+        Like before, the longest key with a matching DataParser wins. Keys with the same length
+        are ranked in the order in which they were registered. The MatchStart and MatchEnd keys
+        are stored in a trie, the Exact keys in a dictionary and the Regex keys are compiled
+        once. So a lookup no longer needs to sort and check all keys.
+
+        :param signature: The keys and their match types, in the order they were registered.
+
+        """
+
+        ordered = sorted((key for key, _ in signature), key=len, reverse=True)
+        ranks = dict((key, rank) for rank, key in enumerate(ordered))
+        self.keys = ordered
+
+        self.__exact = {}                                   # type: Dict[str, int]
+        self.__starts = {}                                  # type: dict
+        self.__ends = {}                                    # type: dict
+        self.__contains = []                                # type: List[Tuple[int, str]]
+        self.__regexes = []                                 # type: List[Tuple[int, re.Pattern]]
+
+        for key, match_types in signature:
+            rank = ranks[key]
+            for match_type in match_types:
+                if match_type == ParserData.MatchStart:
+                    self.__add_to_trie(self.__starts, key, rank)
+                elif match_type == ParserData.MatchEnd:
+                    self.__add_to_trie(self.__ends, key[::-1], rank)
+                elif match_type == ParserData.MatchExact:
+                    self.__exact[key] = rank
+                elif match_type == ParserData.MatchRegex:
+                    self.__regexes.append((rank, re.compile(key, re.DOTALL | re.IGNORECASE)))
+                else:
+                    # Just like ParserData.matches(), anything else is a Contains match.
+                    self.__contains.append((rank, key))
+
+        self.__contains.sort()
+        self.__regexes.sort(key=lambda r: r[0])
+
+    @staticmethod
+    def get_index(data_parsers: Dict[str, List[ParserData]]) -> "ParserIndex":
+        """ Returns the index for the registered DataParsers. Indexes are created only once and
+        are shared between all channel instances with the same registrations.
+
+        :param data_parsers: The DataParsers per key, as registered by a channel.
+
+        :return: The index.
+
+        """
+
+        signature = ParserIndex.get_signature(data_parsers)
+        index = ParserIndex.__indexes.get(signature)
+        if index is not None:
+            return index
+
+        with ParserIndex.__indexes_lock:
+            index = ParserIndex.__indexes.get(signature)
+            if index is None:
+                index = ParserIndex(signature)
+                ParserIndex.__indexes[signature] = index
+            return index
+
+    @staticmethod
+    def get_signature(data_parsers: Dict[str, List[ParserData]]) -> Tuple[Tuple[str, Tuple[str, ...]], ...]:
+        """ Returns the keys and their match types of the registered DataParsers.
+
+        :param data_parsers: The DataParsers per key, as registered by a channel.
+
+        :return: The keys with their distinct match types, in the order they were registered.
+
+        """
+
+        return tuple(
+            (key, tuple(sorted(set(d.MatchType for d in parsers))))
+            for key, parsers in data_parsers.items()
+        )
+
+    def find(self, url: str) -> Optional[str]:
+        """ Finds the longest key that has a DataParser that matches the URL.
+
+        :param url: The URL to match.
+
+        :return: The key or None if no key matches.
+
+        """
+
+        best = len(self.keys)
+
+        rank = self.__exact.get(url)
+        if rank is not None:
+            best = rank
+
+        rank = self.__find_in_trie(self.__starts, url)
+        if rank is not None and rank < best:
+            best = rank
+
+        rank = self.__find_in_trie(self.__ends, url[::-1])
+        if rank is not None and rank < best:
+            best = rank
+
+        for rank, key in self.__contains:
+            if rank >= best:
+                break
+            if key in url:
+                best = rank
+                break
+
+        for rank, regex in self.__regexes:
+            if rank >= best:
+                break
+            if regex.match(url) is not None:
+                best = rank
+                break
+
+        if best == len(self.keys):
+            return None
+        return self.keys[best]
+
+    def __add_to_trie(self, trie: dict, key: str, rank: int) -> None:
+        node = trie
+        for char in key:
+            node = node.setdefault(char, {})
+        node[_END] = rank
+
+    def __find_in_trie(self, trie: dict, value: str) -> Optional[int]:
+        """ Walks the trie and returns the rank of the longest key that is a prefix of value. """
+
+        node = trie
+        rank = node.get(_END)
+        for char in value:
+            node = node.get(char)
+            if node is None:
+                break
+            rank = node.get(_END, rank)
+        return rank
+
+    def __str__(self):
+        return "ParserIndex for {} keys".format(len(self.keys))
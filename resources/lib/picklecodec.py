@@ -0,0 +1,77 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import zlib
+from typing import Callable, Dict, List, Tuple
+
+try:
+    import lzma
+except ImportError:
+    # Python on some Kodi platforms is build without lzma support.
+    lzma = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+# Codecs are named "<name>" or "<name>-<level>", e.g. "zlib-6".
+IDENTITY = "identity"
+ZLIB = "zlib"
+LZMA = "lzma"
+ZSTD = "zstd"
+LZ4 = "lz4"
+
+_codecs: Dict[str, Callable[[int], Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]]] = {
+    IDENTITY: lambda level: (bytes, bytes),
+    ZLIB: lambda level: (lambda data: zlib.compress(data, level), zlib.decompress),
+}
+_default_levels = {ZLIB: 6, LZMA: 0, ZSTD: 3, LZ4: 0}
+
+if lzma is not None:
+    _codecs[LZMA] = lambda level: (lambda data: lzma.compress(data, preset=level), lzma.decompress)
+if zstandard is not None:
+    _codecs[ZSTD] = lambda level: (zstandard.ZstdCompressor(level=level).compress,
+                                   zstandard.ZstdDecompressor().decompress)
+if lz4 is not None:
+    _codecs[LZ4] = lambda level: (lambda data: lz4.frame.compress(data, compression_level=level),
+                                  lz4.frame.decompress)
+
+# The codec for new PickleStore files, based on the numbers of `tests/benchmarks/picklecodecs.py`.
+DEFAULT_CODEC = "zlib-1"
+
+
+def get_codecs() -> List[str]:
+    """ Returns the names of all available codecs, with the levels worth comparing.
+
+    :return: The available codecs, including the `IDENTITY` codec.
+
+    """
+
+    codecs = [IDENTITY, "zlib-1", "zlib-6", "zlib-9"]
+    if lzma is not None:
+        codecs += ["lzma-0", "lzma-6"]
+    if zstandard is not None:
+        codecs += ["zstd-1", "zstd-3", "zstd-9"]
+    if lz4 is not None:
+        codecs += ["lz4-0"]
+    return codecs
+
+
+def get_codec(codec: str) -> Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]:
+    """ Returns the compress and decompress functions for a codec.
+
+    :param codec: The name of the codec, optionally with a level: "zlib" or "zlib-1".
+
+    :return: The compress and decompress functions.
+
+    """
+
+    name, _, level = codec.partition("-")
+    if name not in _codecs:
+        raise ValueError("Codec '{}' is not available".format(codec))
+    return _codecs[name](int(level) if level else _default_levels.get(name, 0))
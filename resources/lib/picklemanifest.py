@@ -0,0 +1,158 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import os
+import sqlite3
+import time
+from typing import Iterable, List, Optional, Tuple
+
+from resources.lib.sqlitepool import SqlitePool
+
+# The schema version that indicates that the existing store files were added to the manifest.
+POPULATED_VERSION = 1
+# The maximum number of idle database connections that are kept open for reuse.
+MAX_IDLE_CONNECTIONS = 2
+
+
+class PickleManifest(object):
+    DatabaseName = "manifest.db"
+
+    def __init__(self, pickles_path: str):
+        """ A manifest of all PickleStore files, so they can be purged without listing and
+        reading all the files.
+
+        For each store it keeps the time it was last written to, the favourites that were kept
+        when it was purged, and if it needs to be compacted. The database is opened in WAL mode, so
+        multiple threads and processes can use it. Threads borrow a connection from a small pool
+        for each operation.
+
+        :param pickles_path: The folder in which the database is stored.
+
+        """
+
+        self.path = os.path.join(pickles_path, PickleManifest.DatabaseName)
+        if not os.path.isdir(pickles_path):
+            os.makedirs(pickles_path)
+
+        self.__pool = SqlitePool(self.path, MAX_IDLE_CONNECTIONS)
+
+        with self.__pool.connection() as connection:
+            self.__create_schema(connection)
+
+    def add(self, store_id: str, dirty: bool = False) -> None:
+        """ Adds a store to the manifest, or marks an existing store as written to now.
+
+        :param store_id:    The id of the store.
+        :param dirty:       Does the store need to be compacted.
+
+        """
+
+        # An existing store no longer contains just the favourites.
+        with self.__pool.connection() as connection:
+            connection.execute(
+                "INSERT INTO stores (store_id, written, favourites, dirty) VALUES (?, ?, NULL, ?) "
+                "ON CONFLICT (store_id) DO UPDATE SET written = excluded.written, favourites = NULL, "
+                "dirty = MAX(dirty, excluded.dirty)", (store_id, time.time(), int(dirty)))
+
+    def add_existing(self, stores: Iterable[Tuple[str, float, bool]]) -> None:
+        """ Adds the stores that existed before the manifest was created.
+
+        :param stores: The id, last write time and dirty flag of each store.
+
+        """
+
+        with self.__pool.connection() as connection:
+            connection.execute("BEGIN")
+            try:
+                connection.executemany(
+                    "INSERT OR IGNORE INTO stores (store_id, written, favourites, dirty) "
+                    "VALUES (?, ?, NULL, ?)",
+                    ((store_id, written, int(dirty)) for store_id, written, dirty in stores))
+                connection.execute("PRAGMA user_version = {}".format(POPULATED_VERSION))
+                connection.execute("COMMIT")
+            except sqlite3.Error:
+                connection.execute("ROLLBACK")
+                raise
+
+    def is_populated(self) -> bool:
+        """ Indicates if the stores that existed before the manifest was created were added. """
+
+        with self.__pool.connection() as connection:
+            row = connection.execute("PRAGMA user_version").fetchone()
+        return row[0] >= POPULATED_VERSION
+
+    def get_expired(self, written_before: float) -> List[Tuple[str, Optional[str]]]:
+        """ Returns the stores that were last written to before a specific time, oldest first.
+
+        :param written_before: The time (in seconds since the epoch).
+
+        :return: The id and the favourites (comma separated, or None if the store contains
+                 more than just favourites) of each store.
+
+        """
+
+        with self.__pool.connection() as connection:
+            return connection.execute(
+                "SELECT store_id, favourites FROM stores WHERE written < ? ORDER BY written",
+                (written_before, )).fetchall()
+
+    def get_dirty(self) -> List[str]:
+        """ Returns the stores that might need to be compacted.
+
+        :return: The ids of the stores.
+
+        """
+
+        with self.__pool.connection() as connection:
+            rows = connection.execute("SELECT store_id FROM stores WHERE dirty = 1").fetchall()
+        return [row[0] for row in rows]
+
+    def set_favourites(self, store_id: str, favourites: str) -> None:
+        """ Marks a store as cleaned: it only contains the favourites and it is new again.
+
+        :param store_id:    The id of the store.
+        :param favourites:  The favourites (comma separated) that were kept.
+
+        """
+
+        with self.__pool.connection() as connection:
+            connection.execute(
+                "UPDATE stores SET written = ?, favourites = ?, dirty = 0 WHERE store_id = ?",
+                (time.time(), favourites, store_id))
+
+    def set_clean(self, store_id: str) -> None:
+        """ Marks a store as compacted.
+
+        :param store_id: The id of the store.
+
+        """
+
+        with self.__pool.connection() as connection:
+            connection.execute("UPDATE stores SET dirty = 0 WHERE store_id = ?", (store_id, ))
+
+    def remove(self, store_id: str) -> None:
+        """ Removes a store from the manifest.
+
+        :param store_id: The id of the store.
+
+        """
+
+        with self.__pool.connection() as connection:
+            connection.execute("DELETE FROM stores WHERE store_id = ?", (store_id, ))
+
+    def close(self) -> None:
+        """ Closes all idle database connections. """
+
+        self.__pool.close()
+
+    def __create_schema(self, connection: sqlite3.Connection) -> None:
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS stores ("
+            "store_id TEXT PRIMARY KEY NOT NULL, "
+            "written REAL NOT NULL, "
+            "favourites TEXT, "
+            "dirty INTEGER NOT NULL)")
+        connection.execute("CREATE INDEX IF NOT EXISTS ix_stores_written ON stores (written)")
+        connection.execute("CREATE INDEX IF NOT EXISTS ix_stores_dirty ON stores (dirty)")
+
+    def __str__(self):
+        return "PickleStore manifest [{}]".format(self.path)
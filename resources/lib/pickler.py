@@ -5,12 +5,16 @@ import os
 import io
 import sys
 import base64
+import threading
+import zlib
 from functools import reduce
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, Optional
 
 from resources.lib.regexer import Regexer
 from resources.lib.logger import Logger
 from resources.lib.mediaitem import MediaItem
+from resources.lib.picklemanifest import PickleManifest
+from resources.lib.picklestore import PickleStoreFile
 
 
 class Pickler:
@@ -33,6 +37,18 @@ class Pickler:
     }
 
     __store_separator = "--"
+    # The length of the guids of the older MediaItems (two MD5 hashes)
+    __legacy_guid_length = 64
+    # Pickles that are compressed with a preset dictionary start with "z<version>.". Normal pickles
+    # always start with "gA" (the Base64 of the pickle protocol opcode), so both can be decoded.
+    # The Base64 uses "." and "_" instead of "+" and "/", so they do not need URL encoding and
+    # never contain the store separator.
+    __dictionary_version = 1
+    __dictionary_prefix = "z"
+    __dictionary_altchars = b"._"
+    __dictionaries: Dict[int, bytes] = {}
+    # The number of appended indexes after which a store is compacted.
+    __max_store_indexes = 10
 
     def __init__(self, pickle_store_path=None):
         # store some vars for speed optimization
@@ -40,11 +56,20 @@ class Pickler:
         self.__depickle_container = dict()  # : storage for depickled items.
 
         self.__pickle_store_path: str = pickle_store_path
+        # Deferred stores run on background threads, one at a time.
+        self.__store_threads: List[threading.Thread] = []
+        self.__store_lock = threading.Lock()
+        # The manifest of all stores, it is opened when it is first needed.
+        self.__manifest: Optional[PickleManifest] = None
+        self.__manifest_lock = threading.Lock()
+        # New stores are written as indexed PickleStore files, the old (compressed) stores are
+        # only read.
+        self.__ext = "store.i"
         self.__compress = True
         if self.__compress:
-            self.__ext = "store.z"
+            self.__legacy_ext = "store.z"
         else:
-            self.__ext = "store"
+            self.__legacy_ext = "store"
 
     def de_pickle_child_items(self, hex_string: str) -> Tuple[str, Dict[str, List[MediaItem]]]:
         """ De-serializes a serialized mediaitem.
@@ -82,6 +107,9 @@ class Pickler:
             sys.modules['mediaitem'] = resources.lib.mediaitem
 
         hex_string = hex_string.rstrip(' ')
+        if hex_string.startswith(Pickler.__dictionary_prefix):
+            return self.__de_pickle_with_dictionary(hex_string)
+
         hex_string = reduce(lambda x, y: x.replace(y, Pickler.__Base64CharsDecode[y]),
                             Pickler.__Base64CharsDecode.keys(),
                             hex_string)
@@ -92,20 +120,29 @@ class Pickler:
         pickle_item = pickle.loads(pickle_string)  # type: MediaItem
         return pickle_item
 
-    def pickle_media_item(self, item: MediaItem) -> str:
+    def pickle_media_item(self, item: MediaItem, use_dictionary: bool = False) -> str:
         """ Serialises a mediaitem using Pickle
 
-        :param item: The item that should be serialised
+        :param item:            The item that should be serialised
+        :param use_dictionary:  Compress the pickle using the preset dictionary that is shipped
+                                with the add-on. It results in a shorter string, but older
+                                versions of the add-on cannot decode it.
 
         :return: A pickled and Base64 encoded serialization of the `item`.
 
         """
 
-        if item.guid in self.__pickle_container:
+        cache_key = (item.guid, use_dictionary)
+        if cache_key in self.__pickle_container:
             Logger.trace("Pickle Container cache hit: %s", item.guid)
-            return self.__pickle_container[item.guid]
+            return self.__pickle_container[cache_key]
 
         pickle_string = pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL)  # type: bytes
+        if use_dictionary:
+            hex_string = self.__pickle_with_dictionary(pickle_string)
+            self.__pickle_container[cache_key] = hex_string
+            return hex_string
+
         hex_bytes = base64.b64encode(pickle_string)  # type: bytes
         hex_string = hex_bytes.decode()  # type: str
 
@@ -114,14 +151,18 @@ class Pickler:
                             Pickler.__Base64CharsEncode.keys(),
                             hex_string)
 
-        self.__pickle_container[item.guid] = hex_string
+        self.__pickle_container[cache_key] = hex_string
         return hex_string
 
-    def purge_store(self, addon_id: str, age: int = 30):
-        """ Purges all files older than xx days.
+    def purge_store(self, addon_id: str, age: int = 30, time_budget: Optional[float] = None):
+        """ Purges all stores that were not written to for xx days and compacts the remaining
+        indexed stores that were changed. The stores are found using the manifest, so only the expired and changed
+        stores are opened.
 
-        :param str addon_id: The ID of this add-on
-        :param int age:      The age (in days) for pickles to be purged
+        :param str addon_id:        The ID of this add-on
+        :param int age:             The age (in days) for pickles to be purged
+        :param float time_budget:   The maximum duration (in seconds) of the purge. The remaining
+                                    stores are purged the next time.
 
         """
 
@@ -130,54 +171,100 @@ class Pickler:
 
         Logger.info("PickleStore: Purging store items older than %d days", age)
 
+        # Local imports to increase speed
+        import time
+
+        start = time.perf_counter()
+        deadline = None if time_budget is None else start + time_budget
+        manifest = self.__get_manifest()
+
         # Retrieve the store_id's for the favourites
         favourite_pickle_stores = self.__get_kodi_favourites(addon_id)
 
-        # Local imports to increase speed
-        import glob
-        import time
+        purged = 0
+        for pickle_store_id, kept_favourites in manifest.get_expired(time.time() - age * 24 * 60 * 60):
+            if deadline is not None and time.perf_counter() > deadline:
+                Logger.info("PickleStore: Purge stopped after %d stores, the time budget was used", purged)
+                return
+
+            with self.__store_lock:
+                self.__purge_store_file(
+                    manifest, pickle_store_id, kept_favourites, favourite_pickle_stores.get(pickle_store_id))
+            purged += 1
+
+        compacted = 0
+        for pickle_store_id in manifest.get_dirty():
+            if deadline is not None and time.perf_counter() > deadline:
+                Logger.info("PickleStore: Compacting stopped after %d stores, the time budget was used", compacted)
+                return
+
+            self.__compact_store(manifest, pickle_store_id)
+            compacted += 1
+
+        Logger.debug("PickleStore: Purged %d and checked %d stores in %.1f ms",
+                     purged, compacted, (time.perf_counter() - start) * 1000)
+
+    def defer_purge_store(self, addon_id: str, age: int = 30, time_budget: Optional[float] = None) -> None:
+        """ Purges the stores on a background thread. Use `wait_for_stores` to make sure the
+        purge was finished.
+
+        :param str addon_id:        The ID of this add-on
+        :param int age:             The age (in days) for pickles to be purged
+        :param float time_budget:   The maximum duration (in seconds) of the purge.
+
+        """
+
+        def __purge():
+            try:
+                self.purge_store(addon_id, age, time_budget)
+            except:
+                Logger.error("PickleStore: Error purging stores", exc_info=True)
+
+        self.__start_store_thread(__purge)
+
+    def defer_store_media_items(self, store_guid: str, parent: MediaItem, children: List[MediaItem]) -> None:
+        """ Store the MediaItems in the given store path uncompressed, which is fast. The items are
+        available as soon as this method returns, as Kodi might start a new plugin call for one of
+        them right away. The store is marked as changed, so it is compacted (compressed) by the
+        next `purge_store`, within its time budget.
+
+        Errors are logged and not raised.
+
+        :param store_guid:  The guid used for storage
+        :param parent:      The parent item
+        :param children:    The child items
+
+        """
 
-        pickles_path = os.path.join(
-            self.__pickle_store_path, "pickles", "*", "*", "*.{}".format(self.__ext))
-
-        cache_time = age * 24 * 60 * 60
-        for filename in glob.glob(pickles_path):
-            create_time = os.path.getctime(filename)
-            pickle_store_id = os.path.split(filename)[1].split(".", 1)[0]
-            if create_time + cache_time < time.time():
-                if pickle_store_id in favourite_pickle_stores:
-                    Logger.debug("PickleStore: Advanced cleaning of favourite '%s'", filename)
-                    pickle_favs = favourite_pickle_stores[pickle_store_id]
-
-                    # Clear all but the favourites.
-                    pickles_dir, pickles_path = self.__get_pickle_path(pickle_store_id)
-
-                    # Update the content and save it.
-                    content = self.__load_pickle_store_file(pickles_path)
-                    store_children: dict = content["children"]
-                    content["favourites"] = pickle_favs
-                    content["children"] = {k: v for k, v in store_children.items() if k in pickle_favs}
-                    self.__save_pickle_store_file(content, pickles_path)
-
-                    Logger.debug(
-                        "PickleStore Clean Result: %d children, %d favourites",
-                        len(content["children"]),
-                        len(content.get("favourites", []))
-                    )
-                    continue
-
-                os.remove(filename)
-                Logger.debug("PickleStore: Removed file '%s'", filename)
-
-    def store_media_items(self, store_guid: str, parent: MediaItem, children: List[MediaItem]) -> None:
+        try:
+            self.store_media_items(store_guid, parent, children, compress=False)
+        except:
+            Logger.error("PickleStore: Error storing items for '%s'", store_guid, exc_info=True)
+
+    def wait_for_stores(self) -> None:
+        """ Waits for the deferred purges to finish. """
+
+        while self.__store_threads:
+            self.__store_threads.pop(0).join()
+
+    def store_media_items(self, store_guid: str, parent: MediaItem, children: List[MediaItem],
+                          compress: bool = True) -> None:
         """ Store the MediaItems in the given store path
 
         :param store_guid:  The guid used for storage
         :param parent:      The parent item
         :param children:    The child items
+        :param compress:    Compress the items. Uncompressed items are stored a lot faster and
+                            are compressed once the store is compacted.
 
         """
 
+        with self.__store_lock:
+            self.__store_media_items(store_guid, parent, children, compress)
+
+    def __store_media_items(self, store_guid: str, parent: MediaItem, children: List[MediaItem],
+                            compress: bool) -> None:
+
         if self.__pickle_store_path is None:
             raise ValueError("Cannot find pickle store path")
 
@@ -199,11 +286,23 @@ class Pickler:
             "children": {item.guid: item for item in children}
         }
 
+        # Existing indexed stores only get the new and changed items appended. They are
+        # compacted by the `purge_store` method.
+        if os.path.isfile(pickles_path):
+            try:
+                appended = PickleStoreFile(pickles_path).append(current_content, compress)
+                # Even when nothing changed, the store is still in use.
+                self.__get_manifest().add(store_guid.lower(), dirty=appended > 0)
+                return
+            except:
+                Logger.error("PickleStore: Error appending to '%s'", pickles_path, exc_info=True)
+
         # If there was previous content create a combined list, but keep
         # track of the favourite items' GUIDs.
-        if os.path.isfile(pickles_path):
-            Logger.debug("PickleStore: Merging '%s'", pickles_path)
-            prevous_content = self.__load_pickle_store_file(pickles_path) or {}
+        previous_path = self.__get_existing_pickle_path(store_guid)
+        if previous_path:
+            Logger.debug("PickleStore: Merging '%s'", previous_path)
+            prevous_content = self.__load_pickle_store_file(previous_path) or {}
             prev_children = prevous_content.get("children", {})
             if prev_children:
                 # Combine the previous children and update it with the new ones as
@@ -222,7 +321,11 @@ class Pickler:
                 len(current_content.get("favourites", []))
             )
 
-        self.__save_pickle_store_file(current_content, pickles_path)
+        self.__save_pickle_store_file(current_content, pickles_path, compress)
+        if previous_path and previous_path != pickles_path:
+            # The old store was converted into the new format.
+            os.remove(previous_path)
+        self.__get_manifest().add(store_guid.lower(), dirty=not compress)
 
     def is_pickle_store_id(self, pickle):
         """ Checks if a Pickle string is an actual pickle or a reference to a PickleStore entry
@@ -240,7 +343,10 @@ class Pickler:
             items = content.get("children")
             return items
 
-        pickles_dir, pickles_path = self.__get_pickle_path(store_guid)
+        pickles_path = self.__get_existing_pickle_path(store_guid)
+        if not pickles_path:
+            return None
+
         content = self.__load_pickle_store_file(pickles_path)
         if not content:
             return None
@@ -251,21 +357,243 @@ class Pickler:
 
     def __retrieve_media_item_from_store(self, storage_location: str) -> MediaItem:
         store_guid, item_guid = storage_location.split(Pickler.__store_separator)
+        item = self.__retrieve_media_item_by_guid(store_guid, item_guid)
+        if item is None and len(item_guid) >= Pickler.__legacy_guid_length:
+            # Older favourites and Kodi bookmarks can refer to items using their legacy guid.
+            item = self.__retrieve_media_item_by_legacy_guid(store_guid, item_guid)
+        return item
+
+    def __retrieve_media_item_by_guid(self, store_guid: str, item_guid: str) -> Optional[MediaItem]:
+        content = self.__depickle_container.get(store_guid)
+        if content:
+            return content["children"].get(item_guid)
+
+        # Indexed stores allow us to only read the requested item.
+        pickles_dir, pickles_path = self.__get_pickle_path(store_guid)
+        if os.path.isfile(pickles_path):
+            Logger.debug("PickleStore: Reading item '%s' from '%s'", item_guid, pickles_path)
+            try:
+                return PickleStoreFile(pickles_path).read_item(item_guid)
+            except:
+                Logger.error("Error opening '%s'", pickles_path, exc_info=True)
+                return None
+
         items = self.__retrieve_media_items_from_store(store_guid)
+        if not items:
+            return None
 
         item_pickle = items.get(item_guid)
         return item_pickle
 
-    def __get_pickle_path(self, store_guid) -> Tuple[str, str]:
+    def __retrieve_media_item_by_legacy_guid(self, store_guid: str, legacy_guid: str) -> Optional[MediaItem]:
+        """ Finds an item using the guid that older versions used (see `MediaItem.legacy_guid`).
+        As it is rarely needed, the legacy guids are not stored, but calculated for all items in
+        the store.
+
+        :param store_guid:  The guid of the store.
+        :param legacy_guid: The legacy guid of the item.
+
+        :return: The item or None if it was not found.
+
+        """
+
+        items = self.__retrieve_media_items_from_store(store_guid)
+        if not items:
+            return None
+
+        # The random part of live items is not stored and is ignored.
+        legacy_guid = legacy_guid[:Pickler.__legacy_guid_length]
+        for item in items.values():
+            if item.legacy_guid == legacy_guid:
+                Logger.debug("PickleStore: Found item '%s' for legacy guid '%s'", item.guid, legacy_guid)
+                return item
+        return None
+
+    def __pickle_with_dictionary(self, pickle_string: bytes) -> str:
+        version = Pickler.__dictionary_version
+        compressor = zlib.compressobj(zlib.Z_BEST_COMPRESSION, zdict=self.__get_dictionary(version))
+        data = compressor.compress(pickle_string) + compressor.flush()
+        # The padding is not needed to decode it.
+        hex_string = base64.b64encode(data, altchars=Pickler.__dictionary_altchars).decode().rstrip("=")
+        return "{}{}.{}".format(Pickler.__dictionary_prefix, version, hex_string)
+
+    def __de_pickle_with_dictionary(self, hex_string: str) -> MediaItem:
+        Logger.trace("DePickle: Dictionary pickle: %s (might be truncated)", hex_string[0:256])
+
+        version, _, hex_string = hex_string[len(Pickler.__dictionary_prefix):].partition(".")
+        data = base64.b64decode(hex_string + "=" * (-len(hex_string) % 4),
+                                altchars=Pickler.__dictionary_altchars)
+        decompressor = zlib.decompressobj(zdict=self.__get_dictionary(int(version)))
+        pickle_item = pickle.loads(decompressor.decompress(data) + decompressor.flush())  # type: MediaItem
+        return pickle_item
+
+    def __get_dictionary(self, version: int) -> bytes:
+        """ Returns the zlib preset dictionary for URL pickles, see `tests/benchmarks/pickledictionary.py`.
+
+        :param version: The version of the dictionary.
+
+        :return: The dictionary.
+
+        """
+
+        dictionary = Pickler.__dictionaries.get(version)
+        if dictionary is None:
+            from resources.lib.retroconfig import Config
+
+            path = os.path.join(Config.rootDir, "resources", "data", "pickle.v{}.zdict".format(version))
+            with io.open(path, "rb") as fp:
+                dictionary = fp.read()
+            Pickler.__dictionaries[version] = dictionary
+        return dictionary
+
+    def __get_existing_pickle_path(self, store_guid: str) -> Optional[str]:
+        """ Returns the path of the store file, either in the indexed or the old format.
+
+        :param store_guid: The guid used for storage.
+
+        :return: The path of the store file or None if it did not exist.
+
+        """
+
+        for ext in (self.__ext, self.__legacy_ext):
+            pickles_dir, pickles_path = self.__get_pickle_path(store_guid, ext)
+            if os.path.isfile(pickles_path):
+                return pickles_path
+        return None
+
+    def __get_pickle_path(self, store_guid: str, ext: Optional[str] = None) -> Tuple[str, str]:
         # file storage is always lower case
         store_guid = store_guid.lower()
-        pickles_file = "{}.{}".format(store_guid, self.__ext)
+        pickles_file = "{}.{}".format(store_guid, ext or self.__ext)
 
         pickles_dir = os.path.join(
             self.__pickle_store_path, "pickles", store_guid[0:2], store_guid[2:4])
         pickles_path = os.path.join(pickles_dir, pickles_file)
         return pickles_dir, pickles_path
 
+    def __start_store_thread(self, target) -> None:
+        thread = threading.Thread(target=target, name="PickleStore")
+        self.__store_threads.append(thread)
+        thread.start()
+
+    def __get_manifest(self) -> PickleManifest:
+        """ Opens the manifest. The first time, the stores that already existed are added.
+
+        :return: The manifest of the stores.
+
+        """
+
+        with self.__manifest_lock:
+            if self.__manifest is not None:
+                return self.__manifest
+
+            manifest = PickleManifest(os.path.join(self.__pickle_store_path, "pickles"))
+            if not manifest.is_populated():
+                import glob
+
+                Logger.info("PickleStore: Adding the existing stores to %s", manifest)
+                pickles_paths = [
+                    os.path.join(self.__pickle_store_path, "pickles", "*", "*", "*.{}".format(ext))
+                    for ext in (self.__ext, self.__legacy_ext)
+                ]
+                manifest.add_existing(
+                    (os.path.split(filename)[1].split(".", 1)[0],
+                     os.path.getmtime(filename),
+                     filename.endswith(self.__ext))
+                    for path in pickles_paths for filename in glob.glob(path)
+                )
+
+            self.__manifest = manifest
+            return manifest
+
+    def __purge_store_file(self, manifest: PickleManifest, pickle_store_id: str,
+                           kept_favourites: Optional[str], pickle_favs: Optional[List[str]]) -> None:
+        """ Purges an expired store: it is removed, or, if it has favourites, it is cleaned.
+
+        :param manifest:            The manifest of the stores.
+        :param pickle_store_id:     The id of the store.
+        :param kept_favourites:     The favourites (comma separated) the store was cleaned to.
+        :param pickle_favs:         The current favourites in the store.
+
+        """
+
+        filename = self.__get_existing_pickle_path(pickle_store_id)
+        if filename is None:
+            manifest.remove(pickle_store_id)
+            return
+
+        if not pickle_favs:
+            PickleStoreFile(filename).remove()
+            manifest.remove(pickle_store_id)
+            Logger.debug("PickleStore: Removed file '%s'", filename)
+            return
+
+        favourites = ",".join(sorted(pickle_favs))
+        if favourites == kept_favourites:
+            # Nothing changed since it was cleaned.
+            manifest.set_favourites(pickle_store_id, favourites)
+            return
+
+        Logger.debug("PickleStore: Advanced cleaning of favourite '%s'", filename)
+
+        # Update the content and save it.
+        content = self.__load_pickle_store_file(filename)
+        if content is None:
+            PickleStoreFile(filename).remove()
+            manifest.remove(pickle_store_id)
+            return
+
+        # Clear all but the favourites.
+        pickles_dir, pickles_path = self.__get_pickle_path(pickle_store_id)
+        store_children: dict = content["children"]
+        content["favourites"] = pickle_favs
+        content["children"] = {k: v for k, v in store_children.items() if k in pickle_favs}
+        self.__save_pickle_store_file(content, pickles_path)
+        if filename != pickles_path:
+            PickleStoreFile(filename).remove()
+        manifest.set_favourites(pickle_store_id, favourites)
+
+        Logger.debug(
+            "PickleStore Clean Result: %d children, %d favourites",
+            len(content["children"]),
+            len(content.get("favourites", []))
+        )
+
+    def __compact_store(self, manifest: PickleManifest, pickle_store_id: str) -> None:
+        """ Compacts a store that was changed, if needed, and marks it as clean.
+
+        :param manifest:            The manifest of the stores.
+        :param pickle_store_id:     The id of the store.
+
+        """
+
+        with self.__store_lock:
+            pickles_dir, pickles_path = self.__get_pickle_path(pickle_store_id)
+            if os.path.isfile(pickles_path):
+                self.__compact_store_file(pickles_path)
+            manifest.set_clean(pickle_store_id)
+
+    def __compact_store_file(self, pickles_path: str) -> None:
+        """ Compacts an indexed store file if more than half of it is no longer used, if the
+        items were appended too many times or if it contains uncompressed items.
+
+        :param pickles_path: The path of the store file.
+
+        """
+
+        try:
+            store = PickleStoreFile(pickles_path)
+            usage = store.get_usage()
+            if usage.unused * 2 <= usage.size and usage.indexes <= Pickler.__max_store_indexes \
+                    and not usage.uncompressed:
+                return
+
+            Logger.debug("PickleStore: Compacting '%s' (%d of %d bytes unused, %d indexes, %d uncompressed)",
+                         pickles_path, usage.unused, usage.size, usage.indexes, usage.uncompressed)
+            store.compact()
+        except:
+            Logger.error("PickleStore: Error compacting '%s'", pickles_path, exc_info=True)
+
     def __get_kodi_favourites(self, addon_id: str) -> Dict[str, List[str]]:
         """ Retrieves the PickleStore ID's corresponding to Kodi Favourites using the json RPC
 
@@ -323,22 +651,16 @@ class Pickler:
 
         return favourite_pickle_stores
 
-    def __save_pickle_store_file(self, current_content: dict, pickles_path: str):
+    def __save_pickle_store_file(self, current_content: dict, pickles_path: str, compress: bool = True):
         Logger.debug("PickleStore: Storing items into '%s'", pickles_path)
-        if self.__compress:
-            pickle_content = pickle.dumps(current_content, protocol=pickle.HIGHEST_PROTOCOL)
-            import zlib
-            with io.open(pickles_path, 'wb+') as fp:
-                fp.write(zlib.compress(pickle_content, zlib.Z_BEST_COMPRESSION))
-        else:
-            with io.open(pickles_path, "wb+") as fp:
-                pickle.dump(current_content, fp, protocol=pickle.HIGHEST_PROTOCOL)
+        PickleStoreFile(pickles_path).write(current_content, compress)
 
     def __load_pickle_store_file(self, pickles_path: str):
         Logger.debug("PickleStore: Reading items from '%s'", pickles_path)
         try:
-            if self.__compress:
-                import zlib
+            if pickles_path.endswith(self.__ext):
+                content = PickleStoreFile(pickles_path).read()
+            elif self.__compress:
                 with io.open(pickles_path, 'rb') as fp:
                     pickle_bytes = zlib.decompress(fp.read())
                     content = pickle.loads(pickle_bytes)
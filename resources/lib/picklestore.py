@@ -0,0 +1,489 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import hashlib
+import io
+import os
+import pickle
+import struct
+import tempfile
+import zlib
+from collections import namedtuple
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, TYPE_CHECKING
+
+from resources.lib import picklecodec
+from resources.lib.logger import Logger
+
+if TYPE_CHECKING:
+    from resources.lib.mediaitem import MediaItem
+
+# The layout of a PickleStore file is:
+#
+#   header | record | record | ... | index | footer [| record | ... | index | footer]
+#
+# The header contains the MAGIC and the name of the codec (see `picklecodec`) of the records.
+# Each record is an independently compressed (or, for fast writes, uncompressed) pickle of a
+# single MediaItem. The index is a compressed pickle of a dict with the offset, length, digest and
+# compression of the parent and the child records (by guid) and the favourites. The footer
+# contains the offset and length of the index. This allows a single item to be read without
+# decoding all the other items. HTTP headers that are used by multiple items are stored once, in
+# the "headers" of the index, and are referenced from the records.
+#
+# New and changed items are appended to the end of the file, followed by a delta index that only
+# contains those items and a reference to the "previous" index. The last footer always points to
+# the most recent index. Records that are no longer referenced are removed when the file is
+# compacted.
+#
+# Appending and compacting is done while holding an OS-level lock on the file, so writers in other
+# processes do not overwrite each other's records. Readers do not need the lock. On Windows, a file
+# cannot be replaced while it is opened, so a separate lock file (LOCK_EXT) next to the store is
+# locked instead, which stays locked until the compacted store replaced the store file.
+MAGIC = b"RPS2"
+HEADER = struct.Struct(">4sB")
+FOOTER = struct.Struct(">QI4s")
+DIGEST_SIZE = 8
+LOCK_EXT = ".lock"
+
+StoreUsage = namedtuple("StoreUsage", ["unused", "size", "indexes", "uncompressed"])
+
+
+class PickleStoreFile(object):
+    def __init__(self, path: str, codec: str = picklecodec.DEFAULT_CODEC):
+        """ A PickleStore file with an index, so items can be read individually.
+
+        :param path:    The path of the file.
+        :param codec:   The codec for newly written files. Existing files keep using the codec
+                        they were written with, until they are compacted.
+
+        """
+
+        self.path = path
+        self.codec = codec
+
+    def read_item(self, guid: str) -> Optional['MediaItem']:
+        """ Reads a single child item from the store.
+
+        :param guid: The guid of the item.
+
+        :return: The item or None if it was not present.
+
+        """
+
+        with io.open(self.path, "rb") as fp:
+            decompress = self.__read_header(fp)[1]
+            # The most recent index that contains the item, has the most recent record.
+            for index, _ in self.__read_indexes(fp):
+                location = index["children"].get(guid)
+                if location is not None:
+                    return self.__read_record(fp, location, decompress, index.get("headers"))
+        return None
+
+    def read(self) -> dict:
+        """ Reads the complete store.
+
+        :return: A dict with the "parent", the "children" (by guid) and the "favourites".
+
+        """
+
+        with io.open(self.path, "rb") as fp:
+            decompress = self.__read_header(fp)[1]
+            index = self.__merge_indexes(list(self.__read_indexes(fp)))
+            parent = None
+            if index["parent"] is not None:
+                parent = self.__read_record(fp, index["parent"], decompress, index["headers"])
+
+            children = {
+                guid: self.__read_record(fp, location, decompress, index["headers"])
+                for guid, location in index["children"].items()
+            }
+
+        content = {"parent": parent, "children": children}
+        if index.get("favourites"):
+            content["favourites"] = index["favourites"]
+        return content
+
+    def write(self, content: dict, compress: bool = True) -> None:
+        """ Writes the complete store. The file is written to a temporary file first, which
+        then replaces the existing file.
+
+        :param content:     A dict with the "parent", the "children" (by guid) and optionally the
+                            "favourites".
+        :param compress:    Compress the records with the codec of the store.
+
+        """
+
+        temp_path, count = self.__write_temp_file(content, compress)
+        self.__replace(temp_path)
+        Logger.debug("PickleStore: Wrote %d children to '%s'", count, self.path)
+
+    def append(self, content: dict, compress: bool = True) -> int:
+        """ Appends the new and changed items to an existing store. Items that are unchanged
+        are not written again.
+
+        :param content:     A dict with the "parent" and the "children" (by guid).
+        :param compress:    Compress the records with the codec that the store was written with.
+
+        :return: The number of records that were appended.
+
+        """
+
+        with self.__lock("r+b") as fp:
+            if self.__is_current_file(fp):
+                changed, size = self.__append(fp, content, compress)
+            else:
+                changed = None
+
+        if changed is None:
+            # It was compacted (replaced) while waiting for the lock.
+            return self.append(content, compress)
+
+        if changed:
+            Logger.debug("PickleStore: Appended %d records (%d bytes) to '%s'", changed, size, self.path)
+        return changed
+
+    def get_usage(self) -> StoreUsage:
+        """ Determines how much of the file is no longer used.
+
+        :return: The number of unused bytes, the total size of the file, the number of indexes
+                 and the number of uncompressed records.
+
+        """
+
+        with io.open(self.path, "rb") as fp:
+            self.__read_header(fp)
+            header_size = fp.tell()
+            indexes = list(self.__read_indexes(fp))
+            index = self.__merge_indexes(indexes)
+            size = fp.seek(0, io.SEEK_END)
+
+        locations = [location for location in list(index["children"].values()) + [index["parent"]]
+                     if location is not None]
+        used = header_size + FOOTER.size + sum(length for _, length in indexes)
+        used += sum(location[1] for location in locations)
+        uncompressed = sum(1 for location in locations if not location[3])
+        return StoreUsage(size - used, size, len(indexes), uncompressed)
+
+    def compact(self) -> None:
+        """ Rewrites the store with a single index, compressed records and without the unused
+        records. Items that other processes append meanwhile, are not lost.
+
+        """
+
+        with self.__lock("rb") as fp:
+            if self.__is_current_file(fp):
+                temp_path, count = self.__write_temp_file(self.read(), True)
+                if os.name == "nt":
+                    # Windows cannot replace a file that is still opened. The lock file keeps
+                    # it locked.
+                    fp.close()
+                self.__replace(temp_path)
+            else:
+                count = None
+
+        if count is None:
+            # It was compacted (replaced) while waiting for the lock.
+            self.compact()
+            return
+
+        Logger.debug("PickleStore: Compacted %d children in '%s'", count, self.path)
+
+    def remove(self) -> None:
+        """ Removes the store file and its lock file (if any). """
+
+        os.remove(self.path)
+        try:
+            os.remove(self.path + LOCK_EXT)
+        except FileNotFoundError:
+            pass
+
+    def __replace(self, temp_path: str) -> None:
+        """ Replaces the store file with a temporary file, or removes the temporary file if
+        that failed.
+
+        :param temp_path: The path of the temporary file.
+
+        """
+
+        try:
+            os.replace(temp_path, self.path)
+        except:
+            os.remove(temp_path)
+            raise
+
+    @contextmanager
+    def __lock(self, mode: str):
+        """ Opens the store file and holds an exclusive OS-level lock on it for the duration of
+        the `with` block. It waits for the lock if another thread or process holds it.
+
+        On Windows, the lock file of the store is locked and opened before the store file, and
+        it is only unlocked after the store file was closed, so the store file can be replaced
+        while the lock is held.
+
+        :param mode: The mode to open the store file with.
+
+        :return: The opened store file.
+        :rtype: io.RawIOBase
+
+        """
+
+        if os.name == "nt":
+            import msvcrt
+
+            with io.open(self.path + LOCK_EXT, "ab") as lock_fp:
+                # LK_LOCK retries for 10 seconds before it raises an OSError.
+                lock_fp.seek(0)
+                msvcrt.locking(lock_fp.fileno(), msvcrt.LK_LOCK, 1)
+                try:
+                    with io.open(self.path, mode) as fp:
+                        yield fp
+                finally:
+                    lock_fp.seek(0)
+                    msvcrt.locking(lock_fp.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            with io.open(self.path, mode) as fp:
+                fcntl.flock(fp.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield fp
+                finally:
+                    fcntl.flock(fp.fileno(), fcntl.LOCK_UN)
+
+    def __is_current_file(self, fp: io.RawIOBase) -> bool:
+        """ Checks if the opened file is still the store file, and was not replaced.
+
+        :param fp: The opened store file.
+
+        """
+
+        try:
+            return os.path.samestat(os.fstat(fp.fileno()), os.stat(self.path))
+        except FileNotFoundError:
+            return False
+
+    def __append(self, fp: io.RawIOBase, content: dict, compress: bool) -> Tuple[int, int]:
+        """ Appends the new and changed items to the opened (and locked) store.
+
+        :param fp:          The opened store file.
+        :param content:     A dict with the "parent" and the "children" (by guid).
+        :param compress:    Compress the records with the codec that the store was written with.
+
+        :return: The number of records and bytes that were appended.
+
+        """
+
+        compressor = self.__read_header(fp)[0] if compress else None
+        current = self.__merge_indexes(list(self.__read_indexes(fp)))
+        end = fp.seek(0, io.SEEK_END)
+
+        parent = content.get("parent")
+        children = content.get("children", {})
+        shared = self.__get_shared_headers([parent] + list(children.values()))
+
+        # Collect all changes first, so they are appended with a single write.
+        buffer = io.BytesIO()
+        index = {
+            "parent": None,
+            "children": {},
+            "favourites": current.get("favourites"),
+            "headers": dict(shared.values()),
+            "previous": self.__read_footer(fp)
+        }
+
+        if parent is not None:
+            location = self.__write_record(buffer, parent, compressor, shared, end, current["parent"])
+            if location is not current["parent"]:
+                index["parent"] = location
+
+        for guid, item in children.items():
+            previous = current["children"].get(guid)
+            location = self.__write_record(buffer, item, compressor, shared, end, previous)
+            if location is not previous:
+                index["children"][guid] = location
+
+        changed = len(index["children"]) + int(index["parent"] is not None)
+        if not changed:
+            return 0, 0
+
+        self.__write_index(buffer, index, end)
+        fp.seek(end)
+        try:
+            fp.write(buffer.getbuffer())
+            fp.flush()
+        except:
+            fp.truncate(end)
+            raise
+        return changed, buffer.tell()
+
+    def __write_temp_file(self, content: dict, compress: bool) -> Tuple[str, int]:
+        """ Writes the complete store to a temporary file next to the store.
+
+        :param content:     A dict with the "parent", the "children" (by guid) and optionally the
+                            "favourites".
+        :param compress:    Compress the records with the codec of the store.
+
+        :return: The path of the temporary file and the number of children.
+
+        """
+
+        compressor = picklecodec.get_codec(self.codec)[0] if compress else None
+        children = content.get("children", {})
+        shared = self.__get_shared_headers([content.get("parent")] + list(children.values()))
+        folder = os.path.dirname(self.path)
+        fd, temp_path = tempfile.mkstemp(dir=folder, suffix=".tmp")
+        try:
+            with io.open(fd, "wb") as fp:
+                codec = self.codec.encode()
+                fp.write(HEADER.pack(MAGIC, len(codec)))
+                fp.write(codec)
+                index = {
+                    "parent": self.__write_record(fp, content.get("parent"), compressor, shared),
+                    "children": {
+                        guid: self.__write_record(fp, item, compressor, shared)
+                        for guid, item in children.items()
+                    },
+                    "favourites": content.get("favourites"),
+                    "headers": dict(shared.values()),
+                    "previous": None
+                }
+                self.__write_index(fp, index)
+        except:
+            os.remove(temp_path)
+            raise
+        return temp_path, len(index["children"])
+
+    def __get_shared_headers(self, items: Iterable[Optional['MediaItem']]) -> Dict[int, Tuple[str, dict]]:
+        """ Finds the HTTP headers of items and their streams that are used more than once.
+
+        :param items: The items to check.
+
+        :return: The key and headers, by the id() of the headers.
+
+        """
+
+        candidates = {}
+        counts = {}
+        for item in items:
+            if item is None:
+                continue
+
+            all_headers = [item.HttpHeaders] + [stream.HttpHeaders for stream in item.streams]
+            for headers in all_headers:
+                if not headers:
+                    continue
+
+                key = hashlib.md5(repr(sorted(headers.items())).encode()).hexdigest()[:DIGEST_SIZE * 2]
+                candidates[id(headers)] = (key, headers)
+                counts[key] = counts.get(key, 0) + 1
+
+        return {headers_id: value for headers_id, value in candidates.items() if counts[value[0]] > 1}
+
+    def __write_record(self, fp: io.RawIOBase, item: Optional['MediaItem'],
+                       compressor: Optional[Callable[[bytes], bytes]],
+                       shared: Dict[int, Tuple[str, dict]], base: int = 0,
+                       previous: Optional[Tuple[int, int, bytes, bool]] = None
+                       ) -> Optional[Tuple[int, int, bytes, bool]]:
+        """ Writes a record, unless the previous record had the same content.
+
+        :param fp:          The file (or buffer) to write to.
+        :param item:        The item to write.
+        :param compressor:  The function to compress the record with, or None to not compress.
+        :param shared:      The shared headers (see `__get_shared_headers`).
+        :param base:        The offset in the file of the start of the buffer.
+        :param previous:    The location of the previous record for this item.
+
+        :return: The (offset, length, digest, compressed) of the record.
+
+        """
+
+        if item is None:
+            return None
+
+        buffer = io.BytesIO()
+        pickler = pickle.Pickler(buffer, protocol=pickle.HIGHEST_PROTOCOL)
+        if shared:
+            # Shared headers are stored as a reference to the headers in the index.
+            pickler.persistent_id = lambda obj: shared[id(obj)][0] if id(obj) in shared else None
+        pickler.dump(item)
+        data = buffer.getvalue()
+        digest = hashlib.md5(data).digest()[:DIGEST_SIZE]
+        if previous is not None and previous[2] == digest:
+            return previous
+
+        if compressor is not None:
+            data = compressor(data)
+        offset = base + fp.tell()
+        fp.write(data)
+        return offset, len(data), digest, compressor is not None
+
+    def __write_index(self, fp: io.RawIOBase, index: dict, base: int = 0) -> None:
+        data = zlib.compress(pickle.dumps(index, protocol=pickle.HIGHEST_PROTOCOL))
+        offset = base + fp.tell()
+        fp.write(data)
+        fp.write(FOOTER.pack(offset, len(data), MAGIC))
+
+    def __read_record(self, fp: io.RawIOBase, location: Tuple[int, int, bytes, bool],
+                      decompress: Callable[[bytes], bytes], headers: Optional[Dict[str, dict]]) -> 'MediaItem':
+        offset, length, _, compressed = location
+        fp.seek(offset)
+        data = fp.read(length)
+        if compressed:
+            data = decompress(data)
+        if not headers:
+            return pickle.loads(data)
+
+        unpickler = pickle.Unpickler(io.BytesIO(data))
+        # Each item gets its own copy of the shared headers.
+        unpickler.persistent_load = lambda key: dict(headers[key])
+        return unpickler.load()
+
+    def __read_header(self, fp: io.RawIOBase) -> Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]:
+        """ Reads the header of the store.
+
+        :param fp: The opened store file.
+
+        :return: The compress and decompress functions of the codec of the store.
+
+        """
+
+        fp.seek(0)
+        magic, length = HEADER.unpack(fp.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError("Not a PickleStore file: {}".format(self.path))
+        return picklecodec.get_codec(fp.read(length).decode())
+
+    def __read_indexes(self, fp: io.RawIOBase):
+        """ Reads the indexes, starting with the most recent one.
+
+        :param fp: The opened store file.
+
+        :return: A generator with the (index, length) of each index.
+
+        """
+
+        location = self.__read_footer(fp)
+        while location is not None:
+            offset, length = location
+            fp.seek(offset)
+            index = pickle.loads(zlib.decompress(fp.read(length)))
+            yield index, length
+            location = index.get("previous")
+
+    def __merge_indexes(self, indexes: List[Tuple[dict, int]]) -> dict:
+        merged = {"parent": None, "children": {}, "headers": {},
+                  "favourites": indexes[0][0].get("favourites")}
+        for index, _ in reversed(indexes):
+            merged["parent"] = index["parent"] or merged["parent"]
+            merged["children"].update(index["children"])
+            merged["headers"].update(index.get("headers") or {})
+        return merged
+
+    def __read_footer(self, fp: io.RawIOBase) -> Tuple[int, int]:
+        fp.seek(-FOOTER.size, io.SEEK_END)
+        offset, length, magic = FOOTER.unpack(fp.read(FOOTER.size))
+        if magic != MAGIC:
+            raise ValueError("Incomplete PickleStore file: {}".format(self.path))
+        return offset, length
+
+    def __str__(self):
+        return "PickleStore [{}]".format(self.path)
@@ -6,6 +6,7 @@ from resources.lib.logger import Logger
 from resources.lib.addonsettings import AddonSettings
 from resources.lib.retroconfig import Config
 from resources.lib.xbmcwrapper import XbmcWrapper
+from resources.lib.urihandler import UriHandler
 from resources.lib.helpers.channelimporter import ChannelIndex
 from resources.lib.helpers.languagehelper import LanguageHelper
 from resources.lib.helpers.sessionhelper import SessionHelper
@@ -59,9 +60,10 @@ class Plugin(ActionParser):
 
             # do some cache cleanup
             env_ctrl.cache_clean_up(Config.cacheDir, Config.cacheValidTime)
+            UriHandler.clean_up_cache(Config.cacheValidTime)
 
-            # empty picklestore
-            self.pickler.purge_store(Config.addonId)
+            # empty picklestore in the background, without delaying the start-up too much
+            self.pickler.defer_purge_store(Config.addonId, time_budget=2.0)
 
         # create a session
         SessionHelper.create_session(Logger.instance())
@@ -180,4 +182,7 @@ class Plugin(ActionParser):
         if addon_action is not None:
             addon_action.execute()
 
+        # Make sure the deferred PickleStore purge and cache refreshes finish before the add-on exits
+        self.pickler.wait_for_stores()
+        UriHandler.instance().wait_for_refreshes()
         return
@@ -85,6 +85,74 @@ class Regexer(object):
             Logger.critical('error regexing', exc_info=True)
             return []
 
+    @staticmethod
+    def iter_regex(regex, data):
+        """ Performs a regular expression and yields the matches one by one while the data is
+        being scanned. The results are the same as the ones from `do_regex`, but they are never
+        all kept in memory and scanning stops when the caller stops iterating.
+
+        :param list[str|unicode]|str|unicode regex:     The regex to perform on the data.
+        :param str|unicode data:                        The data to perform the regex on.
+
+        :return: The matches, just like `do_regex` would return them.
+        :rtype: collections.Iterable[str|tuple|dict[str|unicode,str|unicode]]
+
+        """
+
+        try:
+            if not isinstance(regex, (tuple, list)):
+                yield from Regexer.__iter_regex(regex, data)
+                return
+
+            # We got a list of Regexes
+            Logger.debug("Performing multi-regex find on '%s'", regex)
+            count = 0
+            for r in regex:
+                has_results = "?P<" in r
+                for result in Regexer.__iter_regex(r, data):
+                    has_results = True
+                    if isinstance(result, tuple):
+                        # is a tuple was returned, prepend it with the count
+                        yield (count,) + result
+                    else:
+                        # create a tuple with the results
+                        yield count, result
+
+                # just like do_regex, only increase the count for non-dictionary regexes with results
+                if has_results:
+                    count += 1
+        except Exception:
+            Logger.critical('error regexing', exc_info=True)
+
+    @staticmethod
+    def __iter_regex(regex, data):
+        """ Yields the matches of a single regex in the same form as `findall` or, for
+        dictionary regexes, `groupdict` would return them.
+
+        :param str|unicode regex:   The regex to perform on the data.
+        :param str|unicode data:    The data to perform the regex on.
+
+        :return: The matches.
+        :rtype: collections.Iterable[str|tuple|dict[str|unicode,str|unicode]]
+
+        """
+
+        compiled_regex = Regexer.__get_compiled_regex(regex)
+        matches = compiled_regex.finditer(data)
+        if "?P<" in regex:
+            for match in matches:
+                yield match.groupdict()
+        elif compiled_regex.groups == 0:
+            for match in matches:
+                yield match.group(0)
+        elif compiled_regex.groups == 1:
+            # findall returns an empty string for groups that did not participate
+            for match in matches:
+                yield match.group(1) or ""
+        else:
+            for match in matches:
+                yield match.groups("")
+
     @staticmethod
     def __do_regex(regex, data):
         """ does the actual regex for non-dictionary regexes
@@ -0,0 +1,70 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# The default maximum number of idle database connections that are kept open for reuse.
+DEFAULT_MAX_IDLE_CONNECTIONS = 4
+
+
+class SqlitePool(object):
+    def __init__(self, path: str, max_idle_connections: int = DEFAULT_MAX_IDLE_CONNECTIONS):
+        """ A small pool of connections to an SQLite database.
+
+        The connections use auto-commit mode and the database is opened in WAL mode, so multiple
+        threads and processes can read while another one writes. Threads borrow a connection for
+        each operation, so short-lived worker threads do not leave connections behind.
+
+        :param path:                    The path of the database.
+        :param max_idle_connections:    The maximum number of idle connections that are kept
+                                        open for reuse.
+
+        """
+
+        self.path = path
+        self.maxIdleConnections = max_idle_connections
+
+        self.__idle_connections = []
+        self.__lock = threading.Lock()
+
+    @contextmanager
+    def connection(self):
+        """ Borrows an idle database connection, or opens a new one, for the duration of the
+        `with` block. Afterwards it is returned to the pool, or closed if the pool is full.
+
+        :rtype: sqlite3.Connection
+
+        """
+
+        with self.__lock:
+            connection = self.__idle_connections.pop() if self.__idle_connections else None
+
+        if connection is None:
+            # Use auto-commit mode and only wait a limited time for other processes.
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None,
+                                         check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+
+        try:
+            yield connection
+        finally:
+            with self.__lock:
+                if len(self.__idle_connections) < self.maxIdleConnections:
+                    self.__idle_connections.append(connection)
+                    connection = None
+            if connection is not None:
+                connection.close()
+
+    def close(self) -> None:
+        """ Closes all idle database connections. Connections that are in use are closed when
+        they are returned, if the pool is full. """
+
+        with self.__lock:
+            connections, self.__idle_connections = self.__idle_connections, []
+        for connection in connections:
+            connection.close()
+
+    def __str__(self):
+        return "SQLite pool [{}]".format(self.path)
@@ -1,18 +1,27 @@
 # SPDX-License-Identifier: GPL-3.0-or-later
 
 import os
+import sqlite3
+import threading
 import time
 
 from http.cookiejar import Cookie, CookieJar, MozillaCookieJar
 import http.client
 http.client._MAXHEADERS = 200
 from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
 
 import requests
 import requests.cookies
 import requests.utils
+from requests.adapters import HTTPAdapter, DEFAULT_POOLSIZE
+from requests.structures import CaseInsensitiveDict
 
 from resources.lib.connectivity.cachehttpadapter import CacheHTTPAdapter
+from resources.lib.connectivity.memorycache import MemoryCache, DEFAULT_MEMORY_SIZE
+from resources.lib.connectivity.singleflight import SingleFlight
+from resources.lib.connectivity.sqlitestreamcache import SqliteStreamCache, DEFAULT_MAX_SIZE
 from resources.lib.connectivity.streamcache import StreamCache
 from resources.lib.logger import Logger
 from resources.lib.proxyinfo import ProxyInfo
@@ -25,6 +34,29 @@ UriStatus = namedtuple('UriStatus', [
     'error'
 ])
 
+# All the arguments for an UriHandler.open() call. Only the `uri` is required.
+UriRequest = namedtuple('UriRequest', [
+    'uri',
+    'proxy',
+    'params',
+    'data',
+    'json',
+    'referer',
+    'additional_headers',
+    'no_cache',
+    'force_text',
+    'force_cache_duration',
+    'method',
+    'background_refresh',
+    'negative_cache_ttl'
+], defaults=(None, None, None, None, None, None, False, False, None, "", False, None))
+
+# The result of a single request in a UriHandler.open_many() call.
+UriResult = namedtuple('UriResult', [
+    'data',
+    'status'
+])
+
 URI_STATUS_NETWORK_ERROR = -1
 
 
@@ -34,28 +66,44 @@ class UriHandler(object):
 
     @staticmethod
     def create_uri_handler(cache_dir=None, web_time_out=30,
-                           cookie_jar=None, ignore_ssl_errors=False):
+                           cookie_jar=None, ignore_ssl_errors=False, pool_size=DEFAULT_POOLSIZE,
+                           cache_backend="file", cache_max_size=DEFAULT_MAX_SIZE,
+                           memory_cache_size=DEFAULT_MEMORY_SIZE):
         """ Initialises the UriHandler class
 
         Keyword Arguments:
         :param str cache_dir:           A path for http caching. If specified, caching will be used.
+        :param str cache_backend:       The cache store to use: "file" or "sqlite".
+        :param int cache_max_size:      The maximum size (in bytes) of the "sqlite" cache store.
+        :param int memory_cache_size:   The maximum size (in bytes) of the in-memory cache.
         :param int web_time_out:        Timeout for requests in seconds.
         :param str|unicode cookie_jar:  The path to the cookie jar (in case of file storage).
         :param bool ignore_ssl_errors:  Ignore any SSL certificate errors.
+        :param int pool_size:           The maximum number of pooled connections per host.
 
         :return: A new UriHandler object
         :rtype: _RequestsHandler
 
         """
 
-        # Only create a new handler if we did not have, or if the user options changed
-        if UriHandler.__handler is None or \
-                UriHandler.instance().ignoreSslErrors != ignore_ssl_errors:
+        options = dict(
+            cache_dir=cache_dir, web_time_out=web_time_out, cookie_jar=cookie_jar,
+            ignore_ssl_errors=ignore_ssl_errors, pool_size=pool_size,
+            cache_backend=cache_backend, cache_max_size=cache_max_size,
+            memory_cache_size=memory_cache_size
+        )
+
+        # Only create a new handler if we did not have, or if any of the options changed
+        if UriHandler.__handler is None or UriHandler.__handler.options != options:
+            if UriHandler.__handler is not None:
+                changed = sorted(k for k, v in options.items() if UriHandler.__handler.options[k] != v)
+                Logger.info("UriHandler options changed: %s", ", ".join(changed))
 
-            handler = _RequestsHandler(
-                cache_dir=cache_dir, web_time_out=web_time_out, cookie_jar=cookie_jar,
-                ignore_ssl_errors=ignore_ssl_errors
-            )
+            handler = _RequestsHandler(**options)
+
+            if UriHandler.__handler is not None:
+                # Release the pooled connections of the old handler
+                UriHandler.__handler.close()
 
             UriHandler.__handler = handler
             Logger.info("Initialised: %s", handler)
@@ -110,7 +158,8 @@ class UriHandler(object):
     @staticmethod
     def open(uri, proxy=None, params=None, data=None, json=None,
              referer=None, additional_headers=None, no_cache=False,
-             force_text=False, force_cache_duration=None, method=""):
+             force_text=False, force_cache_duration=None, method="", background_refresh=False,
+             negative_cache_ttl=None):
         """ Open an URL Async using a thread
 
         :param str uri:                         The URI to download.
@@ -125,6 +174,10 @@ class UriHandler(object):
         :param bool force_text:                 In case no content type is specified, force text.
         :param int|None force_cache_duration:   Should a forced cache duration be used?
         :param str|None method:                 Override for the method to use.
+        :param bool background_refresh:         Return an expired cached response at once and
+                                                refresh it in the background.
+        :param int|None negative_cache_ttl:     Cache a failed (4xx/5xx) response for this number
+                                                of seconds.
 
         :return: The data that was retrieved from the URI.
         :rtype: str|unicode
@@ -133,7 +186,28 @@ class UriHandler(object):
 
         return UriHandler.instance().open(
             uri, proxy, params, data, json, referer,
-            additional_headers, no_cache, force_text, force_cache_duration, method=method)
+            additional_headers, no_cache, force_text, force_cache_duration, method=method,
+            background_refresh=background_refresh, negative_cache_ttl=negative_cache_ttl)
+
+    @staticmethod
+    def open_many(uri_requests, max_workers=4, max_per_host=None, progress=None):
+        """ Opens multiple URLs concurrently using a bounded pool of threads.
+
+        :param list[UriRequest|str] uri_requests:   The requests (or just URIs) to open.
+        :param int max_workers:                     The maximum number of concurrent requests.
+        :param int|None max_per_host:               The maximum number of concurrent requests per
+                                                    host. Defaults to the pool size.
+        :param function|None progress:              Called with the number of finished and the
+                                                    total number of requests. Returning True
+                                                    cancels the remaining requests.
+
+        :return: The data and status for each request, in the order of the `uri_requests`. The
+                 result of a cancelled request is None.
+        :rtype: list[UriResult|None]
+
+        """
+
+        return UriHandler.instance().open_many(uri_requests, max_workers, max_per_host, progress)
 
     @staticmethod
     def header(uri, proxy=None, referer=None, additional_headers=None):
@@ -279,6 +353,21 @@ class UriHandler(object):
             # noinspection PyUnresolvedReferences
             cookie_jar.save()
 
+    @staticmethod
+    def clean_up_cache(cache_time):
+        """ Removes the cached responses that are older than `cache_time` from the cache store.
+
+        :param int cache_time:  The minimum age (in seconds) of the responses that will be removed.
+
+        """
+
+        cache_store = UriHandler.instance().cacheStore
+        if cache_store is None:
+            return
+
+        cache_store.clean_up(cache_time)
+        UriHandler.instance().memoryCache.clear()
+
     @staticmethod
     def get_extension_from_url(url):
         """ determines the file extension for a certain URL
@@ -305,19 +394,33 @@ class UriHandler(object):
 class _RequestsHandler(object):
 
     def __init__(self, cache_dir=None, web_time_out=30, cookie_jar=None,
-                 ignore_ssl_errors=False):
+                 ignore_ssl_errors=False, pool_size=DEFAULT_POOLSIZE,
+                 cache_backend="file", cache_max_size=DEFAULT_MAX_SIZE,
+                 memory_cache_size=DEFAULT_MEMORY_SIZE):
         """ Initialises the UriHandler class
 
         Keyword Arguments:
         :param str cache_dir:         A path for http caching. If specified, caching will be used.
+        :param str cache_backend:     The cache store to use: "file" or "sqlite".
+        :param int cache_max_size:    The maximum size (in bytes) of the "sqlite" cache store.
+        :param int memory_cache_size: The maximum size (in bytes) of the in-memory cache.
         :param int web_time_out:      Timeout for requests in seconds
         :param str cookie_jar:        The path to the cookie jar (in case of file storage)
         :param ignore_ssl_errors:     Ignore any SSL certificate errors.
+        :param int pool_size:         The maximum number of pooled connections per host.
 
         """
 
         self.id = int(time.time())
 
+        # The options this handler was created with
+        self.options = dict(
+            cache_dir=cache_dir, web_time_out=web_time_out, cookie_jar=cookie_jar,
+            ignore_ssl_errors=ignore_ssl_errors, pool_size=pool_size,
+            cache_backend=cache_backend, cache_max_size=cache_max_size,
+            memory_cache_size=memory_cache_size
+        )
+
         if cookie_jar:
             self.cookieJar = MozillaCookieJar(cookie_jar)
             if not os.path.isfile(cookie_jar):
@@ -339,8 +442,10 @@ class _RequestsHandler(object):
 
         self.cacheDir = cache_dir
         self.cacheStore = None
+        self.memoryCache = None
         if cache_dir:
-            self.cacheStore = StreamCache(cache_dir)
+            self.cacheStore = self.__create_cache_store(cache_dir, cache_backend, cache_max_size)
+            self.memoryCache = MemoryCache(memory_cache_size)
             Logger.debug("Opened %s", self.cacheStore)
         else:
             Logger.debug("No cache-store provided. Cached disabled.")
@@ -351,12 +456,39 @@ class _RequestsHandler(object):
         if self.ignoreSslErrors:
             Logger.warning("Ignoring all SSL errors in Python")
 
-        # status of the most recent call
-        self.status = UriStatus(code=0, url=None, error=False, reason=None)
+        # A single long-lived session with pooled (keep-alive) connections per host
+        self.poolSize = pool_size
+        self.__adapter = None
+        self.__session = self.__create_session()
+
+        # identical GET requests that are in-flight at the same time share a single response
+        self.singleFlight = SingleFlight()
+
+        # status of the most recent call (stored per thread)
+        self.__status = threading.local()
+
+        # locks to limit the concurrent requests per host and to protect the cookie jar file
+        self.__host_locks = dict()
+        self.__host_locks_lock = threading.Lock()
+        self.__cookie_jar_lock = threading.Lock()
 
         # for download animation
         self.__animationIndex = -1
 
+    @property
+    def status(self):
+        """ The status of the most recent call that was done from the current thread.
+
+        :rtype: UriStatus
+
+        """
+
+        return getattr(self.__status, "value", UriStatus(code=0, url=None, error=False, reason=None))
+
+    @status.setter
+    def status(self, value):
+        self.__status.value = value
+
     def download(self, uri, filename, folder, progress_callback=None, proxy=None, params="",
                  data="", json="", referer=None, additional_headers=None):
         """ Downloads a remote file
@@ -414,6 +546,9 @@ class _RequestsHandler(object):
                     Logger.warning("Download of %s aborted", uri)
                     break
 
+        # Make sure the connection is released back to the pool.
+        r.close()
+
         if cancel:
             if os.path.isfile(download_path):
                 Logger.info("Removing partial download: %s", download_path)
@@ -426,7 +561,8 @@ class _RequestsHandler(object):
 
     def open(self, uri, proxy=None, params=None, data=None, json=None,
              referer=None, additional_headers=None, no_cache=False,
-             force_text=False, force_cache_duration=None, method=""):
+             force_text=False, force_cache_duration=None, method="", background_refresh=False,
+             negative_cache_ttl=None):
         """ Open an URL Async using a thread
 
         :param str uri:                         The URI to download.
@@ -441,21 +577,30 @@ class _RequestsHandler(object):
         :param bool|None force_text:            In case no content type is specified, force text.
         :param int|None force_cache_duration:   Should a forced cache duration be used?
         :param str|None method:                 Override for the method to use.
+        :param bool background_refresh:         Return an expired cached response at once and
+                                                refresh it in the background.
+        :param int|None negative_cache_ttl:     Cache a failed (4xx/5xx) response for this number
+                                                of seconds.
 
         :return: The data that was retrieved from the URI.
         :rtype: str|unicode
 
-        Specifying `no_cache` completely disables the cache component and does not attach a
-        `CachHttpAdapter` to the session. Setting the `cache_duration` to 0, does make use of such
-        a `CachHttpAdapter`, but forces a cache duration of 0 seconds. This will make all the
-        caches invalid and force the requets with an 'etag' to revalidate.
+        All requests use the same long-lived session. If a cache is used, that session always
+        has a `CacheHTTPAdapter` attached. The cache options of a request are set on that adapter
+        for the calling thread only, so concurrent requests do not affect each other's options.
+
+        Specifying `no_cache` makes the `CacheHTTPAdapter` pass the request on without reading
+        or storing the cache. Setting the `force_cache_duration` to 0 does use the cache, but
+        forces a cache duration of 0 seconds. This will make all the caches invalid and force the
+        requests with an 'etag' to revalidate.
 
         """
         r = self.__requests(uri, proxy=proxy, params=params, data=data, json=json,
                             referer=referer, additional_headers=additional_headers,
                             no_cache=no_cache, stream=False,
                             force_cache_duration=force_cache_duration,
-                            method=method)
+                            method=method, background_refresh=background_refresh,
+                            negative_cache_ttl=negative_cache_ttl)
         if r is None:
             return ""
 
@@ -479,6 +624,67 @@ class _RequestsHandler(object):
 
         return r.text if r.encoding else r.content
 
+    def open_many(self, uri_requests, max_workers=4, max_per_host=None, progress=None):
+        """ Opens multiple URLs concurrently using a bounded pool of threads. All requests share
+        the same session, cookie jar and cache.
+
+        The `progress` function is called from the calling thread each time a request finished.
+        If it returns True, the requests that were not started yet are cancelled.
+
+        :param list[UriRequest|str] uri_requests:   The requests (or just URIs) to open.
+        :param int max_workers:                     The maximum number of concurrent requests.
+        :param int|None max_per_host:               The maximum number of concurrent requests per
+                                                    host. Defaults to the pool size.
+        :param function|None progress:              Called with the number of finished and the
+                                                    total number of requests. Returning True
+                                                    cancels the remaining requests.
+
+        :return: The data and status for each request, in the order of the `uri_requests`. The
+                 result of a cancelled request is None.
+        :rtype: list[UriResult|None]
+
+        """
+
+        uri_requests = [r if isinstance(r, UriRequest) else UriRequest(r) for r in uri_requests]
+        if not uri_requests:
+            return []
+
+        max_per_host = max_per_host or self.poolSize
+        max_workers = max(1, min(max_workers, len(uri_requests)))
+
+        def __open(uri_request):
+            host_lock = self.__get_host_lock(uri_request.uri, max_per_host)
+            try:
+                with host_lock:
+                    data = self.open(*uri_request)
+                return UriResult(data=data, status=self.status)
+            except Exception as e:
+                Logger.error("Error opening %s", uri_request.uri, exc_info=True)
+                status = UriStatus(code=URI_STATUS_NETWORK_ERROR, url=uri_request.uri, error=True,
+                                   reason=str(e))
+                return UriResult(data="", status=status)
+
+        Logger.info("Opening %d URLs using %d threads (max %d per host)",
+                    len(uri_requests), max_workers, max_per_host)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            if progress is None:
+                return list(executor.map(__open, uri_requests))
+
+            futures = dict((executor.submit(__open, r), i) for i, r in enumerate(uri_requests))
+            results = [None] * len(uri_requests)
+            for finished, future in enumerate(as_completed(futures), start=1):
+                results[futures[future]] = future.result()
+                if progress(finished, len(uri_requests)):
+                    cancelled = sum(1 for f in futures if f.cancel())
+                    Logger.info("Cancelled %d of %d URLs", cancelled, len(uri_requests))
+                    break
+
+        # The requests that were already running when cancelling, did finish.
+        for future, i in futures.items():
+            if results[i] is None and not future.cancelled():
+                results[i] = future.result()
+        return results
+
     def header(self, uri, proxy=None, referer=None, additional_headers=None):
         """ Retrieves header information only.
 
@@ -493,109 +699,240 @@ class _RequestsHandler(object):
 
         """
 
-        with requests.session() as s:
-            s.cookies = self.cookieJar
-            s.verify = not self.ignoreSslErrors
+        s = self.__session
+        proxies = self.__get_proxies(proxy, uri)
+        headers = self.__get_headers(referer, additional_headers)
 
-            proxies = self.__get_proxies(proxy, uri)
-            headers = self.__get_headers(referer, additional_headers)
+        if self.cacheStore:
+            self.__adapter.set_request_options(no_cache=True)
 
-            Logger.info("Performing a HEAD for %s", uri)
-            r = s.head(uri, proxies=proxies, headers=headers, allow_redirects=True,
-                       timeout=self.webTimeOut)
+        Logger.info("Performing a HEAD for %s", uri)
+        r = s.head(uri, proxies=proxies, headers=headers, allow_redirects=True,
+                   timeout=self.webTimeOut)
 
-            content_type = r.headers.get("Content-Type", "")
-            real_url = r.url
+        content_type = r.headers.get("Content-Type", "")
+        real_url = r.url
 
-            self.status = UriStatus(code=r.status_code, url=uri, error=not r.ok, reason=r.reason)
-            if self.cookieJarFile:
-                # noinspection PyUnresolvedReferences
-                self.cookieJar.save()
+        self.status = UriStatus(code=r.status_code, url=uri, error=not r.ok, reason=r.reason)
+        self.__save_cookies()
 
-            if r.ok:
-                Logger.info("%s resulted in '%s %s' (%s) for %s",
-                            r.request.method, r.status_code, r.reason, r.elapsed, r.url)
-                return content_type, real_url
-            else:
-                Logger.error("%s failed with in '%s %s' (%s) for %s",
-                             r.request.method, r.status_code, r.reason, r.elapsed, r.url)
-                return "", ""
+        if r.ok:
+            Logger.info("%s resulted in '%s %s' (%s) for %s",
+                        r.request.method, r.status_code, r.reason, r.elapsed, r.url)
+            return content_type, real_url
+        else:
+            Logger.error("%s failed with in '%s %s' (%s) for %s",
+                         r.request.method, r.status_code, r.reason, r.elapsed, r.url)
+            return "", ""
+
+    def wait_for_refreshes(self):
+        """ Waits (at most the web time-out) for the background refreshes of expired cached
+        responses to finish, so they are not aborted when the add-on exits. """
+
+        if self.cacheStore is None:
+            return
+
+        if not self.__adapter.wait_for_refreshes(self.webTimeOut):
+            Logger.warning("Background refreshes did not finish within %s seconds", self.webTimeOut)
+
+    def close(self):
+        """ Closes the session and releases all pooled connections. Background refreshes are
+        finished first, as they use the cache store. """
+
+        self.wait_for_refreshes()
+        Logger.debug("Closing the session of %s", self)
+        self.__session.close()
+        if self.cacheStore is not None:
+            Logger.debug("%s: %s hits, %s revalidations (%s bytes saved). %s",
+                         self.cacheStore, self.cacheStore.cacheHits,
+                         self.cacheStore.revalidations, self.cacheStore.bytesSaved,
+                         self.memoryCache)
+            self.cacheStore.close()
 
     # noinspection PyUnusedLocal
     def __requests(self, uri, proxy, params, data, json, referer,
-                   additional_headers, no_cache, stream, force_cache_duration, method):
+                   additional_headers, no_cache, stream, force_cache_duration, method,
+                   background_refresh=False, negative_cache_ttl=None):
 
-        with requests.session() as s:
-            s.cookies = self.cookieJar
-            s.verify = not self.ignoreSslErrors
-            if self.cacheStore and not no_cache:
-                Logger.trace("Adding the %s to the request", self.cacheStore)
-                s.mount("https://", CacheHTTPAdapter(self.cacheStore, force_cache_duration))
-                s.mount("http://", CacheHTTPAdapter(self.cacheStore, force_cache_duration))
+        s = self.__session
+        if self.cacheStore:
+            if not no_cache:
+                Logger.trace("Using the %s for the request", self.cacheStore)
+            self.__adapter.set_request_options(
+                no_cache=no_cache, force_cache_duration=force_cache_duration,
+                background_refresh=background_refresh, negative_cache_ttl=negative_cache_ttl)
 
-            proxies = self.__get_proxies(proxy, uri)
+        proxies = self.__get_proxies(proxy, uri)
 
-            headers = self.__get_headers(referer, additional_headers)
+        headers = self.__get_headers(referer, additional_headers)
 
-            r = None
+        r = None
 
-            http_method = method.upper() if method else ""
-            if not http_method:
-                has_body = params is not None or data is not None or json is not None
-                # Promote to POST when body arguments are present
-                http_method = "POST" if has_body else "GET"
+        http_method = method.upper() if method else ""
+        if not http_method:
+            has_body = params is not None or data is not None or json is not None
+            # Promote to POST when body arguments are present
+            http_method = "POST" if has_body else "GET"
+
+        try:
+            if http_method == "GET" and not stream:
+                Logger.info("Performing a GET for %s", uri)
+                flight_key = (uri, tuple(sorted(headers.items())),
+                              tuple(sorted((proxies or {}).items())),
+                              no_cache, force_cache_duration, background_refresh,
+                              negative_cache_ttl)
+                # Each caller gets its own copy, only the (immutable) body is shared.
+                r = self.__copy_response(self.singleFlight.do(
+                    flight_key,
+                    lambda: s.get(uri, proxies=proxies, headers=headers,
+                                  stream=stream, timeout=self.webTimeOut)))
+
+            elif http_method == "GET":
+                Logger.info("Performing a GET for %s", uri)
+                r = s.get(uri, proxies=proxies, headers=headers,
+                          stream=stream, timeout=self.webTimeOut)
+
+            elif http_method == "POST":
+                body_data, body_json = data, json
+                if params is not None:
+                    # Old UriHandler behavior. Set form header to keep compatible
+                    if "content-type" not in headers:
+                        headers["content-type"] = "application/x-www-form-urlencoded"
+                    body_data, body_json = params, None
+                Logger.info("Performing a POST with '%s' for %s",
+                            headers.get("content-type", "<No Content-Type>"), uri)
+                r = s.post(uri, data=body_data, json=body_json,
+                           proxies=proxies, headers=headers,
+                           stream=stream, timeout=self.webTimeOut)
+
+            elif http_method == "PATCH":
+                Logger.info("Performing a PATCH with '%s' for %s",
+                            headers.get("content-type", "<No Content-Type>"), uri)
+                r = s.patch(uri, data=data, json=json, proxies=proxies,
+                            headers=headers, stream=stream,
+                            timeout=self.webTimeOut)
+
+            elif http_method == "DELETE":
+                Logger.info("Performing a DELETE for %s", uri)
+                r = s.delete(uri, proxies=proxies, headers=headers,
+                             stream=stream, timeout=self.webTimeOut)
 
-            try:
-                if http_method == "GET":
-                    Logger.info("Performing a GET for %s", uri)
-                    r = s.get(uri, proxies=proxies, headers=headers,
-                              stream=stream, timeout=self.webTimeOut)
-
-                elif http_method == "POST":
-                    body_data, body_json = data, json
-                    if params is not None:
-                        # Old UriHandler behavior. Set form header to keep compatible
-                        if "content-type" not in headers:
-                            headers["content-type"] = "application/x-www-form-urlencoded"
-                        body_data, body_json = params, None
-                    Logger.info("Performing a POST with '%s' for %s",
-                                headers.get("content-type", "<No Content-Type>"), uri)
-                    r = s.post(uri, data=body_data, json=body_json,
-                               proxies=proxies, headers=headers,
-                               stream=stream, timeout=self.webTimeOut)
-
-                elif http_method == "PATCH":
-                    Logger.info("Performing a PATCH with '%s' for %s",
-                                headers.get("content-type", "<No Content-Type>"), uri)
-                    r = s.patch(uri, data=data, json=json, proxies=proxies,
-                                headers=headers, stream=stream,
-                                timeout=self.webTimeOut)
-
-                elif http_method == "DELETE":
-                    Logger.info("Performing a DELETE for %s", uri)
-                    r = s.delete(uri, proxies=proxies, headers=headers,
-                                 stream=stream, timeout=self.webTimeOut)
-
-                else:
-                    raise ValueError("Unsupported HTTP Method %s" % http_method)
-
-            except OSError as e:
-                Logger.error("Network error for %s", uri, exc_info=True)
-                self.status = UriStatus(code=URI_STATUS_NETWORK_ERROR, url=uri, error=True, reason=str(e))
-                return None
-
-            if r.ok:
-                Logger.info("%s resulted in '%s %s' (%s) for %s",
-                            r.request.method, r.status_code, r.reason, r.elapsed, r.url)
             else:
-                Logger.error("%s failed with '%s %s' (%s) for %s",
-                             r.request.method, r.status_code, r.reason, r.elapsed, r.url)
+                raise ValueError("Unsupported HTTP Method %s" % http_method)
 
-            self.status = UriStatus(code=r.status_code, url=r.url, error=not r.ok, reason=r.reason)
-            if self.cookieJarFile:
-                # noinspection PyUnresolvedReferences
-                self.cookieJar.save()
-            return r
+        except OSError as e:
+            Logger.error("Network error for %s", uri, exc_info=True)
+            self.status = UriStatus(code=URI_STATUS_NETWORK_ERROR, url=uri, error=True, reason=str(e))
+            return None
+
+        if r.ok:
+            Logger.info("%s resulted in '%s %s' (%s) for %s",
+                        r.request.method, r.status_code, r.reason, r.elapsed, r.url)
+        else:
+            Logger.error("%s failed with '%s %s' (%s) for %s",
+                         r.request.method, r.status_code, r.reason, r.elapsed, r.url)
+
+        self.status = UriStatus(code=r.status_code, url=r.url, error=not r.ok, reason=r.reason)
+        self.__save_cookies()
+        return r
+
+    def __copy_response(self, response):
+        """ Creates a copy of a response that was shared between threads. The copy shares only
+        the body bytes, so a caller can change its response without affecting the others.
+
+        :param requests.Response response:  The shared response (with its content read).
+
+        :return: A new response.
+        :rtype: requests.Response
+
+        """
+
+        copy = requests.Response()
+        copy._content = response.content
+        copy.status_code = response.status_code
+        copy.headers = CaseInsensitiveDict(response.headers)
+        copy.url = response.url
+        copy.reason = response.reason
+        copy.encoding = response.encoding
+        copy.elapsed = response.elapsed
+        copy.history = list(response.history)
+        copy.cookies = response.cookies.copy()
+        copy.request = response.request.copy() if response.request is not None else None
+        return copy
+
+    def __create_cache_store(self, cache_dir, cache_backend, cache_max_size):
+        """ Creates the cache store. If the SQLite database cannot be opened, the file based
+        cache store is used instead.
+
+        :param str cache_dir:       The path for http caching.
+        :param str cache_backend:   The cache store to use: "file" or "sqlite".
+        :param int cache_max_size:  The maximum size (in bytes) of the "sqlite" cache store.
+
+        :return: The cache store.
+        :rtype: StreamCache|SqliteStreamCache
+
+        """
+
+        if cache_backend == "sqlite":
+            try:
+                return SqliteStreamCache(cache_dir, max_size=cache_max_size)
+            except sqlite3.Error:
+                Logger.error("Error opening SQLite cache store. Using file cache store.",
+                             exc_info=True)
+
+        return StreamCache(cache_dir)
+
+    def __create_session(self):
+        """ Creates the long-lived session that is used for all requests of this handler. The
+        session shares the cookie jar and mounts a single adapter, so connections (and their TLS
+        sessions) are pooled per host and re-used between requests.
+
+        :return: A new session with the adapters mounted.
+        :rtype: requests.Session
+
+        """
+
+        s = requests.session()
+        s.cookies = self.cookieJar
+        s.verify = not self.ignoreSslErrors
+
+        if self.cacheStore:
+            self.__adapter = CacheHTTPAdapter(self.cacheStore, memory_cache=self.memoryCache,
+                                              pool_maxsize=self.poolSize)
+        else:
+            self.__adapter = HTTPAdapter(pool_maxsize=self.poolSize)
+
+        s.mount("https://", self.__adapter)
+        s.mount("http://", self.__adapter)
+        return s
+
+    def __save_cookies(self):
+        """ Saves the cookies to the cookie jar file (if one is used). """
+
+        if not self.cookieJarFile:
+            return
+
+        with self.__cookie_jar_lock:
+            # noinspection PyUnresolvedReferences
+            self.cookieJar.save()
+
+    def __get_host_lock(self, uri, max_per_host):
+        """ Returns the semaphore that limits the number of concurrent requests to a host.
+
+        :param str uri:             The URI to get the host from.
+        :param int max_per_host:    The maximum number of concurrent requests for the host.
+
+        :rtype: threading.BoundedSemaphore
+
+        """
+
+        key = (urlparse(uri).netloc.lower(), max_per_host)
+        with self.__host_locks_lock:
+            host_lock = self.__host_locks.get(key)
+            if host_lock is None:
+                host_lock = threading.BoundedSemaphore(max_per_host)
+                self.__host_locks[key] = host_lock
+        return host_lock
 
     def __get_headers(self, referer, additional_headers):
         headers = {}
@@ -678,5 +1015,5 @@ class _RequestsHandler(object):
         return content_type.lower() in ["application/vnd.apple.mpegurl", "application/x-mpegurl"]
 
     def __str__(self):
-        return "UriHandler [id={0}, useCaching={1}, ignoreSslErrors={2}]"\
-            .format(self.id, self.cacheStore, self.ignoreSslErrors)
+        return "UriHandler [id={0}, useCaching={1}, ignoreSslErrors={2}, poolSize={3}]"\
+            .format(self.id, self.cacheStore, self.ignoreSslErrors, self.poolSize)
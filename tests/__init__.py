@@ -3,6 +3,10 @@
 __all__ = ["test_version", "test_urihandler", "test_datehelper", "test_jsonhelper", "test_logger",
            "test_cloaker", "test_templatehelper", "test_youtube", "test_kodilibs", "test_logsender",
            "test_localsettings", "test_subtitlehelper", "test_channelimporter",
-           "test_htmlentityhelper"]
+           "test_htmlentityhelper", "test_cachecodec", "test_connectionpool", "test_deferreditems",
+           "test_folderlist", "test_jsonpath", "test_mediaitem", "test_memorycache",
+           "test_negativecache", "test_openmany", "test_paginator", "test_parserindex",
+           "test_picklestore", "test_regexstream", "test_revalidation", "test_singleflight",
+           "test_sqlitecache", "test_staleresponses", "test_streamcachestress"]
 import os
 os.environ["KODI_STUB_RPC_RESPONSES"] = os.path.join(os.path.dirname(__file__), "data", "jsonrcpcommands")
@@ -0,0 +1,5 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+__all__ = ["cachecodec", "cachestores", "deferreditems", "folderlist", "jsonpath", "localserver", "mediaitems",
+           "openmany", "paginator", "parserindex", "picklecodecs", "pickledictionary", "picklestores",
+           "regexstream"]
@@ -0,0 +1,139 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+""" Benchmarks the HTTP cache codecs with recorded responses.
+
+The responses are the cached responses of a Kodi profile, either in the SQLite cache store
+(`www.db`) or in the file cache store (`www` folder). They contain the responses of all the
+channels that were used, so browse a few channels with the add-on first. Run it from the root
+of the add-on:
+
+    KODI_HOME=<kodi home> python -m tests.benchmarks.cachecodec [<cache folder>]
+
+"""
+
+import glob
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+
+def load_responses(cache_path: str) -> List[Tuple[str, bytes]]:
+    """ Loads the (decoded) bodies of the cached responses in a cache folder.
+
+    :param cache_path: The cache folder of the profile.
+
+    :return: The URL and body of each of the responses.
+
+    """
+
+    from resources.lib.connectivity import cachecodec
+    from resources.lib.connectivity.sqlitestreamcache import SqliteStreamCache
+    from resources.lib.connectivity.streamcache import StreamCache
+
+    database = os.path.join(cache_path, SqliteStreamCache.DatabaseName)
+    if os.path.isfile(database):
+        store = SqliteStreamCache(cache_path)
+        connection = sqlite3.connect(database)
+        try:
+            meta_keys = [row[0] for row in connection.execute("SELECT key FROM cache WHERE key LIKE '%.meta'")]
+        finally:
+            connection.close()
+    else:
+        store = StreamCache(cache_path)
+        meta_keys = [os.path.basename(path) for path in glob.glob(os.path.join(store.cachePath, "*.meta"))]
+
+    responses = []
+    for meta_key in meta_keys:
+        try:
+            entry = store.get_entry("{}.body".format(meta_key.rsplit(".", 1)[0]), meta_key)
+            if entry is None:
+                continue
+            meta = json.loads(entry.meta.read())
+            if meta.get("negative"):
+                continue
+            responses.append((meta["url"], cachecodec.decode(meta.get("codec"), entry.body.read())))
+        except Exception as ex:
+            print("Skipping {}: {}".format(meta_key, ex))
+    store.close()
+    return responses
+
+
+def benchmark_codecs(responses: List[Tuple[str, bytes]], output_folder: str,
+                     count: int = 3) -> Dict[str, Tuple[float, float, int]]:
+    """ Writes and reads all responses with each of the available codecs.
+
+    :param responses:       The URL and body of the responses to store.
+    :param output_folder:   The folder to write the cache stores to.
+    :param count:           The number of times to repeat it.
+
+    :return: The write duration (ms), read duration (ms) and total size (bytes) per codec.
+
+    """
+
+    from resources.lib.connectivity import cachecodec
+    from resources.lib.connectivity.streamcache import StreamCache
+
+    results = {}
+    for codec in cachecodec.get_codecs():
+        cache = StreamCache(os.path.join(output_folder, codec))
+        keys = ["{}.body".format(i) for i in range(len(responses))]
+
+        start = time.perf_counter()
+        for _ in range(count):
+            for key, (_, body) in zip(keys, responses):
+                with cache.set(key) as fp:
+                    chunks = (body[i:i + cachecodec.CHUNK_SIZE] for i in range(0, len(body), cachecodec.CHUNK_SIZE))
+                    cachecodec.write(codec, chunks, fp)
+        write_duration = (time.perf_counter() - start) * 1000 / count
+
+        start = time.perf_counter()
+        for _ in range(count):
+            for key, (url, body) in zip(keys, responses):
+                with cachecodec.open_reader(codec, cache.get(key)) as fp:
+                    if len(fp.read()) != len(body):
+                        raise ValueError("The {} response of {} was not read completely".format(codec, url))
+        read_duration = (time.perf_counter() - start) * 1000 / count
+
+        size = sum(os.path.getsize(os.path.join(cache.cachePath, key)) for key in keys)
+        results[codec] = (write_duration, read_duration, size)
+    return results
+
+
+def print_results(results: Dict[str, Tuple[float, float, int]], size: int) -> None:
+    print("{:<10} {:>10} {:>10} {:>12} {:>8}".format("codec", "write ms", "read ms", "bytes", "ratio"))
+    for codec, (write_duration, read_duration, stored) in results.items():
+        print("{:<10} {:>10.1f} {:>10.1f} {:>12} {:>7.1f}%".format(
+            codec, write_duration, read_duration, stored, stored * 100.0 / max(size, 1)))
+
+
+def main(cache_path: str) -> None:
+    from resources.lib.logger import Logger
+
+    Logger.create_logger(None, "CacheCodec", min_log_level=Logger.LVL_INFO)
+    try:
+        responses = load_responses(cache_path)
+        size = sum(len(body) for _, body in responses)
+        print("Found {} responses with {} bytes in '{}'".format(len(responses), size, cache_path))
+        if not responses:
+            return
+
+        output_folder = tempfile.mkdtemp(prefix="retro_codecs_")
+        try:
+            print_results(benchmark_codecs(responses, output_folder), size)
+        finally:
+            shutil.rmtree(output_folder)
+    finally:
+        Logger.instance().close_log()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main(sys.argv[1])
+    else:
+        from resources.lib.retroconfig import Config
+        main(Config.cacheDir)
@@ -0,0 +1,110 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+""" Benchmarks the HTTP cache stores:
+
+* looking up cached and missing entries in the file and the SQLite cache store.
+* cache hits of the UriHandler with and without the in-memory cache.
+
+The responses are served by a local server. Run it from the root of the add-on:
+
+    KODI_HOME=<kodi home> python -m tests.benchmarks.cachestores [<count>]
+
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import List, Tuple
+
+
+def benchmark_lookups(output_folder: str, count: int) -> Tuple[float, float]:
+    """ Looks up cached and missing entries in a file and an SQLite cache store.
+
+    :param output_folder:   The folder to create the cache stores in.
+    :param count:           The number of cached entries.
+
+    :return: The duration per lookup of the file and the SQLite cache store (us).
+
+    """
+
+    from resources.lib.connectivity.sqlitestreamcache import SqliteStreamCache
+    from resources.lib.connectivity.streamcache import StreamCache
+
+    durations = []
+    for cache in (StreamCache(os.path.join(output_folder, "file")),
+                  SqliteStreamCache(os.path.join(output_folder, "sqlite"))):
+        for i in range(count):
+            body_fp, meta_fp = cache.set("key{}.body".format(i)), cache.set("key{}.meta".format(i))
+            body_fp.write(b"x" * 2048)
+            meta_fp.write(b"{}")
+            cache.store_entry(body_fp, meta_fp)
+
+        start = time.perf_counter()
+        for i in range(count):
+            if cache.get_entry("key{}.body".format(i), "key{}.meta".format(i)) is None:
+                raise ValueError("Entry {} is missing in {}".format(i, cache))
+            if cache.get_entry("miss{}.body".format(i), "miss{}.meta".format(i)) is not None:
+                raise ValueError("Entry {} was not stored in {}".format(i, cache))
+        durations.append((time.perf_counter() - start) * 1000 * 1000 / count / 2)
+        cache.close()
+    return durations[0], durations[1]
+
+
+def benchmark_memory_cache(url: str, output_folder: str, count: int) -> Tuple[float, float]:
+    """ Opens a cached response with a UriHandler without and with an in-memory cache.
+
+    :param url:             The url of the local server.
+    :param output_folder:   The cache folder of the UriHandlers.
+    :param count:           The number of cache hits.
+
+    :return: The duration per hit without and with the memory cache (ms).
+
+    """
+
+    from resources.lib.urihandler import UriHandler
+
+    url = "{}/manifest?max-age=600".format(url)
+    durations = []
+    for memory_cache_size in (0, 1024 * 1024):
+        handler = UriHandler.create_uri_handler(cache_dir=os.path.join(output_folder, str(memory_cache_size)),
+                                                cache_backend="sqlite", memory_cache_size=memory_cache_size)
+        data = UriHandler.open(url)
+
+        start = time.perf_counter()
+        for _ in range(count):
+            if UriHandler.open(url) != data:
+                raise ValueError("The cache hit differs from the response")
+        durations.append((time.perf_counter() - start) * 1000 / count)
+        if handler.cacheStore.cacheHits != count:
+            raise ValueError("Expected {} cache hits, got {}".format(count, handler.cacheStore.cacheHits))
+    return durations[0], durations[1]
+
+
+def main(args: List[str]) -> None:
+    from resources.lib.logger import Logger
+    from resources.lib.urihandler import UriHandler
+    from tests.benchmarks.localserver import LocalServer
+
+    count = int(args[0]) if args else 500
+
+    # Logging each request would take longer than the cache hits.
+    Logger.create_logger(None, "CacheStores", min_log_level=Logger.LVL_WARNING)
+    server = LocalServer(use_tls=False).start()
+    output_folder = tempfile.mkdtemp(prefix="retro_cache_")
+    try:
+        print("Looking up {} entries: file={:.1f}us sqlite={:.1f}us".format(
+            count, *benchmark_lookups(output_folder, count)))
+        print("{} cache hits: store={:.3f}ms memory={:.3f}ms".format(
+            count, *benchmark_memory_cache(server.url, output_folder, count)))
+    finally:
+        if UriHandler.instance():
+            UriHandler.instance().close()
+        shutil.rmtree(output_folder)
+        server.stop()
+        Logger.instance().close_log()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
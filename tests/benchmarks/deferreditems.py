@@ -0,0 +1,116 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+""" Compares Creators that do their per-item request themselves with ones that return a
+`DeferredItem`.
+
+The requests are served by a local server that adds a fixed latency to each response. Run it
+from the root of the add-on:
+
+    KODI_HOME=<kodi home> python -m tests.benchmarks.deferreditems [<items> [<delay>]]
+
+"""
+
+import json
+import sys
+import time
+from typing import Callable, List, Tuple
+
+
+def process_folder_list(channel, creator: Callable, count: int) -> list:
+    """ Lets a channel process a JSON listing with a Creator.
+
+    :param Channel channel:     The channel to process the listing with.
+    :param creator:             The Creator for the items of the listing.
+    :param count:               The number of items in the listing.
+
+    :return: The MediaItems of the listing.
+    :rtype: list[MediaItem]
+
+    """
+
+    from resources.lib.helpers.jsonhelper import JsonHelper
+    from resources.lib.mediaitem import MediaItem
+
+    data = JsonHelper({"items": [{"id": i, "title": "Item {}".format(i)} for i in range(count)]})
+    channel.dataParsers.pop("#deferred", None)
+    # noinspection PyProtectedMember
+    channel._add_data_parser("#deferred", name="Deferred benchmark", json=True,
+                             preprocessor=lambda d: (data, []), parser=["items"], creator=creator)
+    return channel.process_folder_list(MediaItem("Deferred", "#deferred"))
+
+
+def benchmark_deferred(channel, url: str, count: int, delay: float) -> Tuple[float, float]:
+    """ Processes the same listing with a serial and with a deferring Creator.
+
+    :param Channel channel:     The channel to process the listing with.
+    :param url:                 The url of the local server.
+    :param count:               The number of items in the listing.
+    :param delay:               The latency of each request (seconds).
+
+    :return: The serial and deferred duration (seconds).
+
+    """
+
+    from resources.lib.chn_class import DeferredItem
+    from resources.lib.mediaitem import MediaItem
+    from resources.lib.urihandler import UriHandler
+
+    def get_url(result_set):
+        return "{}/info/{}?delay={}".format(url, result_set["id"], delay)
+
+    def enrich(item, data):
+        item.description = json.loads(data)["path"]
+        return item
+
+    def create_item_serial(result_set):
+        item = MediaItem(result_set["title"], "https://example.com/{}".format(result_set["id"]))
+        return enrich(item, UriHandler.open(get_url(result_set)))
+
+    def create_item_deferred(result_set):
+        item = MediaItem(result_set["title"], "https://example.com/{}".format(result_set["id"]))
+        return DeferredItem(item, get_url(result_set), enrich)
+
+    durations = []
+    results = []
+    for create_item in (create_item_serial, create_item_deferred):
+        start = time.perf_counter()
+        items = process_folder_list(channel, create_item, count)
+        durations.append(time.perf_counter() - start)
+        results.append([(i.name, i.description) for i in items])
+
+    if results[0] != results[1]:
+        raise ValueError("The deferred items differ from the serial ones")
+    return durations[0], durations[1]
+
+
+def main(args: List[str]) -> None:
+    from resources.lib.logger import Logger
+    from resources.lib.retroconfig import Config
+    from resources.lib.textures import TextureHandler
+    from resources.lib.urihandler import UriHandler
+    from tests.benchmarks.localserver import LocalServer
+
+    count = int(args[0]) if args else 12
+    delay = float(args[1]) if len(args) > 1 else 0.1
+
+    Logger.create_logger(None, "DeferredItems", min_log_level=Logger.LVL_INFO)
+    server = LocalServer(use_tls=False).start()
+    try:
+        # The channels need a logger during import.
+        from resources.lib.helpers.channelimporter import ChannelIndex
+
+        UriHandler.create_uri_handler()
+        TextureHandler.set_texture_handler(Config, Logger.instance(), UriHandler.instance())
+        channel = ChannelIndex.get_register().get_channel("channel.regionalnl.at5", None)
+
+        serial, deferred = benchmark_deferred(channel, server.url, count, delay)
+        print("Enriched {} items with {:.1f}s latency: {:.3f}s serial vs {:.3f}s deferred ({:.1f}x)".format(
+            count, delay, serial, deferred, serial / deferred))
+    finally:
+        UriHandler.instance().close()
+        server.stop()
+        Logger.instance().close_log()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,158 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+""" Compares the single pass filtering and de-duplication of `Channel.process_folder_list()`
+with the multi-pass filtering it did before. Run it from the root of the add-on:
+
+    KODI_HOME=<kodi home> python -m tests.benchmarks.folderlist [<items>]
+
+"""
+
+import sys
+import time
+from typing import List, Tuple
+from unittest import mock
+
+
+def get_items(count: int) -> list:
+    """ Creates a listing with duplicates, DRM protected and paid items.
+
+    :param count:   The number of unique items.
+
+    :return: The MediaItems.
+    :rtype: list[MediaItem]
+
+    """
+
+    from resources.lib import mediatype
+    from resources.lib.mediaitem import MediaItem
+
+    items = [
+        MediaItem("Item {}".format(i), "https://example.com/item/{}".format(i), media_type=mediatype.VIDEO)
+        for i in range(count)
+    ]
+    items += items[:count // 4]
+    for item in items[::10]:
+        item.isDrmProtected = True
+    for item in items[5::10]:
+        item.isPaid = True
+    return items
+
+
+def filter_items_legacy(channel, items: list) -> list:
+    """ The filtering and de-duplication like `process_folder_list` did it before.
+
+    :param Channel channel:     The channel of the listing.
+    :param list items:          The MediaItems to filter.
+
+    :return: The visible items, without duplicates.
+    :rtype: list[MediaItem]
+
+    """
+
+    from resources.lib import mediatype
+    from resources.lib.addonsettings import AddonSettings, LOCAL
+    from resources.lib.cloaker import Cloaker
+    from resources.lib.logger import Logger
+
+    hide_premium = channel.filter_premium()
+    hide_premium = AddonSettings.hide_premium_items() if hide_premium is None else hide_premium
+    hide_geo_locked = AddonSettings.hide_geo_locked_items_for_location(channel.language)
+    hide_drm_protected = AddonSettings.hide_drm_items()
+    hide_folders = AddonSettings.hide_restricted_folders()
+    type_to_exclude = []
+    if not hide_folders:
+        type_to_exclude = mediatype.FOLDER_TYPES
+
+    if hide_drm_protected:
+        items = [i for i in items if not i.isDrmProtected or i.media_type in type_to_exclude]
+    if hide_geo_locked:
+        items = [i for i in items if not i.isGeoLocked or i.media_type in type_to_exclude]
+    if hide_premium:
+        items = [i for i in items if not i.isPaid or i.media_type in type_to_exclude]
+
+    cloaker = Cloaker(channel, AddonSettings.store(LOCAL), logger=Logger.instance())
+    if not AddonSettings.show_cloaked_items():
+        items = [i for i in items if not cloaker.is_cloaked(i.url)]
+    else:
+        cloaked_items = [i for i in items if cloaker.is_cloaked(i.url)]
+        for c in cloaked_items:
+            c.isCloaked = True
+
+    sorted_order = {}
+    for i in range(0, len(items)):
+        sorted_order[items[i]] = i
+    return sorted(set(items), key=sorted_order.get)
+
+
+def filter_items(channel, items: list) -> list:
+    """ The filtering and de-duplication like `process_folder_list` does it now.
+
+    :param Channel channel:     The channel of the listing.
+    :param list items:          The MediaItems to filter.
+
+    :return: The visible items, without duplicates.
+    :rtype: list[MediaItem]
+
+    """
+
+    # noinspection PyProtectedMember
+    return list(dict.fromkeys(channel._Channel__get_visible_items(items)))
+
+
+def benchmark_filter(channel, items: list, count: int = 5) -> Tuple[float, float]:
+    """ Filters the same items with both the multi-pass and the single pass filtering.
+
+    :param Channel channel:     The channel of the listing.
+    :param list items:          The MediaItems to filter.
+    :param count:               The number of times to repeat it.
+
+    :return: The multi-pass and single pass duration (ms).
+
+    """
+
+    from resources.lib.addonsettings import AddonSettings
+
+    durations = []
+    results = []
+    with mock.patch.object(AddonSettings, "hide_drm_items", return_value=True), \
+            mock.patch.object(AddonSettings, "hide_premium_items", return_value=True):
+        for filter_function in (filter_items_legacy, filter_items):
+            start = time.perf_counter()
+            for _ in range(count):
+                result = filter_function(channel, items)
+            durations.append((time.perf_counter() - start) * 1000 / count)
+            results.append(result)
+
+    # The legacy sorting put duplicates at their last position, so only compare the items.
+    if set(results[0]) != set(results[1]) or len(results[0]) != len(results[1]):
+        raise ValueError("The single pass filtering differs from the multi-pass filtering")
+    return durations[0], durations[1]
+
+
+def main(args: List[str]) -> None:
+    from resources.lib.logger import Logger
+    from resources.lib.retroconfig import Config
+    from resources.lib.textures import TextureHandler
+    from resources.lib.urihandler import UriHandler
+
+    count = int(args[0]) if args else 4000
+
+    Logger.create_logger(None, "FolderList", min_log_level=Logger.LVL_INFO)
+    try:
+        # The channels need a logger during import.
+        from resources.lib.helpers.channelimporter import ChannelIndex
+
+        UriHandler.create_uri_handler()
+        TextureHandler.set_texture_handler(Config, Logger.instance(), UriHandler.instance())
+        channel = ChannelIndex.get_register().get_channel("channel.regionalnl.at5", None)
+
+        items = get_items(count)
+        print("Filtering {} items: multi-pass={:.2f}ms single-pass={:.2f}ms".format(
+            len(items), *benchmark_filter(channel, items)))
+    finally:
+        UriHandler.instance().close()
+        Logger.instance().close_log()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
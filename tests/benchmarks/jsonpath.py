@@ -0,0 +1,155 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+""" Compares the compiled JSON DataParser paths with interpreting the paths for each listing.
+
+The repository has no NPO and SVT JSON fixtures, so the data has the form of those APIs and
+the paths are the real parser paths of those channels. Run it from the root of the add-on:
+
+    KODI_HOME=<kodi home> python -m tests.benchmarks.jsonpath [<count>]
+
+"""
+
+import sys
+import time
+from typing import Any, List, Tuple
+
+
+def get_npo_episodes(count: int) -> List[dict]:
+    """ Creates episodes in the form of the NPO API.
+
+    :param count:   The number of episodes.
+
+    :return: The episodes.
+
+    """
+
+    return [{
+        "title": "Aflevering {}".format(i),
+        "productId": "POW_{:08d}".format(i),
+        "series": {"title": "Het Journaal", "slug": "nos-journaal"},
+        "images": [{"url": "https://images.npo.nl/image/{}.jpg".format(i)}],
+        "synopsis": {"long": "Het laatste nieuws van vandaag."},
+        "durationInSeconds": 1800,
+        "firstBroadcastDate": 1615750200 + i,
+        "restrictions": [{"subscriptionType": "free", "isStreamReady": True,
+                          "available": {"from": 1615750200, "till": 1647286200}}]
+    } for i in range(count)]
+
+
+def get_fixtures() -> List[Tuple[Any, list]]:
+    """ JSON data in the form of the NPO and SVT APIs, with the parser paths of those channels.
+
+    :return: The data and parser path pairs.
+
+    """
+
+    episodes = get_npo_episodes(50)
+    npo = {"items": episodes, "collections": [{"guid": str(i), "items": episodes[:5]} for i in range(10)]}
+    svt_items = [{"item": {"__typename": "Single", "name": "Program {}".format(i)}} for i in range(50)]
+    svt = {
+        "data": {
+            "categoryPage": {
+                "lazyLoadedTabs": [
+                    {"slug": "popular", "selections": [{"items": svt_items[:10]}]},
+                    {"slug": "all", "selections": [{"items": svt_items}]}
+                ]
+            },
+            "selectionById": {"items": svt_items},
+            "programAtillO": {"flat": svt_items},
+            "searchPage": {"flat": {"hits": []}}
+        }
+    }
+    return [
+        (npo, ["items"]),
+        (npo, ["collections"]),
+        (npo["items"][0], []),
+        (svt, ["data", "categoryPage", "lazyLoadedTabs", ("slug", "all", 0), "selections", 0, "items"]),
+        (svt, ["data", "selectionById", "items"]),
+        (svt, ["data", "programAtillO", "flat"]),
+        (svt, ["data", "searchPage", "flat", "hits"]),
+        (svt, ["data", "channels", "channels"])
+    ]
+
+
+def parse_legacy(parser: list, data: Any) -> list:
+    """ The parsing like `Channel.process_folder_list` did it before.
+
+    :param parser:  The parser path.
+    :param data:    The JSON data.
+
+    :return: The parser results.
+
+    """
+
+    parser_results = data
+    for element in parser:
+        # Find the right elements
+        if isinstance(element, tuple):
+            # We need to match a key in a list of objects.
+            key, value, index = element
+            parser_results = [p for p in parser_results if p.get(key) == value]
+            if not parser_results:
+                parser_results = []
+                break
+            if index is not None:
+                parser_results = parser_results[index]
+
+        elif isinstance(parser_results, list):
+            parser_results = parser_results[element]
+        else:
+            parser_results = parser_results.get(element)
+
+        if not parser_results:
+            parser_results = []
+            break
+
+    if not isinstance(parser_results, (tuple, list)):
+        # if there is just one match, return that as a list
+        parser_results = [parser_results]
+    return parser_results
+
+
+def benchmark_parsers(fixtures: List[Tuple[Any, list]], count: int = 20000) -> Tuple[float, float]:
+    """ Parses all fixtures with the interpreted and the compiled parser paths.
+
+    :param fixtures:    The data and parser path pairs.
+    :param count:       The number of times to repeat it.
+
+    :return: The interpreted and compiled duration per path (us).
+
+    """
+
+    from resources.lib.helpers.jsonhelper import JsonHelper
+
+    compiled = [(data, JsonHelper.compile_parser(parser)) for data, parser in fixtures]
+
+    start = time.perf_counter()
+    for _ in range(count):
+        for data, parser in fixtures:
+            parse_legacy(parser, data)
+    legacy_duration = (time.perf_counter() - start) * 1000 * 1000 / count / len(fixtures)
+
+    start = time.perf_counter()
+    for _ in range(count):
+        for data, parse in compiled:
+            parse(data)
+    duration = (time.perf_counter() - start) * 1000 * 1000 / count / len(fixtures)
+    return legacy_duration, duration
+
+
+def main(args: List[str]) -> None:
+    from resources.lib.logger import Logger
+
+    count = int(args[0]) if args else 20000
+
+    Logger.create_logger(None, "JsonPath", min_log_level=Logger.LVL_INFO)
+    try:
+        fixtures = get_fixtures()
+        print("Parsing {} NPO/SVT parser paths: legacy={:.2f}us compiled={:.2f}us".format(
+            len(fixtures), *benchmark_parsers(fixtures, count)))
+    finally:
+        Logger.instance().close_log()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,229 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import json
+import os
+import shutil
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from resources.lib.logger import Logger
+from resources.lib.urihandler import UriHandler
+
+
+class LocalServer(object):
+    def __init__(self, use_tls=True):
+        """ A local HTTP(S) stand-in server for the remote API's used by the channels. It counts
+        the TCP connections (and thus TLS handshakes) and the requests it receives.
+
+        Any path returns a small JSON body. The query string can be used to steer a response:
+
+        * delay=<seconds>       - wait before responding.
+        * status=<code>         - respond with this HTTP status code.
+        * max-age=<seconds>     - add a `cache-control: max-age=<seconds>` header.
+        * cache-control=<value> - add a `cache-control: <value>` header.
+        * etag=<value>          - add an `etag` header and respond with 304 if it matches.
+        * last-modified=<date>  - add a `last-modified` header and respond with 304 if the
+                                  `if-modified-since` header matches.
+
+        The `forced_status` overrides the status code of all responses.
+
+        :param bool use_tls:    Should HTTPS be used?
+
+        """
+
+        self.use_tls = use_tls
+        self.connections = 0
+        self.requests = 0
+        self.paths = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.forced_status = None
+
+        self.__lock = threading.Lock()
+        self.__cert_dir = None
+        self.__server = None
+        self.__thread = None
+
+    @staticmethod
+    def can_use_tls():
+        """ Checks if a self-signed certificate could be created.
+
+        :rtype: bool
+
+        """
+
+        return shutil.which("openssl") is not None
+
+    @property
+    def url(self):
+        host, port = self.__server.server_address[0:2]
+        return "{}://{}:{}".format("https" if self.use_tls else "http", host, port)
+
+    def start(self):
+        server = _CountingServer(("127.0.0.1", 0), _Handler)
+        server.owner = self
+
+        if self.use_tls:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(*self.__create_certificate())
+            server.socket = context.wrap_socket(server.socket, server_side=True)
+
+        self.__server = server
+        self.__thread = threading.Thread(target=server.serve_forever, daemon=True)
+        self.__thread.start()
+        return self
+
+    def stop(self):
+        self.__server.shutdown()
+        self.__server.server_close()
+        if self.__cert_dir:
+            shutil.rmtree(self.__cert_dir, ignore_errors=True)
+
+    def reset(self):
+        with self.__lock:
+            self.connections = 0
+            self.requests = 0
+            self.paths = []
+            self.in_flight = 0
+            self.max_in_flight = 0
+            self.forced_status = None
+
+    def _count_connection(self):
+        with self.__lock:
+            self.connections += 1
+
+    def _count_request(self, path):
+        with self.__lock:
+            self.requests += 1
+            self.paths.append(path)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def _count_response(self):
+        with self.__lock:
+            self.in_flight -= 1
+
+    def __create_certificate(self):
+        self.__cert_dir = tempfile.mkdtemp(prefix="retro_cert_")
+        cert_file = os.path.join(self.__cert_dir, "cert.pem")
+        key_file = os.path.join(self.__cert_dir, "key.pem")
+        subprocess.check_call(
+            ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+             "-subj", "/CN=127.0.0.1", "-keyout", key_file, "-out", cert_file],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        return cert_file, key_file
+
+
+class LocalServerTestCase(unittest.TestCase):
+    """ A test case with a LocalServer that is shared by all of its tests. Each test starts
+    without a UriHandler and with an empty `output_folder`, and the UriHandler is closed
+    afterwards. """
+
+    # Should the server use HTTPS?
+    use_tls = False
+    server = None  # type: LocalServer
+
+    @classmethod
+    def setUpClass(cls):
+        if cls.use_tls and not LocalServer.can_use_tls():
+            raise unittest.SkipTest("No openssl available to create a certificate.")
+
+        Logger.create_logger(None, str(cls), min_log_level=0)
+        cls.server = LocalServer(use_tls=cls.use_tls).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+        Logger.instance().close_log()
+
+    def setUp(self):
+        UriHandler._UriHandler__handler = None
+        self.output_folder = tempfile.mkdtemp(prefix="retro_test_")
+        self.server.reset()
+
+    def tearDown(self):
+        if UriHandler.instance():
+            UriHandler.instance().close()
+        shutil.rmtree(self.output_folder)
+
+
+class _CountingServer(ThreadingHTTPServer):
+    daemon_threads = True
+    block_on_close = False
+    owner = None  # type: LocalServer
+
+    def get_request(self):
+        request = super(_CountingServer, self).get_request()
+        self.owner._count_connection()
+        return request
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # Keep-Alive is only supported for HTTP/1.1
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, prevent delayed ACKs from stalling them.
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.__respond(True)
+
+    def do_HEAD(self):
+        self.__respond(False)
+
+    def do_POST(self):
+        length = int(self.headers.get("content-length", 0))
+        self.rfile.read(length)
+        self.__respond(True)
+
+    def log_message(self, *args):
+        pass
+
+    def __respond(self, with_body):
+        self.server.owner._count_request(self.path)
+        try:
+            self.__write_response(with_body)
+        finally:
+            self.server.owner._count_response()
+
+    def __write_response(self, with_body):
+        url = urlparse(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+
+        delay = float(query.get("delay", 0))
+        if delay:
+            time.sleep(delay)
+
+        status = self.server.owner.forced_status or int(query.get("status", 200))
+        etag = query.get("etag")
+        if etag and self.headers.get("if-none-match") == etag:
+            status = 304
+        last_modified = query.get("last-modified")
+        if last_modified and self.headers.get("if-modified-since") == last_modified:
+            status = 304
+
+        body = json.dumps({"path": url.path, "query": query, "time": time.time()}).encode()
+        self.send_response(status)
+        self.send_header("content-type", "application/json; charset=utf-8")
+        if "max-age" in query:
+            self.send_header("cache-control", "max-age={}".format(query["max-age"]))
+        if "cache-control" in query:
+            self.send_header("cache-control", query["cache-control"])
+        if etag:
+            self.send_header("etag", etag)
+        if last_modified:
+            self.send_header("last-modified", last_modified)
+
+        if status == 304 or not with_body:
+            self.send_header("content-length", "0")
+            self.end_headers()
+            return
+
+        self.send_header("content-length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
@@ -0,0 +1,113 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+""" Benchmarks MediaItems: de-duplicating them with their GUIDs and the memory they use. Run it
+from the root of the add-on:
+
+    KODI_HOME=<kodi home> python -m tests.benchmarks.mediaitems [<items>]
+
+"""
+
+import sys
+import time
+import tracemalloc
+from typing import List, Tuple
+
+
+class DictItem(object):
+    def __init__(self, item):
+        """ Keeps the attributes of an item in a `__dict__`, like MediaItems did before the
+        slots were used.
+
+        :param MediaItem item: The item to copy.
+
+        """
+
+        self.__dict__.update(item._MediaItem__get_values())
+
+
+def get_items(count: int) -> list:
+    """ Creates MediaItems like the ones of an episode listing.
+
+    :param count:   The number of items.
+
+    :return: The MediaItems.
+    :rtype: list[MediaItem]
+
+    """
+
+    from resources.lib import mediatype
+    from resources.lib.mediaitem import MediaItem
+
+    items = []
+    for i in range(count):
+        item = MediaItem("Item {}".format(i), "https://example.com/item/{}".format(i), media_type=mediatype.EPISODE)
+        item.description = "Een beschrijving van de aflevering met nummer {}".format(i)
+        item.thumb = "https://images.example.com/{}/640.jpg".format(i)
+        items.append(item)
+    return items
+
+
+def benchmark_guids(count: int) -> Tuple[float, float]:
+    """ De-duplicates new items with the legacy MD5 GUIDs and with the BLAKE2b GUIDs.
+
+    :param count:   The number of items.
+
+    :return: The legacy and BLAKE2b duration (ms).
+
+    """
+
+    # The legacy guids, like they were calculated before.
+    items = get_items(count)
+    start = time.perf_counter()
+    legacy = set(int("0x%s" % (item.legacy_guid, ), 0) for item in items)
+    legacy_duration = (time.perf_counter() - start) * 1000
+
+    items = get_items(count)
+    start = time.perf_counter()
+    unique = set(items)
+    duration = (time.perf_counter() - start) * 1000
+
+    if len(legacy) != len(unique):
+        raise ValueError("The BLAKE2b GUIDs are not unique")
+    return legacy_duration, duration
+
+
+def measure_memory(count: int) -> Tuple[int, int]:
+    """ Measures the memory of items with their attributes in a `__dict__` and in slots.
+
+    :param count:   The number of items.
+
+    :return: The memory of the items with a `__dict__` and with slots (bytes).
+
+    """
+
+    sizes = []
+    for factory in (lambda c: [DictItem(item) for item in get_items(c)], get_items):
+        tracemalloc.start()
+        try:
+            items = factory(count)
+            sizes.append(tracemalloc.get_traced_memory()[0])
+        finally:
+            tracemalloc.stop()
+        del items
+    return sizes[0], sizes[1]
+
+
+def main(args: List[str]) -> None:
+    from resources.lib.logger import Logger
+
+    count = int(args[0]) if args else 10000
+
+    Logger.create_logger(None, "MediaItems", min_log_level=Logger.LVL_INFO)
+    try:
+        print("Deduplicating {} items: legacy={:.2f}ms blake2b={:.2f}ms".format(count, *benchmark_guids(count)))
+
+        dicts, slots = measure_memory(count)
+        print("Memory of {} items: dict={:.1f}MB slots={:.1f}MB ({:.0f} bytes/item less)".format(
+            count, dicts / 1024 / 1024, slots / 1024 / 1024, (dicts - slots) / count))
+    finally:
+        Logger.instance().close_log()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
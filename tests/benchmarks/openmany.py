@@ -0,0 +1,69 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+""" Compares fetching a batch of URLs one by one with `UriHandler.open_many()`.
+
+The URLs are served by a local server that adds a fixed latency to each response, like the EPG
+requests of the live channels have. Run it from the root of the add-on:
+
+    KODI_HOME=<kodi home> python -m tests.benchmarks.openmany [<count> [<delay>]]
+
+"""
+
+import json
+import sys
+import time
+from typing import List, Tuple
+
+
+def benchmark_open_many(url: str, count: int, delay: float, max_workers: int = 6) -> Tuple[float, float]:
+    """ Fetches the same URLs serially and concurrently.
+
+    :param url:             The url of the local server.
+    :param count:           The number of URLs to fetch.
+    :param delay:           The latency of each response (seconds).
+    :param max_workers:     The number of concurrent requests.
+
+    :return: The serial and concurrent duration (seconds).
+
+    """
+
+    from resources.lib.urihandler import UriHandler
+
+    urls = ["{}/epg/{}?delay={}".format(url, i, delay) for i in range(count)]
+
+    start = time.perf_counter()
+    serial = [UriHandler.open(u) for u in urls]
+    serial_duration = time.perf_counter() - start
+
+    start = time.perf_counter()
+    concurrent = UriHandler.open_many(urls, max_workers=max_workers)
+    concurrent_duration = time.perf_counter() - start
+
+    if [json.loads(d)["path"] for d in serial] != [json.loads(r.data)["path"] for r in concurrent]:
+        raise ValueError("The concurrent results differ from the serial ones")
+    return serial_duration, concurrent_duration
+
+
+def main(args: List[str]) -> None:
+    from resources.lib.logger import Logger
+    from resources.lib.urihandler import UriHandler
+    from tests.benchmarks.localserver import LocalServer
+
+    count = int(args[0]) if args else 12
+    delay = float(args[1]) if len(args) > 1 else 0.2
+
+    Logger.create_logger(None, "OpenMany", min_log_level=Logger.LVL_INFO)
+    server = LocalServer(use_tls=False).start()
+    try:
+        UriHandler.create_uri_handler()
+        serial, concurrent = benchmark_open_many(server.url, count, delay)
+        print("Fetched {} urls with {:.1f}s latency: {:.3f}s serial vs {:.3f}s concurrent ({:.1f}x)".format(
+            count, delay, serial, concurrent, serial / concurrent))
+    finally:
+        UriHandler.instance().close()
+        server.stop()
+        Logger.instance().close_log()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
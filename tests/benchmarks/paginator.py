@@ -0,0 +1,84 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+""" Compares fetching the pages of a listing one after the other with `Channel._fetch_pages()`.
+
+The pages are served by a local server that adds a fixed latency to each response. Run it from
+the root of the add-on:
+
+    KODI_HOME=<kodi home> python -m tests.benchmarks.paginator [<pages> [<delay>]]
+
+"""
+
+import json
+import sys
+import time
+from typing import List, Tuple
+
+
+def benchmark_pages(channel, url: str, count: int, delay: float, max_workers: int = 6) -> Tuple[float, float]:
+    """ Fetches the same pages sequentially and concurrently.
+
+    :param Channel channel:     The channel to fetch the pages with.
+    :param url:                 The url of the local server.
+    :param count:               The number of pages to fetch.
+    :param delay:               The latency of each page (seconds).
+    :param max_workers:         The number of concurrent requests.
+
+    :return: The sequential and concurrent duration (seconds).
+
+    """
+
+    from resources.lib.urihandler import UriHandler
+
+    urls = ["{}/page/{}?delay={}".format(url, i, delay) for i in range(count)]
+
+    def parse_page(data):
+        return [json.loads(data)["path"]]
+
+    start = time.perf_counter()
+    sequential = []
+    for u in urls:
+        sequential += parse_page(UriHandler.open(u))
+    sequential_duration = time.perf_counter() - start
+
+    start = time.perf_counter()
+    # noinspection PyProtectedMember
+    concurrent = channel._fetch_pages(urls, parse_page, max_workers=max_workers, show_progress=False)
+    concurrent_duration = time.perf_counter() - start
+
+    if sequential != concurrent:
+        raise ValueError("The concurrent results differ from the sequential ones")
+    return sequential_duration, concurrent_duration
+
+
+def main(args: List[str]) -> None:
+    from resources.lib.logger import Logger
+    from resources.lib.retroconfig import Config
+    from resources.lib.textures import TextureHandler
+    from resources.lib.urihandler import UriHandler
+    from tests.benchmarks.localserver import LocalServer
+
+    count = int(args[0]) if args else 12
+    delay = float(args[1]) if len(args) > 1 else 0.1
+
+    Logger.create_logger(None, "Paginator", min_log_level=Logger.LVL_INFO)
+    server = LocalServer(use_tls=False).start()
+    try:
+        # The channels need a logger during import.
+        from resources.lib.helpers.channelimporter import ChannelIndex
+
+        UriHandler.create_uri_handler()
+        TextureHandler.set_texture_handler(Config, Logger.instance(), UriHandler.instance())
+        channel = ChannelIndex.get_register().get_channel("channel.regionalnl.at5", None)
+
+        sequential, concurrent = benchmark_pages(channel, server.url, count, delay)
+        print("Fetched {} pages with {:.1f}s latency: {:.3f}s sequential vs {:.3f}s concurrent ({:.1f}x)".format(
+            count, delay, sequential, concurrent, sequential / concurrent))
+    finally:
+        UriHandler.instance().close()
+        server.stop()
+        Logger.instance().close_log()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
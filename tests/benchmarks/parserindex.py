@@ -0,0 +1,125 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+""" Compares finding the DataParsers for a URL using the `ParserIndex` with checking all keys
+of a channel like it was done before. Run it from the root of the add-on:
+
+    KODI_HOME=<kodi home> python -m tests.benchmarks.parserindex [<channel id> <channel code>]
+
+"""
+
+import sys
+import time
+from typing import List, Tuple
+
+
+def get_urls(channel) -> List[str]:
+    """ Creates URLs for all keys of a channel, matching and not matching ones.
+
+    :param Channel channel:     The channel with the DataParsers.
+
+    :return: The URLs.
+
+    """
+
+    urls = []
+    for key in channel.dataParsers:
+        if key.startswith("#") or key == "*":
+            continue
+        urls += [key, key + "?page=2", "https://example.com/" + key, key + ".json"]
+    urls.append("https://example.com/unknown")
+    return urls
+
+
+def get_data_parsers_legacy(channel, url: str) -> list:
+    """ The lookup like `Channel.__get_data_parsers` did it before, without logging.
+
+    :param Channel channel:     The channel with the DataParsers.
+    :param url:                 The URL to find the DataParsers for.
+
+    :return: The matching DataParsers.
+    :rtype: list[ParserData]
+
+    """
+
+    data_parsers = None
+    keys = sorted(channel.dataParsers.keys(), key=len, reverse=True)
+    for key in keys:
+        data_parsers = [d for d in channel.dataParsers[key] if d.matches(url)]
+        if data_parsers:
+            break
+
+    if not data_parsers:
+        data_parsers = channel.dataParsers.get("*", [])
+    return [d for d in data_parsers if not d.Label]
+
+
+def get_data_parsers_indexed(channel, index, url: str) -> list:
+    """ The lookup like `Channel.__get_data_parsers` does it now, without logging.
+
+    :param Channel channel:     The channel with the DataParsers.
+    :param ParserIndex index:   The index of the DataParsers of the channel.
+    :param url:                 The URL to find the DataParsers for.
+
+    :return: The matching DataParsers.
+    :rtype: list[ParserData]
+
+    """
+
+    key = index.find(url)
+    data_parsers = [d for d in channel.dataParsers[key] if d.matches(url)] if key is not None else None
+    if not data_parsers:
+        data_parsers = channel.dataParsers.get("*", [])
+    return [d for d in data_parsers if not d.Label]
+
+
+def benchmark_lookup(channel, count: int = 20) -> Tuple[float, float]:
+    """ Finds the DataParsers for all URLs of a channel with both lookups.
+
+    :param Channel channel:     The channel with the DataParsers.
+    :param count:               The number of times to repeat it.
+
+    :return: The linear and indexed duration per URL (us).
+
+    """
+
+    from resources.lib.parserindex import ParserIndex
+
+    urls = get_urls(channel)
+    index = ParserIndex.get_index(channel.dataParsers)
+    durations = []
+    for get_data_parsers in (lambda u: get_data_parsers_legacy(channel, u),
+                             lambda u: get_data_parsers_indexed(channel, index, u)):
+        start = time.perf_counter()
+        for _ in range(count):
+            for url in urls:
+                get_data_parsers(url)
+        durations.append((time.perf_counter() - start) * 1000 * 1000 / count / len(urls))
+    return durations[0], durations[1]
+
+
+def main(args: List[str]) -> None:
+    from resources.lib.logger import Logger
+    from resources.lib.retroconfig import Config
+    from resources.lib.textures import TextureHandler
+    from resources.lib.urihandler import UriHandler
+
+    channel_id, channel_code = args[:2] if len(args) > 1 else ("channel.nos.nos2010", "uzgjson")
+
+    Logger.create_logger(None, "ParserIndex", min_log_level=Logger.LVL_INFO)
+    try:
+        # The channels need a logger during import.
+        from resources.lib.helpers.channelimporter import ChannelIndex
+
+        UriHandler.create_uri_handler()
+        TextureHandler.set_texture_handler(Config, Logger.instance(), UriHandler.instance())
+        channel = ChannelIndex.get_register().get_channel(channel_id, channel_code)
+
+        print("Finding DataParsers for {} keys: linear={:.1f}us index={:.1f}us".format(
+            len(channel.dataParsers), *benchmark_lookup(channel)))
+    finally:
+        UriHandler.instance().close()
+        Logger.instance().close_log()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
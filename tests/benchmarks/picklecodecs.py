@@ -0,0 +1,119 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+""" Benchmarks the PickleStore codecs with real MediaItem listings.
+
+The listings are the PickleStore files of a Kodi profile. They contain the listings of all the
+channels that were used, so browse a few channels with the add-on first. Run it from the root
+of the add-on:
+
+    KODI_HOME=<kodi home> python -m tests.benchmarks.picklecodecs [<pickles folder>]
+
+"""
+
+import glob
+import io
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import time
+import zlib
+from typing import Dict, List, Tuple
+
+
+def load_listings(pickles_path: str) -> List[dict]:
+    """ Loads the listings from the PickleStore files in a folder.
+
+    :param pickles_path: The "pickles" folder of the profile.
+
+    :return: The content of each of the stores.
+
+    """
+
+    from resources.lib.picklestore import PickleStoreFile
+
+    listings = []
+    for path in glob.glob(os.path.join(pickles_path, "*", "*", "*.store.*")):
+        try:
+            if path.endswith(".store.z"):
+                with io.open(path, "rb") as fp:
+                    listings.append(pickle.loads(zlib.decompress(fp.read())))
+            else:
+                listings.append(PickleStoreFile(path).read())
+        except Exception as ex:
+            print("Skipping {}: {}".format(path, ex))
+    return listings
+
+
+def benchmark_codecs(listings: List[dict], output_folder: str, count: int = 3) -> Dict[str, Tuple[float, float, int]]:
+    """ Writes and reads all listings with each of the available codecs.
+
+    :param listings:        The listings to store.
+    :param output_folder:   The folder to write the stores to.
+    :param count:           The number of times to repeat it.
+
+    :return: The write duration (ms), read duration (ms) and total size (bytes) per codec.
+
+    """
+
+    from resources.lib import picklecodec
+    from resources.lib.picklestore import PickleStoreFile
+
+    results = {}
+    for codec in picklecodec.get_codecs():
+        stores = [
+            PickleStoreFile(os.path.join(output_folder, "{}.{}.store.i".format(i, codec)), codec)
+            for i in range(len(listings))
+        ]
+
+        start = time.perf_counter()
+        for _ in range(count):
+            for store, listing in zip(stores, listings):
+                store.write(listing)
+        write_duration = (time.perf_counter() - start) * 1000 / count
+
+        start = time.perf_counter()
+        for _ in range(count):
+            for store in stores:
+                store.read()
+        read_duration = (time.perf_counter() - start) * 1000 / count
+
+        size = sum(os.path.getsize(store.path) for store in stores)
+        results[codec] = (write_duration, read_duration, size)
+    return results
+
+
+def print_results(results: Dict[str, Tuple[float, float, int]], items: int) -> None:
+    print("{:<10} {:>10} {:>10} {:>12} {:>10}".format("codec", "write ms", "read ms", "bytes", "bytes/item"))
+    for codec, (write_duration, read_duration, size) in results.items():
+        print("{:<10} {:>10.1f} {:>10.1f} {:>12} {:>10.0f}".format(
+            codec, write_duration, read_duration, size, size / max(items, 1)))
+
+
+def main(pickles_path: str) -> None:
+    from resources.lib.logger import Logger
+
+    Logger.create_logger(None, "PickleCodecs", min_log_level=Logger.LVL_INFO)
+    try:
+        listings = load_listings(pickles_path)
+        items = sum(len(listing["children"]) for listing in listings)
+        print("Found {} listings with {} items in '{}'".format(len(listings), items, pickles_path))
+        if not listings:
+            return
+
+        output_folder = tempfile.mkdtemp(prefix="retro_codecs_")
+        try:
+            print_results(benchmark_codecs(listings, output_folder), items)
+        finally:
+            shutil.rmtree(output_folder)
+    finally:
+        Logger.instance().close_log()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main(sys.argv[1])
+    else:
+        from resources.lib.retroconfig import Config
+        main(os.path.join(Config.profileDir, "pickles"))
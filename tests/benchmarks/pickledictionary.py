@@ -0,0 +1,145 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+""" Builds the zlib preset dictionary for URL pickles and measures the URL length reduction.
+
+The dictionary consists of pickles of typical MediaItems. Once a dictionary was shipped it must
+never change, because pickles in favourites and Kodi databases depend on it. A new dictionary
+gets a new version. Run it from the root of the add-on:
+
+    KODI_HOME=<kodi home> python -m tests.benchmarks.pickledictionary [<pickles folder>]
+    KODI_HOME=<kodi home> python -m tests.benchmarks.pickledictionary --build <output file>
+
+"""
+
+import io
+import pickle
+import sys
+from typing import List, Tuple
+
+# The maximum size of a zlib preset dictionary
+MAX_DICTIONARY_SIZE = 32 * 1024
+
+
+def get_sample_items() -> list:
+    """ Creates the MediaItems that are typical for the channels.
+
+    :return: The sample items, the most common kind of item last.
+
+    """
+
+    from resources.lib import mediatype
+    from resources.lib.mediaitem import MediaItem
+
+    live = MediaItem("NPO 1", "https://www.npostart.nl/live/npo-1", media_type=mediatype.VIDEO)
+    live.isLive = True
+    live.isGeoLocked = True
+    live.isDrmProtected = True
+    live.icon = "https://www.npostart.nl/images/npo-1/icon.png"
+    live.HttpHeaders = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)",
+                        "Authorization": "Bearer "}
+    stream = live.add_stream("https://live.npostart.nl/npo-1/index.mpd", 0)
+    stream.Adaptive = True
+    stream.add_property("inputstream.adaptive.license_type", "com.widevine.alpha")
+
+    search = MediaItem("Zoeken", "searchSite", media_type=mediatype.FOLDER)
+    search.complete = True
+    search.dontGroup = True
+
+    page = MediaItem("Meer...", "https://api.example.com/v1/programs?page=2&pageSize=50")
+    page.dontGroup = True
+    page.metaData["retrospect:parser"] = "page"
+
+    folder = MediaItem("Het Journaal", "https://www.example.com/api/v2/programs/het-journaal/episodes")
+    folder.description = "Het laatste nieuws van vandaag."
+    folder.set_artwork(thumb="https://images.example.com/image/320x180/123456.jpg",
+                       fanart="https://images.example.com/image/1920x1080/123456.jpg",
+                       poster="https://images.example.com/image/500x750/123456.jpg")
+    folder.metaData["id"] = "het-journaal"
+
+    episode = MediaItem("Aflevering 12", "https://api.example.com/v1/episodes/POW_01234567",
+                        media_type=mediatype.EPISODE, tv_show_title="Het Journaal")
+    episode.description = "In deze aflevering van het programma."
+    episode.thumb = "https://images.example.com/image/1280x720/POW_01234567.jpg"
+    episode.set_season_info(3, 12)
+    episode.set_date(2021, 3, 14, 20, 30, 0)
+    episode.set_info_label("duration", 1800)
+    episode.set_expire_datetime(None, 2022, 3, 14, 23, 59, 0)
+    episode.isPaid = False
+
+    video = MediaItem("Het Journaal 20.00 uur", "https://api.example.com/v1/videos/1234567",
+                      media_type=mediatype.VIDEO)
+    video.description = "Het laatste nieuws van vandaag."
+    video.thumb = "https://images.example.com/image/640x360/1234567.jpg"
+    video.set_date(2021, 3, 14, 20, 0, 0)
+    video.add_stream("https://cdn.example.com/vod/1234567/index.m3u8", 0,
+                     subtitle="https://cdn.example.com/vod/1234567/subtitles/nl.vtt")
+    return [live, search, page, folder, episode, video]
+
+
+def build_dictionary(items: list) -> bytes:
+    """ Builds a preset dictionary from pickles of typical items. Zlib finds matches at the end
+    of the dictionary using fewer bits, so the most common items should be last.
+
+    :param items: The items to build the dictionary from.
+
+    :return: The dictionary.
+
+    """
+
+    data = b"".join(pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL) for item in items)
+    return data[-MAX_DICTIONARY_SIZE:]
+
+
+def measure(items: list) -> Tuple[int, int]:
+    """ Measures the total length of the URL pickles for items.
+
+    :param items: The items to pickle.
+
+    :return: The total length of the normal and of the dictionary compressed URL pickles.
+
+    """
+
+    from resources.lib.pickler import Pickler
+
+    pickler = Pickler()
+    normal = sum(len(pickler.pickle_media_item(item)) for item in items)
+    compressed = sum(len(pickler.pickle_media_item(item, use_dictionary=True)) for item in items)
+    return normal, compressed
+
+
+def print_results(name: str, items: List, normal: int, compressed: int) -> None:
+    print("{:<20} {:>6} items {:>8.0f} -> {:>6.0f} chars/item ({:.0%} shorter)".format(
+        name, len(items), normal / max(len(items), 1), compressed / max(len(items), 1),
+        1 - compressed / max(normal, 1)))
+
+
+def main(args: List[str]) -> None:
+    from resources.lib.logger import Logger
+
+    Logger.create_logger(None, "PickleDictionary", min_log_level=Logger.LVL_INFO)
+    try:
+        if args[:1] == ["--build"]:
+            dictionary = build_dictionary(get_sample_items())
+            with io.open(args[1], "wb") as fp:
+                fp.write(dictionary)
+            print("Wrote a dictionary of {} bytes to '{}'".format(len(dictionary), args[1]))
+            return
+
+        items = get_sample_items()
+        print_results("samples", items, *measure(items))
+
+        if args:
+            from tests.benchmarks.picklecodecs import load_listings
+
+            for listing in load_listings(args[0]):
+                items = list(listing["children"].values())
+                if listing["parent"] is not None:
+                    items.append(listing["parent"])
+                if items:
+                    print_results(items[-1].name[:20], items, *measure(items))
+    finally:
+        Logger.instance().close_log()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,260 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+""" Benchmarks the PickleStore files with generated MediaItem listings:
+
+* reading a single item from an indexed store and from a legacy (zlib) store.
+* appending a few changed items to a store and rewriting it.
+* storing a listing compressed and uncompressed.
+* depickling items with the compact state and with all their attributes.
+* purging unexpired stores using the manifest and listing all store files.
+
+Run it from the root of the add-on:
+
+    KODI_HOME=<kodi home> python -m tests.benchmarks.picklestores [<items>]
+
+"""
+
+import glob
+import io
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import time
+import zlib
+from typing import List, Tuple
+from unittest import mock
+
+STORE_GUID = "abcdef01-1234-5678-9012-abcdefabcdef"
+
+
+def get_items(count: int, offset: int = 0) -> tuple:
+    """ Creates a parent and the child items of a listing.
+
+    :param count:   The number of child items.
+    :param offset:  The number of the first child item.
+
+    :return: The parent and the child items.
+    :rtype: tuple[MediaItem,list[MediaItem]]
+
+    """
+
+    from resources.lib.mediaitem import MediaItem
+
+    parent = MediaItem("Parent", "https://example.com/parent")
+    children = []
+    for i in range(offset, offset + count):
+        item = MediaItem("Item {}".format(i), "https://example.com/item/{}".format(i))
+        item.description = "Een beschrijving van de aflevering met nummer {}".format(i)
+        item.thumb = "https://images.example.com/{}/640.jpg".format(i)
+        children.append(item)
+    return parent, children
+
+
+def get_store_path(output_folder: str, ext: str) -> str:
+    """ Returns the path of the benchmark store in the profile folder of a Pickler. """
+
+    return os.path.join(output_folder, "pickles", STORE_GUID[0:2], STORE_GUID[2:4], "{}.{}".format(STORE_GUID, ext))
+
+
+def write_legacy_store(output_folder: str, parent, children: list) -> str:
+    """ Writes the items to a store like the Pickler did before the indexed stores.
+
+    :param output_folder:       The profile folder of the Pickler.
+    :param MediaItem parent:    The parent item.
+    :param children:            The child items.
+
+    :return: The path of the store.
+
+    """
+
+    path = get_store_path(output_folder, "store.z")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    content = {"parent": parent, "children": {item.guid: item for item in children}}
+    with io.open(path, "wb") as fp:
+        fp.write(zlib.compress(pickle.dumps(content, protocol=pickle.HIGHEST_PROTOCOL), zlib.Z_BEST_COMPRESSION))
+    return path
+
+
+def benchmark_read_item(output_folder: str, count: int, repeat: int = 20) -> Tuple[float, float]:
+    """ Reads a single item from a legacy store and from the indexed store it is converted to.
+
+    :param output_folder:   The profile folder of the Pickler.
+    :param count:           The number of items in the store.
+    :param repeat:          The number of times to repeat it.
+
+    :return: The legacy and indexed duration (ms).
+
+    """
+
+    from resources.lib.pickler import Pickler
+
+    parent, children = get_items(count)
+    write_legacy_store(output_folder, parent, children)
+    store_id = "{}--{}".format(STORE_GUID, children[count // 2].guid)
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        Pickler(output_folder).de_pickle_media_item(store_id)
+    legacy_duration = (time.perf_counter() - start) * 1000 / repeat
+
+    # Storing items converts the legacy store.
+    Pickler(output_folder).store_media_items(STORE_GUID, parent, [])
+    start = time.perf_counter()
+    for _ in range(repeat):
+        Pickler(output_folder).de_pickle_media_item(store_id)
+    indexed_duration = (time.perf_counter() - start) * 1000 / repeat
+    return legacy_duration, indexed_duration
+
+
+def benchmark_append(output_folder: str, count: int, repeat: int = 10) -> Tuple[float, float]:
+    """ Stores 20 items of which one changed, in a store with all items. Compares rewriting
+    the whole store with appending the changed item.
+
+    :param output_folder:   The profile folder of the Pickler.
+    :param count:           The number of items in the store.
+    :param repeat:          The number of times to repeat it.
+
+    :return: The rewrite and append duration (ms).
+
+    """
+
+    from resources.lib.pickler import Pickler
+    from resources.lib.picklestore import PickleStoreFile
+
+    pickler = Pickler(output_folder)
+    parent, children = get_items(count)
+    pickler.store_media_items(STORE_GUID, parent, children)
+    path = get_store_path(output_folder, "store.i")
+    content = PickleStoreFile(path).read()
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        PickleStoreFile(path).write(content)
+    write_duration = (time.perf_counter() - start) * 1000 / repeat
+
+    start = time.perf_counter()
+    for i in range(repeat):
+        children[i].description = "Changed"
+        pickler.store_media_items(STORE_GUID, parent, children[:20])
+    append_duration = (time.perf_counter() - start) * 1000 / repeat
+    return write_duration, append_duration
+
+
+def benchmark_uncompressed(output_folder: str, count: int, repeat: int = 5) -> Tuple[float, float]:
+    """ Stores a new listing with compressed and with uncompressed records.
+
+    :param output_folder:   The profile folder of the Pickler.
+    :param count:           The number of items in the listing.
+    :param repeat:          The number of times to repeat it.
+
+    :return: The compressed and uncompressed duration (ms).
+
+    """
+
+    from resources.lib.pickler import Pickler
+
+    pickler = Pickler(output_folder)
+    parent, children = get_items(count)
+    durations = []
+    for compress in (True, False):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for path in glob.glob(os.path.join(output_folder, "pickles", "*", "*", "*")):
+                os.remove(path)
+            pickler.store_media_items(STORE_GUID, parent, children, compress=compress)
+        durations.append((time.perf_counter() - start) * 1000 / repeat)
+    return durations[0], durations[1]
+
+
+def get_legacy_pickle(item) -> bytes:
+    """ Pickles all attributes of an item, like it was done before the compact state.
+
+    :param MediaItem item:  The item to pickle.
+
+    :return: The pickle.
+
+    """
+
+    # noinspection PyProtectedMember
+    with mock.patch.object(type(item), "__getstate__", lambda obj: dict(obj._MediaItem__get_values())):
+        return pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def benchmark_compact_state(count: int) -> Tuple[float, float]:
+    """ Depickles items that were pickled with all their attributes and with the compact state.
+
+    :param count:   The number of items.
+
+    :return: The legacy and compact duration (ms).
+
+    """
+
+    parent, children = get_items(count)
+    durations = []
+    for pickles in ([get_legacy_pickle(item) for item in children], [pickle.dumps(item) for item in children]):
+        start = time.perf_counter()
+        for data in pickles:
+            pickle.loads(data)
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations[0], durations[1]
+
+
+def benchmark_purge(output_folder: str, stores: int = 250, repeat: int = 10) -> Tuple[float, float]:
+    """ Purges stores that did not expire yet, using the manifest. Compares it with just listing
+    the store files, like the purge did before the manifest.
+
+    :param output_folder:   The profile folder of the Pickler.
+    :param stores:          The number of stores.
+    :param repeat:          The number of times to repeat it.
+
+    :return: The manifest and listing duration (ms).
+
+    """
+
+    from resources.lib.pickler import Pickler
+
+    pickler = Pickler(output_folder)
+    parent, children = get_items(5)
+    for i in range(stores):
+        pickler.store_media_items("{:08x}-1234-5678-9012-abcdefabcdef".format(i * 7919), parent, children)
+    pickler.purge_store("plugin.video.retrospect")
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        pickler.purge_store("plugin.video.retrospect")
+    purge_duration = (time.perf_counter() - start) * 1000 / repeat
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for path in glob.glob(os.path.join(output_folder, "pickles", "*", "*", "*")):
+            os.path.getctime(path)
+    glob_duration = (time.perf_counter() - start) * 1000 / repeat
+    return purge_duration, glob_duration
+
+
+def main(args: List[str]) -> None:
+    from resources.lib.logger import Logger
+
+    count = int(args[0]) if args else 1000
+
+    Logger.create_logger(None, "PickleStores", min_log_level=Logger.LVL_INFO)
+    output_folder = tempfile.mkdtemp(prefix="retro_stores_")
+    try:
+        print("Reading 1 of {} items: legacy={:.2f}ms indexed={:.2f}ms".format(
+            count, *benchmark_read_item(os.path.join(output_folder, "read"), count)))
+        print("Storing 20 of {} items: rewrite={:.2f}ms append={:.2f}ms".format(
+            count, *benchmark_append(os.path.join(output_folder, "append"), count)))
+        print("Storing {} items: compressed={:.2f}ms uncompressed={:.2f}ms".format(
+            count, *benchmark_uncompressed(os.path.join(output_folder, "uncompressed"), count)))
+        print("Depickling {} items: legacy={:.2f}ms compact={:.2f}ms".format(count, *benchmark_compact_state(count)))
+        print("Purging 250 unexpired stores: manifest={:.2f}ms glob={:.2f}ms".format(
+            *benchmark_purge(os.path.join(output_folder, "purge"))))
+    finally:
+        shutil.rmtree(output_folder)
+        Logger.instance().close_log()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
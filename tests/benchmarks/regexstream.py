@@ -0,0 +1,73 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+""" Compares getting the first matches of a regex DataParser with `Regexer.do_regex()` (findall)
+and `Regexer.iter_regex()` (finditer). Run it from the root of the add-on:
+
+    KODI_HOME=<kodi home> python -m tests.benchmarks.regexstream [<items> [<first>]]
+
+"""
+
+import itertools
+import sys
+import time
+from typing import List, Tuple
+
+# An item of an old-style HTML listing, like the regional channels parse them.
+ITEM_HTML = '<div class="item"><a href="/video/{0}" title="Aflevering {0}">' \
+            '<img src="https://images.example.com/{0}.jpg"></a><span class="date">{1:02d}-03-2021</span>' \
+            '<p class="description">Een beschrijving van aflevering {0} van het programma.</p></div>\n'
+DICTIONARY_REGEX = r'<a href="(?P<url>[^"]+)" title="(?P<title>[^"]+)">\W*<img src="(?P<thumb>[^"]+)"' \
+                   r'(?:[^>]*>){2}\W*<span class="date">(?P<date>[^<]+)'
+
+
+def get_html(count: int) -> str:
+    """ Creates an HTML listing.
+
+    :param count:   The number of items in the listing.
+
+    :return: The HTML.
+
+    """
+
+    return "<html><body>\n{}</body></html>".format(
+        "".join(ITEM_HTML.format(i, i % 28 + 1) for i in range(count)))
+
+
+def benchmark_first_matches(data: str, first: int) -> Tuple[float, float]:
+    """ Gets the first matches of the listing with findall and finditer.
+
+    :param data:    The HTML listing.
+    :param first:   The number of matches to get.
+
+    :return: The findall and finditer duration (ms).
+
+    """
+
+    from resources.lib.regexer import Regexer
+
+    durations = []
+    for get_results in (Regexer.do_regex, Regexer.iter_regex):
+        start = time.perf_counter()
+        results = list(itertools.islice(get_results(DICTIONARY_REGEX, data), first))
+        durations.append((time.perf_counter() - start) * 1000)
+        if len(results) != first:
+            raise ValueError("Expected {} matches, got {}".format(first, len(results)))
+    return durations[0], durations[1]
+
+
+def main(args: List[str]) -> None:
+    from resources.lib.logger import Logger
+
+    count = int(args[0]) if args else 20000
+    first = int(args[1]) if len(args) > 1 else 50
+
+    Logger.create_logger(None, "RegexStream", min_log_level=Logger.LVL_INFO)
+    try:
+        print("First {} of {} matches: findall={:.2f}ms finditer={:.2f}ms".format(
+            first, count, *benchmark_first_matches(get_html(count), first)))
+    finally:
+        Logger.instance().close_log()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
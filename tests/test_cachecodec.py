@@ -0,0 +1,73 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import hashlib
+import io
+import json
+
+from resources.lib.connectivity import cachecodec
+from resources.lib.urihandler import UriHandler
+from tests.benchmarks.localserver import LocalServerTestCase
+
+
+class TestCacheCodec(LocalServerTestCase):
+    def test_round_trip(self):
+        payload = self.__get_json_payload()
+        for codec in cachecodec.get_codecs():
+            fp = io.BytesIO()
+            cachecodec.write(codec, self.__chunk(payload, 128), fp)
+            fp.seek(0)
+
+            reader = cachecodec.open_reader(codec, fp)
+            chunks = iter(lambda: reader.read(128), b"")
+            self.assertEqual(payload, b"".join(chunks), codec)
+
+    def test_compressed_content_types(self):
+        self.assertEqual(cachecodec.IDENTITY, cachecodec.get_codec_for(cachecodec.ZLIB, "image/jpeg"))
+        self.assertEqual(cachecodec.IDENTITY, cachecodec.get_codec_for(cachecodec.ZLIB, "video/mp2t"))
+        self.assertEqual(cachecodec.ZLIB, cachecodec.get_codec_for(cachecodec.ZLIB, "application/json"))
+        self.assertEqual(cachecodec.ZLIB, cachecodec.get_codec_for(cachecodec.ZLIB, None))
+
+    def test_uri_handler(self):
+        UriHandler.create_uri_handler(cache_dir=self.output_folder)
+
+        url = "{}/manifest?max-age=60".format(self.server.url)
+        data = UriHandler.open(url)
+        self.assertEqual(data, UriHandler.open(url))
+        self.assertEqual(1, self.server.requests)
+
+        body_key = "{}.body".format(hashlib.md5(url.encode()).hexdigest())
+        with UriHandler.instance().cacheStore.get(body_key) as fp:
+            self.assertNotEqual(data.encode(), fp.read())
+
+    def test_uncompressed_entries(self):
+        # Entries that were stored without a codec marker are still readable.
+        UriHandler.create_uri_handler(cache_dir=self.output_folder)
+        url = "{}/manifest".format(self.server.url)
+        key = hashlib.md5(url.encode()).hexdigest()
+        cache_store = UriHandler.instance().cacheStore
+        with cache_store.set("{}.body".format(key)) as fp:
+            fp.write(b"cached")
+        with cache_store.set("{}.meta".format(key)) as fp:
+            fp.write(json.dumps({
+                "body": "{}.body".format(key), "url": url, "headers": {}, "status": 200,
+                "reason": "OK", "encoding": "utf-8", "cache_data": {}
+            }).encode())
+
+        self.assertEqual("cached", UriHandler.open(url))
+        self.assertEqual(0, self.server.requests)
+
+    def __get_json_payload(self):
+        items = [{
+            "id": "POW_{0:08d}".format(i),
+            "title": "Aflevering {}".format(i),
+            "description": "Een beschrijving van de aflevering met nummer {}".format(i),
+            "images": [{"url": "https://images.example.com/{}/{}.jpg".format(i, w), "width": w}
+                       for w in (320, 640, 1280)],
+            "duration": i * 7 % 3600,
+            "isOnlyOnNpoPlus": i % 5 == 0
+        } for i in range(2000)]
+        return json.dumps({"items": items}).encode()
+
+    def __chunk(self, payload, size):
+        for i in range(0, len(payload), size):
+            yield payload[i:i + size]
@@ -0,0 +1,105 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import os
+from unittest import mock
+
+import requests
+import urllib3
+
+from resources.lib.urihandler import UriHandler
+from tests.benchmarks.localserver import LocalServerTestCase
+
+
+class TestConnectionPool(LocalServerTestCase):
+    # The number of requests that a single folder listing does to the same API host.
+    listing_size = 25
+
+    use_tls = True
+    environment = None
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestConnectionPool, cls).setUpClass()
+
+        # CA bundles from the environment would overrule the `ignore_ssl_errors`.
+        cls.environment = mock.patch.dict(os.environ)
+        cls.environment.start()
+        for key in ("REQUESTS_CA_BUNDLE", "CURL_CA_BUNDLE"):
+            os.environ.pop(key, None)
+
+        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.environment.stop()
+        super(TestConnectionPool, cls).tearDownClass()
+
+    def test_listing_single_handshake(self):
+        UriHandler.create_uri_handler(ignore_ssl_errors=True)
+
+        self.__do_listing(lambda url: UriHandler.open(url))
+        self.assertEqual(self.listing_size, self.server.requests)
+        self.assertEqual(1, self.server.connections)
+
+    def test_listing_with_cache_single_handshake(self):
+        UriHandler.create_uri_handler(cache_dir=self.output_folder, ignore_ssl_errors=True)
+
+        # Mix cached and non-cached requests. They should share the same pool.
+        self.__do_listing(lambda url: UriHandler.open(url, no_cache=True))
+        self.__do_listing(lambda url: UriHandler.open("{}?max-age=0".format(url)))
+        self.assertEqual(2 * self.listing_size, self.server.requests)
+        self.assertEqual(1, self.server.connections)
+
+    def test_header_and_post_single_handshake(self):
+        UriHandler.create_uri_handler(ignore_ssl_errors=True)
+
+        UriHandler.header("{}/head".format(self.server.url))
+        UriHandler.open("{}/post".format(self.server.url), data={"test": "ok"})
+        UriHandler.open("{}/get".format(self.server.url))
+        self.assertEqual(3, self.server.requests)
+        self.assertEqual(1, self.server.connections)
+
+    def test_session_per_request_baseline(self):
+        """ The old behaviour: a new session for each request. """
+
+        def open_with_new_session(url):
+            with requests.session() as s:
+                s.verify = False
+                return s.get(url).text
+
+        self.__do_listing(open_with_new_session)
+        handshakes_new = self.server.connections
+
+        self.server.reset()
+        UriHandler.create_uri_handler(ignore_ssl_errors=True)
+        self.__do_listing(lambda url: UriHandler.open(url))
+
+        self.assertEqual(self.listing_size, handshakes_new)
+        self.assertEqual(1, self.server.connections)
+
+    def test_pool_size(self):
+        UriHandler.create_uri_handler(ignore_ssl_errors=True, pool_size=2)
+        self.assertEqual(2, UriHandler.instance().poolSize)
+
+        # Changing the pool size should create a new handler.
+        handler = UriHandler.instance()
+        UriHandler.create_uri_handler(ignore_ssl_errors=True, pool_size=4)
+        self.assertIsNot(handler, UriHandler.instance())
+        self.assertEqual(4, UriHandler.instance().poolSize)
+
+    def test_options_changed(self):
+        UriHandler.create_uri_handler(cache_dir=self.output_folder, ignore_ssl_errors=True)
+        handler = UriHandler.instance()
+        UriHandler.create_uri_handler(cache_dir=self.output_folder, ignore_ssl_errors=True)
+        self.assertIs(handler, UriHandler.instance())
+
+        # Any changed option should create a new handler.
+        UriHandler.create_uri_handler(cache_dir=self.output_folder, ignore_ssl_errors=True,
+                                      cache_backend="sqlite")
+        self.assertIsNot(handler, UriHandler.instance())
+        self.assertEqual("sqlite", UriHandler.instance().options["cache_backend"])
+
+    def __do_listing(self, opener):
+        for i in range(0, self.listing_size):
+            data = opener("{}/api/page/{}".format(self.server.url, i))
+            self.assertIn("/api/page/{}".format(i), data)
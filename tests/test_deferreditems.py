@@ -0,0 +1,103 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import json
+
+from resources.lib.logger import Logger
+from resources.lib.retroconfig import Config
+from resources.lib.textures import TextureHandler
+from resources.lib.urihandler import UriHandler
+from tests.benchmarks.localserver import LocalServerTestCase
+
+
+class TestDeferredItems(LocalServerTestCase):
+    # Simulated network latency per request.
+    delay = 0.1
+
+    @classmethod
+    def tearDownClass(cls):
+        from resources.lib.addonsettings import AddonSettings
+        AddonSettings.clear_cached_addon_settings_object()
+        super(TestDeferredItems, cls).tearDownClass()
+
+    def setUp(self):
+        from resources.lib.helpers.channelimporter import ChannelIndex
+
+        super(TestDeferredItems, self).setUp()
+        UriHandler.create_uri_handler()
+        TextureHandler.set_texture_handler(Config, Logger.instance(), UriHandler.instance())
+        self.channel = ChannelIndex.get_register().get_channel("channel.regionalnl.at5", None)
+
+    def test_enrich(self):
+        from resources.lib.chn_class import DeferredItem
+        from resources.lib.mediaitem import MediaItem
+
+        post_processed = []
+
+        def create_item(result_set):
+            item = MediaItem(result_set["title"], "https://example.com/{}".format(result_set["id"]))
+            if result_set["id"] % 3 == 0:
+                # Not all items need to be enriched.
+                return item
+            delay = self.delay * (result_set["id"] % 2)
+            url = "{}/info/{}?delay={}".format(self.server.url, result_set["id"], delay)
+            return DeferredItem(item, url, enrich)
+
+        def enrich(item, data):
+            path = json.loads(data)["path"]
+            if path.endswith("/4"):
+                return None
+            item.name = "{} ({})".format(item.name, path)
+            return item
+
+        def post_process(data, items):
+            post_processed.extend(items)
+            return items
+
+        items = self.__process_folder_list(create_item, count=8, post_processor=post_process)
+
+        self.assertEqual(["Item 0", "Item 1 (/info/1)", "Item 2 (/info/2)", "Item 3", "Item 5 (/info/5)",
+                          "Item 6", "Item 7 (/info/7)"], [i.name for i in items])
+        # The post-processor gets the enriched items.
+        self.assertEqual(items, post_processed)
+        self.assertEqual(5, self.server.requests)
+
+    def test_concurrent_results(self):
+        # The timings are compared by the `tests.benchmarks.deferreditems` script.
+        from resources.lib.chn_class import DeferredItem
+        from resources.lib.mediaitem import MediaItem
+
+        def create_item_serial(result_set):
+            item = MediaItem(result_set["title"], "https://example.com/{}".format(result_set["id"]))
+            return enrich(item, UriHandler.open(get_url(result_set)))
+
+        def create_item_deferred(result_set):
+            item = MediaItem(result_set["title"], "https://example.com/{}".format(result_set["id"]))
+            return DeferredItem(item, get_url(result_set), enrich)
+
+        def get_url(result_set):
+            return "{}/info/{}?delay={}".format(self.server.url, result_set["id"], self.delay)
+
+        def enrich(item, data):
+            item.description = json.loads(data)["path"]
+            return item
+
+        results = []
+        for create_item in (create_item_serial, create_item_deferred):
+            self.server.reset()
+            items = self.__process_folder_list(create_item, count=12)
+            results.append([(i.name, i.description) for i in items])
+
+        self.assertEqual(results[0], results[1])
+        self.assertGreater(self.server.max_in_flight, 1)
+
+    def __process_folder_list(self, creator, count, post_processor=None):
+        from resources.lib.helpers.jsonhelper import JsonHelper
+        from resources.lib.mediaitem import MediaItem
+
+        data = JsonHelper({"items": [{"id": i, "title": "Item {}".format(i)} for i in range(count)]})
+        self.channel.dataParsers.pop("#deferred", None)
+        # noinspection PyProtectedMember
+        self.channel._add_data_parser("#deferred", name="Deferred test", json=True,
+                                      preprocessor=lambda d: (data, []), parser=["items"],
+                                      creator=creator, postprocessor=post_processor)
+        return self.channel.process_folder_list(MediaItem("Deferred", "#deferred"))
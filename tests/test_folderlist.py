@@ -0,0 +1,80 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import unittest
+from unittest import mock
+
+from resources.lib.logger import Logger
+from resources.lib.retroconfig import Config
+from resources.lib.textures import TextureHandler
+from resources.lib.urihandler import UriHandler
+from tests.benchmarks import folderlist
+
+
+class TestFolderList(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        Logger.create_logger(None, str(cls), min_log_level=0)
+        UriHandler.create_uri_handler(ignore_ssl_errors=False)
+        TextureHandler.set_texture_handler(Config, Logger.instance(), UriHandler.instance())
+
+    @classmethod
+    def tearDownClass(cls):
+        from resources.lib.addonsettings import AddonSettings
+        AddonSettings.clear_cached_addon_settings_object()
+        Logger.instance().close_log()
+
+    def setUp(self):
+        from resources.lib.helpers.channelimporter import ChannelIndex
+        self.channel = ChannelIndex.get_register().get_channel("channel.regionalnl.at5", None)
+
+    def test_filter(self):
+        from resources.lib import mediatype
+        from resources.lib.addonsettings import AddonSettings
+        from resources.lib.mediaitem import MediaItem
+
+        items = self.__get_items(10)
+        items[1].isDrmProtected = True
+        items[2].isPaid = True
+        folder = MediaItem("Folder", "https://example.com/folder", media_type=mediatype.FOLDER)
+        folder.isDrmProtected = True
+        duplicate = self.__get_items(4)[3]
+        items += [folder, duplicate]
+
+        with mock.patch.object(AddonSettings, "hide_drm_items", return_value=True), \
+                mock.patch.object(AddonSettings, "hide_premium_items", return_value=True), \
+                mock.patch.object(AddonSettings, "hide_restricted_folders", return_value=False):
+            result = self.__process_folder_list(items)
+
+        # Restricted folders are shown, duplicates are removed and the order is kept.
+        self.assertEqual([items[0]] + items[3:11], result)
+        self.assertIs(items[3], result[1])
+
+    def test_filter_legacy(self):
+        # The timings are compared by the `tests.benchmarks.folderlist` script.
+        from resources.lib.addonsettings import AddonSettings
+
+        items = folderlist.get_items(4000)
+        with mock.patch.object(AddonSettings, "hide_drm_items", return_value=True), \
+                mock.patch.object(AddonSettings, "hide_premium_items", return_value=True):
+            result = folderlist.filter_items(self.channel, items)
+            legacy = folderlist.filter_items_legacy(self.channel, items)
+        # The legacy sorting put duplicates at their last position.
+        self.assertEqual(set(legacy), set(result))
+        self.assertEqual(3200, len(result))
+        self.assertEqual(len(legacy), len(result))
+
+    def __process_folder_list(self, items):
+        from resources.lib.mediaitem import MediaItem
+
+        # noinspection PyProtectedMember
+        self.channel._add_data_parser("#filter", name="Filter test", preprocessor=lambda data: (data, list(items)))
+        return self.channel.process_folder_list(MediaItem("Filter", "#filter"))
+
+    def __get_items(self, count):
+        from resources.lib import mediatype
+        from resources.lib.mediaitem import MediaItem
+
+        return [
+            MediaItem("Item {}".format(i), "https://example.com/item/{}".format(i), media_type=mediatype.VIDEO)
+            for i in range(count)
+        ]
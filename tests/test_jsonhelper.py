@@ -49,6 +49,25 @@ class TestJsonHelper(unittest.TestCase):
         self.assertEqual("yes", j.get_value("test3", "test2", fallback="yes"))
         self.assertIsNone(j.get_value("test3", "test2"))
 
+    def test_compile_parser(self):
+        data = {
+            "data": {
+                "tabs": [{"slug": "popular", "items": [1, 2]}, {"slug": "all", "items": [3, 4]}],
+                "single": {"id": 1},
+                "empty": {}
+            }
+        }
+        for parser, expected in (
+                ([], [data]),
+                (["data", "tabs", ("slug", "all", 0), "items"], [3, 4]),
+                (["data", "tabs", ("slug", "all", None)], [{"slug": "all", "items": [3, 4]}]),
+                (["data", "tabs", ("slug", "none", 0), "items"], []),
+                (["data", "tabs", 0, "items", 1], [2]),
+                (["data", "single"], [{"id": 1}]),
+                (["data", "empty", "items"], []),
+                (["data", "missing"], [])):
+            self.assertEqual(expected, jsonhelper.JsonHelper.compile_parser(parser)(data), parser)
+
     def test_dumps(self):
         data = {"success": True, "test": 4, "test2": "test", "test3": {"test": True}}
         str_data = jsonhelper.JsonHelper.dump(data, pretty_print=False, sort_keys=True)
@@ -0,0 +1,23 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import unittest
+
+from resources.lib.logger import Logger
+from tests.benchmarks import jsonpath
+
+
+class TestJsonPath(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        Logger.create_logger(None, str(cls), min_log_level=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        Logger.instance().close_log()
+
+    def test_parsers(self):
+        # The timings are compared by the `tests.benchmarks.jsonpath` script.
+        from resources.lib.helpers.jsonhelper import JsonHelper
+
+        for data, parser in jsonpath.get_fixtures():
+            self.assertEqual(jsonpath.parse_legacy(parser, data), JsonHelper.compile_parser(parser)(data))
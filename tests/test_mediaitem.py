@@ -0,0 +1,121 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import copyreg
+import pickle
+import unittest
+
+from resources.lib.logger import Logger
+
+
+class LegacyPickle(object):
+    def __init__(self, cls, state):
+        """ Pickles like classes without `__getstate__` and `__slots__` did: the class and its
+        `__dict__`.
+
+        :param type cls:    The class to pickle.
+        :param dict state:  The `__dict__` to pickle.
+
+        """
+
+        self.cls = cls
+        self.state = state
+
+    @property
+    def __class__(self):
+        # The pickler checks that the object is an instance of the class that is created.
+        return self.cls
+
+    def __reduce__(self):
+        return copyreg.__newobj__, (self.cls, ), self.state
+
+
+class TestMediaItem(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        Logger.create_logger(None, str(cls), min_log_level=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        Logger.instance().close_log()
+
+    def test_legacy_pickle(self):
+        from resources.lib import mediatype
+        from resources.lib.mediaitem import MediaItem, MediaStream
+
+        # An old state, with an old `type` and without attributes that were added later.
+        stream_state = {"Url": "https://example.com/stream.m3u8", "Bitrate": 1200, "Properties": []}
+        state = {
+            "name": "Item", "url": "https://example.com/item", "type": "video",
+            "description": "Description", "thumb": "https://example.com/thumb.jpg",
+            "_MediaItem__guid": "ABCDEF0123456789", "_MediaItem__guid_value": 0xABCDEF0123456789,
+            "streams": [LegacyPickle(MediaStream, stream_state)],
+        }
+        item = pickle.loads(pickle.dumps(LegacyPickle(MediaItem, state)))
+
+        self.assertIsInstance(item, MediaItem)
+        self.assertEqual(mediatype.VIDEO, item.media_type)
+        self.assertEqual("video", item.type)
+        self.assertEqual("Description", item.description)
+        self.assertEqual("ABCDEF0123456789", item.guid)
+        self.assertEqual({}, item.HttpHeaders)
+        self.assertIsNone(item.tv_show_title)
+        self.assertEqual("https://example.com/stream.m3u8", item.streams[0].Url)
+        self.assertFalse(item.streams[0].Adaptive)
+        self.assertEqual({}, item.streams[0].HttpHeaders)
+
+    def test_pickle(self):
+        from resources.lib import contenttype
+        from resources.lib.mediaitem import FolderItem, MediaItem
+
+        item = MediaItem("Item", "https://example.com/item")
+        item.set_date(2021, 3, 14, 20, 30, 0)
+        stream = item.add_stream("https://example.com/stream.m3u8", 1200)
+        stream.add_property("inputstream", "inputstream.adaptive")
+        # Some channels set attributes that MediaItems do not have.
+        item.Subtitle = "https://example.com/subtitle.srt"
+        stream.Name = "stream"
+
+        copy = pickle.loads(pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL))
+        self.assertEqual(item.guid, copy.guid)
+        self.assertEqual(item.get_date(), copy.get_date())
+        self.assertEqual("https://example.com/subtitle.srt", copy.Subtitle)
+        self.assertEqual([("inputstream", "inputstream.adaptive")], copy.streams[0].Properties)
+        self.assertEqual("stream", copy.streams[0].Name)
+
+        folder = FolderItem("Folder", "https://example.com/folder", contenttype.VIDEOS)
+        copy = pickle.loads(pickle.dumps(folder, protocol=pickle.HIGHEST_PROTOCOL))
+        self.assertIsInstance(copy, FolderItem)
+        self.assertEqual(contenttype.VIDEOS, copy.content_type)
+
+    def test_guid(self):
+        from resources.lib.helpers.encodinghelper import EncodingHelper
+        from resources.lib.mediaitem import MediaItem
+
+        item = self.__get_item(1)
+        self.assertEqual(32, len(item.guid))
+        self.assertEqual(item.guid, self.__get_item(1).guid)
+        self.assertEqual(int(item.guid, 16), item.guid_value)
+        self.assertEqual(hash(item), hash(self.__get_item(1)))
+        self.assertNotEqual(item.guid, self.__get_item(2).guid)
+        # The name and url are separated, so they cannot be shifted.
+        self.assertNotEqual(MediaItem("ab", "c").guid, MediaItem("a", "bc").guid)
+
+        self.assertEqual(EncodingHelper.encode_md5(item.name) + EncodingHelper.encode_md5(item.url),
+                         item.legacy_guid)
+
+    def test_guid_unique(self):
+        # The timings are compared by the `tests.benchmarks.mediaitems` script.
+        items = [self.__get_item(i) for i in range(10000)]
+
+        legacy = set(int("0x%s" % (item.legacy_guid, ), 0) for item in items)
+        self.assertEqual(len(legacy), len(set(items)))
+        self.assertEqual(len(items), len(set(item.guid for item in items)))
+
+    def __get_item(self, i):
+        from resources.lib import mediatype
+        from resources.lib.mediaitem import MediaItem
+
+        item = MediaItem("Item {}".format(i), "https://example.com/item/{}".format(i), media_type=mediatype.EPISODE)
+        item.description = "Een beschrijving van de aflevering met nummer {}".format(i)
+        item.thumb = "https://images.example.com/{}/640.jpg".format(i)
+        return item
@@ -0,0 +1,90 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import hashlib
+from unittest import mock
+
+from resources.lib.connectivity.memorycache import MemoryCache
+from resources.lib.urihandler import UriHandler
+from tests.benchmarks.localserver import LocalServerTestCase
+
+
+class TestMemoryCache(LocalServerTestCase):
+    def test_lru_by_size(self):
+        cache = MemoryCache(max_size=100)
+        cache.set("a", "a", 40)
+        cache.set("b", "b", 40)
+        self.assertEqual("a", cache.get("a"))
+
+        # "b" is the least recently used one
+        cache.set("c", "c", 40)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual("a", cache.get("a"))
+        self.assertEqual("c", cache.get("c"))
+        self.assertEqual(80, cache.size)
+        self.assertEqual(1, cache.evictions)
+        self.assertEqual(3, cache.hits)
+        self.assertEqual(1, cache.misses)
+        self.assertEqual(0.75, cache.hit_ratio)
+
+    def test_too_large(self):
+        cache = MemoryCache(max_size=100)
+        cache.set("a", "a", 40)
+        cache.set("a", "a", 101)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(0, cache.size)
+
+    def test_remove_and_clear(self):
+        cache = MemoryCache(max_size=100)
+        cache.set("a", "a", 40)
+        cache.set("b", "b", 40)
+        cache.remove("a")
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(40, cache.size)
+        cache.clear()
+        self.assertEqual(0, len(cache))
+        self.assertEqual(0, cache.size)
+
+    def test_uri_handler(self):
+        UriHandler.create_uri_handler(cache_dir=self.output_folder, cache_backend="sqlite")
+        memory_cache = UriHandler.instance().memoryCache
+
+        url = "{}/manifest?max-age=60".format(self.server.url)
+        data = UriHandler.open(url)
+        for _ in range(3):
+            self.assertEqual(data, UriHandler.open(url))
+
+        self.assertEqual(1, self.server.requests)
+        self.assertEqual(3, UriHandler.instance().cacheStore.cacheHits)
+        self.assertEqual(2, memory_cache.hits)
+        self.assertEqual(1, len(memory_cache))
+
+        # The memory cache holds the decompressed body, only the store holds the compressed one.
+        meta_key = "{}.meta".format(hashlib.md5(url.encode()).hexdigest())
+        meta, body, _ = memory_cache.get(meta_key)
+        self.assertEqual(data.encode(), body)
+        self.assertNotEqual("identity", meta["codec"])
+        self.assertNotEqual(body, UriHandler.instance().cacheStore.get(meta["body"]).read())
+
+        # A new response invalidates the memory cache.
+        UriHandler.open(url, no_cache=True)
+        self.assertEqual(1, len(memory_cache))
+        UriHandler.open(url, force_cache_duration=0)
+        self.assertEqual(0, len(memory_cache))
+        self.assertEqual(3, self.server.requests)
+
+    def test_hits_from_memory(self):
+        url = "{}/manifest?max-age=60".format(self.server.url)
+        for memory_cache_size, store_reads in ((0, 3), (1024 * 1024, 0)):
+            UriHandler._UriHandler__handler = None
+            UriHandler.create_uri_handler(cache_dir=self.output_folder,
+                                          memory_cache_size=memory_cache_size)
+            cache_store = UriHandler.instance().cacheStore
+            UriHandler.open(url)
+
+            # Repeated hits are served from memory and do not reach the disk store.
+            with mock.patch.object(cache_store, "get_entry", wraps=cache_store.get_entry) as get_entry:
+                for _ in range(3):
+                    UriHandler.open(url)
+            self.assertEqual(store_reads, get_entry.call_count)
+            UriHandler.instance().close()
+        self.assertEqual(1, self.server.requests)
@@ -0,0 +1,51 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from resources.lib.urihandler import UriHandler
+from tests.benchmarks.localserver import LocalServerTestCase
+
+
+class TestNegativeCache(LocalServerTestCase):
+    def test_disabled_by_default(self):
+        UriHandler.create_uri_handler(cache_dir=self.output_folder)
+        url = "{}/subtitle.vtt?status=404".format(self.server.url)
+        UriHandler.open(url)
+        UriHandler.open(url)
+        self.assertEqual(2, self.server.requests)
+
+    def test_per_call(self):
+        UriHandler.create_uri_handler(cache_dir=self.output_folder)
+        url = "{}/subtitle.vtt?status=404".format(self.server.url)
+        for _ in range(3):
+            UriHandler.open(url, negative_cache_ttl=60)
+            self.assertEqual(404, UriHandler.instance().status.code)
+            self.assertTrue(UriHandler.instance().status.error)
+        self.assertEqual(1, self.server.requests)
+
+        # Calls without negative caching ignore the cached failure.
+        UriHandler.open(url)
+        self.assertEqual(2, self.server.requests)
+        UriHandler.open(url, negative_cache_ttl=0)
+        self.assertEqual(3, self.server.requests)
+
+    def test_per_status(self):
+        UriHandler.create_uri_handler(cache_dir=self.output_folder)
+        not_found = "{}/season/2?status=404".format(self.server.url)
+        server_error = "{}/season/3?status=500".format(self.server.url)
+        for _ in range(2):
+            UriHandler.open(not_found, negative_cache_ttl=60)
+            UriHandler.open(server_error)
+        self.assertEqual(3, self.server.requests)
+        self.assertEqual(["/season/2?status=404", "/season/3?status=500", "/season/3?status=500"],
+                         self.server.paths)
+
+    def test_success_replaces_failure(self):
+        UriHandler.create_uri_handler(cache_dir=self.output_folder)
+        url = "{}/probe?max-age=60".format(self.server.url)
+        self.server.forced_status = 404
+        UriHandler.open(url, negative_cache_ttl=60)
+
+        self.server.forced_status = None
+        data = UriHandler.open(url)
+        self.assertEqual(200, UriHandler.instance().status.code)
+        self.assertEqual(data, UriHandler.open(url, negative_cache_ttl=60))
+        self.assertEqual(2, self.server.requests)
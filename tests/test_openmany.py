@@ -0,0 +1,62 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import json
+
+from resources.lib.urihandler import UriHandler, UriRequest
+from tests.benchmarks.localserver import LocalServerTestCase
+
+
+class TestOpenMany(LocalServerTestCase):
+    # Simulated network latency per request.
+    delay = 0.2
+
+    def setUp(self):
+        super(TestOpenMany, self).setUp()
+        UriHandler.create_uri_handler()
+
+    def test_input_order(self):
+        urls = ["{}/item/{}?delay={}".format(self.server.url, i, 0.05 * (i % 3)) for i in range(10)]
+        results = UriHandler.open_many(urls, max_workers=5)
+
+        self.assertEqual(len(urls), len(results))
+        for i, result in enumerate(results):
+            self.assertEqual("/item/{}".format(i), json.loads(result.data)["path"])
+            self.assertEqual(200, result.status.code)
+
+    def test_status_per_request(self):
+        requests = [
+            "{}/ok".format(self.server.url),
+            UriRequest("{}/missing?status=404".format(self.server.url), force_text=True),
+            UriRequest("{}/post".format(self.server.url), data={"test": "ok"}),
+            "http://127.0.0.1:1/closed",
+        ]
+        results = UriHandler.open_many(requests)
+
+        self.assertEqual([200, 404, 200, -1], [r.status.code for r in results])
+        self.assertFalse(results[0].status.error)
+        self.assertTrue(results[1].status.error)
+        self.assertTrue(results[3].status.error)
+        self.assertEqual("", results[3].data)
+
+        # The status of the calling thread is not touched.
+        self.assertEqual(0, UriHandler.instance().status.code)
+
+    def test_max_per_host(self):
+        urls = ["{}/item/{}?delay=0.05".format(self.server.url, i) for i in range(12)]
+        UriHandler.open_many(urls, max_workers=8, max_per_host=2)
+
+        self.assertEqual(12, self.server.requests)
+        self.assertLessEqual(self.server.max_in_flight, 2)
+
+    def test_concurrent_results(self):
+        # The timings are compared by the `tests.benchmarks.openmany` script.
+        urls = ["{}/epg/{}?delay={}".format(self.server.url, i, self.delay) for i in range(12)]
+
+        serial = [UriHandler.open(url) for url in urls]
+        self.server.reset()
+        concurrent = UriHandler.open_many(urls, max_workers=6)
+
+        self.assertEqual(
+            [json.loads(d)["path"] for d in serial],
+            [json.loads(r.data)["path"] for r in concurrent])
+        self.assertGreater(self.server.max_in_flight, 1)
@@ -0,0 +1,81 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import json
+from unittest import mock
+
+from resources.lib.logger import Logger
+from resources.lib.retroconfig import Config
+from resources.lib.textures import TextureHandler
+from resources.lib.urihandler import UriHandler
+from tests.benchmarks.localserver import LocalServerTestCase
+
+
+class TestPaginator(LocalServerTestCase):
+    # Simulated network latency per page.
+    delay = 0.1
+
+    @classmethod
+    def tearDownClass(cls):
+        from resources.lib.addonsettings import AddonSettings
+        AddonSettings.clear_cached_addon_settings_object()
+        super(TestPaginator, cls).tearDownClass()
+
+    def setUp(self):
+        from resources.lib.helpers.channelimporter import ChannelIndex
+
+        super(TestPaginator, self).setUp()
+        UriHandler.create_uri_handler()
+        TextureHandler.set_texture_handler(Config, Logger.instance(), UriHandler.instance())
+        self.channel = ChannelIndex.get_register().get_channel("channel.regionalnl.at5", None)
+
+    def test_pages_in_order(self):
+        urls = self.__get_page_urls(10, delay=lambda i: 0.05 * (i % 3))
+        urls[3] = "{}/page/3?status=404".format(self.server.url)
+
+        # noinspection PyProtectedMember
+        results = self.channel._fetch_pages(urls, self.__parse_page, max_workers=5)
+
+        # The failed page is skipped.
+        self.assertEqual(["/page/{}".format(i) for i in range(10) if i != 3], results)
+        self.assertEqual(10, self.server.requests)
+        self.assertLessEqual(self.server.max_in_flight, 5)
+
+    def test_pages_cancelled(self):
+        from resources.lib.xbmcwrapper import XbmcDialogProgressWrapper
+
+        urls = self.__get_page_urls(10, delay=lambda i: 0.05)
+        updates = []
+
+        def progress_update(wrapper, fetched, total, perc, completed, status):
+            updates.append((fetched, total, perc))
+            return fetched >= 2
+
+        with mock.patch.object(XbmcDialogProgressWrapper, "progress_update", progress_update):
+            # noinspection PyProtectedMember
+            results = self.channel._fetch_pages(urls, self.__parse_page, max_workers=2)
+
+        self.assertEqual([(1, 10, 10), (2, 10, 20)], updates)
+        # The pages that were running when cancelling, are still used.
+        self.assertLess(self.server.requests, 10)
+        self.assertEqual(self.server.requests, len(results))
+        self.assertEqual(sorted(results, key=lambda p: int(p.rsplit("/", 1)[-1])), results)
+
+    def test_concurrent_results(self):
+        # The timings are compared by the `tests.benchmarks.paginator` script.
+        urls = self.__get_page_urls(12, delay=lambda i: self.delay)
+
+        serial = []
+        for url in urls:
+            serial += self.__parse_page(UriHandler.open(url))
+        self.server.reset()
+        # noinspection PyProtectedMember
+        concurrent = self.channel._fetch_pages(urls, self.__parse_page, max_workers=6)
+
+        self.assertEqual(serial, concurrent)
+        self.assertGreater(self.server.max_in_flight, 1)
+
+    def __get_page_urls(self, count, delay):
+        return ["{}/page/{}?delay={}".format(self.server.url, i, delay(i)) for i in range(count)]
+
+    def __parse_page(self, data):
+        return [json.loads(data)["path"]]
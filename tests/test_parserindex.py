@@ -0,0 +1,70 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import unittest
+
+from resources.lib.logger import Logger
+from resources.lib.retroconfig import Config
+from resources.lib.textures import TextureHandler
+from resources.lib.urihandler import UriHandler
+from tests.benchmarks import parserindex
+
+
+class TestParserIndex(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        Logger.create_logger(None, str(cls), min_log_level=0)
+        UriHandler.create_uri_handler(ignore_ssl_errors=False)
+        TextureHandler.set_texture_handler(Config, Logger.instance(), UriHandler.instance())
+
+    @classmethod
+    def tearDownClass(cls):
+        from resources.lib.addonsettings import AddonSettings
+        AddonSettings.clear_cached_addon_settings_object()
+        Logger.instance().close_log()
+
+    def test_match_types(self):
+        from resources.lib.parserdata import ParserData
+        from resources.lib.parserindex import ParserIndex
+
+        data_parsers = {}
+        for key, match_type in (("https://example.com/", ParserData.MatchStart),
+                                ("https://example.com/api/", ParserData.MatchStart),
+                                ("https://example.com/api/home", ParserData.MatchExact),
+                                (".json", ParserData.MatchEnd),
+                                ("/episodes/", ParserData.MatchContains),
+                                (r"https://example.com/api/v\d+/[^/]+$", ParserData.MatchRegex),
+                                ("*", ParserData.MatchStart)):
+            data = ParserData(key)
+            data.MatchType = match_type
+            data_parsers[key] = [data]
+        index = ParserIndex(ParserIndex.get_signature(data_parsers))
+
+        # The longest key with a match wins.
+        self.assertEqual("https://example.com/api/home", index.find("https://example.com/api/home"))
+        self.assertEqual("https://example.com/api/", index.find("https://example.com/api/home/2"))
+        self.assertEqual("https://example.com/api/v\\d+/[^/]+$", index.find("HTTPS://example.com/api/v2/show"))
+        self.assertEqual("/episodes/", index.find("https://example.org/show/episodes/1"))
+        self.assertEqual(".json", index.find("https://example.org/show.json"))
+        self.assertEqual("https://example.com/", index.find("https://example.com/show"))
+        self.assertIsNone(index.find("https://example.org/show"))
+
+        # Channels with the same registrations share an index.
+        self.assertIs(ParserIndex.get_index(data_parsers), ParserIndex.get_index(dict(data_parsers)))
+
+    def test_channels(self):
+        # The timings are compared by the `tests.benchmarks.parserindex` script.
+        for channel_id, channel_code in (("channel.nos.nos2010", "uzgjson"), ("channel.se.svt", "svt"),
+                                         ("channel.se.tv4se", "tv4segroup")):
+            channel = self.__get_channel(channel_id, channel_code)
+            for url in parserindex.get_urls(channel):
+                # noinspection PyProtectedMember
+                self.assertEqual(parserindex.get_data_parsers_legacy(channel, url),
+                                 channel._Channel__get_data_parsers(url), url)
+
+    def __get_channel(self, channel_id, channel_code):
+        from resources.lib.helpers.channelimporter import ChannelIndex
+
+        channel = ChannelIndex.get_register().get_channel(channel_id, channel_code)
+        self.assertIsNotNone(channel)
+        self.assertTrue(channel.dataParsers)
+        return channel
@@ -0,0 +1,452 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import glob
+import io
+import os
+import pickle
+import shutil
+import tempfile
+import time
+import unittest
+import zlib
+from unittest import mock
+
+from resources.lib import picklecodec
+from resources.lib.logger import Logger
+from resources.lib.picklestore import PickleStoreFile
+from tests.benchmarks import picklecodecs, pickledictionary, picklestores
+
+
+class TestPickleStore(unittest.TestCase):
+    store_guid = "abcdef01-1234-5678-9012-abcdefabcdef"
+
+    @classmethod
+    def setUpClass(cls):
+        Logger.create_logger(None, str(cls), min_log_level=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        Logger.instance().close_log()
+
+    def setUp(self):
+        # The Pickler and MediaItem need a logger during import.
+        from resources.lib.pickler import Pickler
+        self.output_folder = tempfile.mkdtemp(prefix="retro_test_")
+        self.pickler = Pickler(self.output_folder)
+
+    def tearDown(self):
+        shutil.rmtree(self.output_folder)
+
+    def test_round_trip(self):
+        parent, children = self.__get_items(10)
+        self.pickler.store_media_items(self.store_guid, parent, children)
+
+        store_guid, items = self.__get_pickler().de_pickle_child_items(
+            self.__get_store_id(children[0]))
+        self.assertEqual(self.store_guid, store_guid)
+        self.assertEqual({c.guid for c in children}, set(items.keys()))
+        self.assertEqual(children[3].name, items[children[3].guid].name)
+
+    def test_single_item(self):
+        parent, children = self.__get_items(10)
+        self.pickler.store_media_items(self.store_guid, parent, children)
+
+        item = self.__get_pickler().de_pickle_media_item(self.__get_store_id(children[5]))
+        self.assertEqual(children[5].guid, item.guid)
+        self.assertEqual(children[5].url, item.url)
+
+        path = self.__get_store_files()[0]
+        self.assertIsNone(PickleStoreFile(path).read_item("unknown"))
+
+    def test_legacy_guid(self):
+        parent, children = self.__get_items(10)
+        self.pickler.store_media_items(self.store_guid, parent, children)
+
+        # Favourites and Kodi bookmarks of older versions use the legacy guids.
+        pickle_id = "{}--{}".format(self.store_guid, children[3].legacy_guid)
+        self.assertEqual(children[3].guid, self.__get_pickler().de_pickle_media_item(pickle_id).guid)
+        self.assertIsNone(self.__get_pickler().de_pickle_media_item(
+            "{}--{}".format(self.store_guid, "0" * 64)))
+
+    def test_merge(self):
+        parent, children = self.__get_items(10)
+        self.pickler.store_media_items(self.store_guid, parent, children[:5])
+        self.pickler.store_media_items(self.store_guid, parent, children[5:])
+
+        item = self.__get_pickler().de_pickle_media_item(self.__get_store_id(children[0]))
+        self.assertEqual(children[0].guid, item.guid)
+        self.assertEqual(1, len(self.__get_store_files()))
+
+    def test_append(self):
+        parent, children = self.__get_items(100)
+        self.pickler.store_media_items(self.store_guid, parent, children)
+        path = self.__get_pickle_path("store.i")
+        size = os.path.getsize(path)
+
+        # Unchanged items are not written again.
+        self.pickler.store_media_items(self.store_guid, parent, children)
+        self.assertEqual(size, os.path.getsize(path))
+
+        children[10].description = "Changed"
+        new_parent, new_children = self.__get_items(1, offset=100)
+        store = PickleStoreFile(path)
+        self.assertEqual(2, store.append({"children": {
+            children[10].guid: children[10], new_children[0].guid: new_children[0]}}))
+        self.assertLess(os.path.getsize(path) - size, size / 20)
+        self.assertEqual(2, store.get_usage().indexes)
+
+        pickler = self.__get_pickler()
+        self.assertEqual("Changed", pickler.de_pickle_media_item(
+            self.__get_store_id(children[10])).description)
+        self.assertEqual(101, len(pickler.de_pickle_child_items(self.__get_store_id(children[0]))[1]))
+
+    def test_compact(self):
+        parent, children = self.__get_items(10)
+        self.pickler.store_media_items(self.store_guid, parent, children)
+        path = self.__get_pickle_path("store.i")
+        size = os.path.getsize(path)
+
+        for i in range(3):
+            for child in children:
+                child.description = "Changed {}".format(i)
+            self.pickler.store_media_items(self.store_guid, parent, children)
+
+        usage = PickleStoreFile(path).get_usage()
+        self.assertGreater(usage.unused * 2, usage.size)
+        self.assertEqual(4, usage.indexes)
+
+        self.pickler.purge_store("plugin.video.retrospect")
+        self.assertEqual((0, os.path.getsize(path), 1, 0), PickleStoreFile(path).get_usage())
+        self.assertLess(os.path.getsize(path), size * 1.5)
+        item = self.__get_pickler().de_pickle_media_item(self.__get_store_id(children[0]))
+        self.assertEqual("Changed 2", item.description)
+
+    def test_concurrent_append(self):
+        import threading
+
+        parent, children = self.__get_items(1)
+        self.pickler.store_media_items(self.store_guid, parent, children)
+        path = self.__get_pickle_path("store.i")
+        errors = []
+
+        def __append(offset):
+            try:
+                _, items = self.__get_items(10, offset=offset)
+                for item in items:
+                    # Each write opens the file itself, like the other processes do.
+                    PickleStoreFile(path).append({"children": {item.guid: item}}, compress=False)
+            except Exception as ex:
+                errors.append(ex)
+
+        def __compact():
+            try:
+                for _ in range(10):
+                    PickleStoreFile(path).compact()
+            except Exception as ex:
+                errors.append(ex)
+
+        threads = [threading.Thread(target=__append, args=((i + 1) * 100, )) for i in range(4)]
+        threads.append(threading.Thread(target=__compact))
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual([], errors)
+        # None of the appended items were lost or overwritten.
+        content = PickleStoreFile(path).read()
+        self.assertEqual(41, len(content["children"]))
+        for guid, item in content["children"].items():
+            self.assertEqual(guid, item.guid)
+
+    def test_uncompressed(self):
+        parent, children = self.__get_items(10)
+        self.pickler.store_media_items(self.store_guid, parent, children, compress=False)
+        path = self.__get_pickle_path("store.i")
+        self.assertEqual(11, PickleStoreFile(path).get_usage().uncompressed)
+
+        item = self.__get_pickler().de_pickle_media_item(self.__get_store_id(children[1]))
+        self.assertEqual(children[1].guid, item.guid)
+
+        # Compacting compresses the records.
+        size = os.path.getsize(path)
+        self.pickler.purge_store("plugin.video.retrospect")
+        self.assertEqual(0, PickleStoreFile(path).get_usage().uncompressed)
+        self.assertLess(os.path.getsize(path), size)
+
+    def test_deferred(self):
+        parent, children = self.__get_items(100)
+        self.pickler.defer_store_media_items(self.store_guid, parent, children[:50])
+        self.pickler.defer_store_media_items(self.store_guid, parent, children[50:])
+
+        # The items can be read by another process right away.
+        store_guid, items = self.__get_pickler().de_pickle_child_items(
+            self.__get_store_id(children[0]))
+        self.assertEqual(100, len(items))
+
+        # And they are compressed by the next purge.
+        path = self.__get_pickle_path("store.i")
+        self.assertEqual(101, PickleStoreFile(path).get_usage().uncompressed)
+        self.assertEqual([self.store_guid], self.__get_manifest().get_dirty())
+        self.pickler.purge_store("plugin.video.retrospect")
+        self.assertEqual(0, PickleStoreFile(path).get_usage().uncompressed)
+        self.assertEqual([], self.__get_manifest().get_dirty())
+        store_guid, items = self.__get_pickler().de_pickle_child_items(
+            self.__get_store_id(children[0]))
+        self.assertEqual(100, len(items))
+
+    def test_codecs(self):
+        parent, children = self.__get_items(10)
+        content = {"parent": parent, "children": {item.guid: item for item in children}}
+        for codec in picklecodec.get_codecs() + [picklecodec.ZLIB]:
+            store = PickleStoreFile(os.path.join(self.output_folder, codec), codec)
+            store.write(content)
+            store.append({"children": {children[0].guid: children[0], "new": parent}})
+
+            # The codec is read from the file.
+            store = PickleStoreFile(store.path, picklecodec.IDENTITY)
+            self.assertEqual(children[1].guid, store.read_item(children[1].guid).guid, codec)
+            self.assertEqual(parent.guid, store.read_item("new").guid, codec)
+            self.assertEqual(11, len(store.read()["children"]), codec)
+
+        with self.assertRaises(ValueError):
+            picklecodec.get_codec("unknown")
+
+    def test_codec_benchmark(self):
+        listings = []
+        for count in (20, 100, 500):
+            parent, children = self.__get_items(count)
+            listings.append({"parent": parent, "children": {item.guid: item for item in children}})
+
+        results = picklecodecs.benchmark_codecs(listings, self.output_folder)
+        for codec, (write_duration, read_duration, size) in results.items():
+            Logger.info("%-10s write=%.2fms read=%.2fms size=%s", codec, write_duration, read_duration, size)
+        self.assertLess(results[picklecodec.DEFAULT_CODEC][2], results[picklecodec.IDENTITY][2])
+
+    def test_compact_state(self):
+        from resources.lib.mediaitem import MediaItem, MediaStream
+
+        parent, children = self.__get_items(1)
+        item = children[0]
+        item.HttpHeaders = {"User-Agent": "Retrospect"}
+        item.metaData["id"] = 1
+        item.streams.append(MediaStream("https://example.com/stream.m3u8", 1200))
+        legacy = picklestores.get_legacy_pickle(item)
+
+        state = item.__getstate__()
+        self.assertNotIn("fanart", state)
+        self.assertNotIn("isLive", state)
+        self.assertIn("media_type", state)
+        self.assertLess(len(pickle.dumps(item)), len(legacy) * 0.65)
+
+        for data in (pickle.dumps(item), legacy):
+            copy = pickle.loads(data)
+            self.assertEqual(self.__get_values(item).keys(), self.__get_values(copy).keys())
+            self.assertEqual(item.guid, copy.guid)
+            self.assertEqual(item.HttpHeaders, copy.HttpHeaders)
+            self.assertEqual("https://example.com/stream.m3u8", copy.streams[0].Url)
+            self.assertEqual(item.get_date(), copy.get_date())
+
+        # The defaults are copies, not shared with other items.
+        copy = pickle.loads(pickle.dumps(MediaItem("Title", "url")))
+        copy.HttpHeaders["key"] = "value"
+        self.assertEqual({}, pickle.loads(pickle.dumps(MediaItem("Title", "url"))).HttpHeaders)
+
+        url_pickle = self.pickler.pickle_media_item(item)
+        self.assertEqual(item.guid, self.__get_pickler().de_pickle_media_item(url_pickle).guid)
+        Logger.info("Pickle size: legacy=%d compact=%d url=%d",
+                    len(legacy), len(pickle.dumps(item)), len(url_pickle))
+
+    def test_dictionary_pickle(self):
+        parent, children = self.__get_items(50)
+        item = children[0]
+        item.HttpHeaders = {"User-Agent": "Retrospect"}
+        item.add_stream("https://example.com/stream.m3u8", 1200)
+
+        url_pickle = self.pickler.pickle_media_item(item, use_dictionary=True)
+        self.assertTrue(url_pickle.startswith("z1."))
+        self.assertFalse(self.pickler.is_pickle_store_id(url_pickle))
+        for value in (url_pickle, self.pickler.pickle_media_item(item)):
+            copy = self.__get_pickler().de_pickle_media_item(value)
+            self.assertEqual(item.guid, copy.guid)
+            self.assertEqual(item.HttpHeaders, copy.HttpHeaders)
+            self.assertEqual(item.streams[0].Url, copy.streams[0].Url)
+
+        # The samples the dictionary was built from are not used here.
+        normal, compressed = pickledictionary.measure(children)
+        Logger.info("URL pickles of %d items: normal=%d dictionary=%d (%.0f%% shorter)",
+                    len(children), normal, compressed, 100 - compressed * 100 / normal)
+        self.assertLess(compressed, normal * 0.6)
+
+    def test_shared_headers(self):
+        parent, children = self.__get_items(100)
+        for child in children:
+            child.HttpHeaders = {"User-Agent": "Retrospect", "Authorization": "Bearer 0123456789abcdef"}
+        children[0].HttpHeaders = {"User-Agent": "Other"}
+        self.pickler.store_media_items(self.store_guid, parent, children)
+
+        store = PickleStoreFile(self.__get_pickle_path("store.i"))
+        items = store.read()["children"]
+        self.assertEqual({"User-Agent": "Other"}, items[children[0].guid].HttpHeaders)
+        self.assertEqual(children[1].HttpHeaders, items[children[1].guid].HttpHeaders)
+        self.assertIsNot(items[children[1].guid].HttpHeaders, items[children[2].guid].HttpHeaders)
+        self.assertEqual(children[5].HttpHeaders, store.read_item(children[5].guid).HttpHeaders)
+
+        # Appended items can use headers from an older index.
+        children[6].description = "Changed"
+        store.append({"children": {children[6].guid: children[6]}})
+        self.assertEqual(children[6].HttpHeaders, store.read_item(children[6].guid).HttpHeaders)
+        self.assertEqual(children[7].HttpHeaders, store.read()["children"][children[7].guid].HttpHeaders)
+
+    def test_legacy_store(self):
+        parent, children = self.__get_items(10)
+        legacy_path = self.__write_legacy_store(parent, children)
+
+        item = self.__get_pickler().de_pickle_media_item(self.__get_store_id(children[2]))
+        self.assertEqual(children[2].guid, item.guid)
+
+        # Storing new items converts the old store.
+        new_parent, new_children = self.__get_items(2, offset=10)
+        self.pickler.store_media_items(self.store_guid, parent, new_children)
+        self.assertFalse(os.path.isfile(legacy_path))
+        self.assertEqual([self.__get_pickle_path("store.i")], self.__get_store_files())
+
+        store_guid, items = self.__get_pickler().de_pickle_child_items(
+            self.__get_store_id(children[0]))
+        self.assertEqual(12, len(items))
+
+    def test_incomplete_file(self):
+        parent, children = self.__get_items(10)
+        self.pickler.store_media_items(self.store_guid, parent, children)
+        path = self.__get_store_files()[0]
+        with io.open(path, "r+b") as fp:
+            fp.truncate(os.path.getsize(path) - 4)
+
+        self.assertIsNone(self.__get_pickler().de_pickle_media_item(
+            self.__get_store_id(children[0])))
+
+    def test_purge(self):
+        parent, children = self.__get_items(10)
+        other_guid = "0123abcd-1234-5678-9012-abcdefabcdef"
+        self.pickler.store_media_items(self.store_guid, parent, children)
+        self.pickler.store_media_items(other_guid, parent, children)
+
+        self.pickler.purge_store("plugin.video.retrospect")
+        self.assertEqual(2, len(self.__get_store_files()))
+
+        # Stores that were already removed are removed from the manifest.
+        os.remove(self.__get_pickle_path("store.i"))
+        self.pickler.purge_store("plugin.video.retrospect", age=0)
+        self.assertEqual([], self.__get_store_files())
+        self.assertEqual([], self.__get_manifest().get_expired(time.time() + 1))
+
+    def test_purge_lock_file(self):
+        parent, children = self.__get_items(10)
+        self.pickler.store_media_items(self.store_guid, parent, children)
+        lock_path = self.__get_pickle_path("store.i") + ".lock"
+        io.open(lock_path, "wb").close()
+
+        self.pickler.purge_store("plugin.video.retrospect", age=0)
+        self.assertEqual([], self.__get_store_files())
+        self.assertFalse(os.path.exists(lock_path))
+
+    def test_purge_last_written(self):
+        parent, children = self.__get_items(10)
+        month_ago = time.time() - 40 * 24 * 60 * 60
+        with mock.patch("resources.lib.picklemanifest.time.time", return_value=month_ago):
+            self.pickler.store_media_items(self.store_guid, parent, children)
+        self.assertEqual(1, len(self.__get_manifest().get_expired(time.time() - 30 * 24 * 60 * 60)))
+
+        # Listing the same items again counts as a write, so the store is kept.
+        self.pickler.store_media_items(self.store_guid, parent, children)
+        self.pickler.purge_store("plugin.video.retrospect")
+        self.assertEqual(1, len(self.__get_store_files()))
+        self.assertEqual([], self.__get_manifest().get_expired(time.time() - 30 * 24 * 60 * 60))
+
+    def test_purge_favourites(self):
+        parent, children = self.__get_items(10)
+        self.pickler.store_media_items(self.store_guid, parent, children)
+        path = self.__get_pickle_path("store.i")
+        favourites = {self.store_guid: [children[1].guid, children[0].guid]}
+
+        with mock.patch.object(self.pickler, "_Pickler__get_kodi_favourites", return_value=favourites):
+            self.pickler.purge_store("plugin.video.retrospect", age=0)
+            self.assertEqual({children[0].guid, children[1].guid},
+                             set(PickleStoreFile(path).read()["children"].keys()))
+            self.assertEqual([(self.store_guid, "{},{}".format(*sorted(favourites[self.store_guid])))],
+                             self.__get_manifest().get_expired(time.time() + 1))
+
+            # Unchanged favourite stores are not written again.
+            inode = os.stat(path).st_ino
+            self.pickler.purge_store("plugin.video.retrospect", age=0)
+            self.assertEqual(inode, os.stat(path).st_ino)
+
+            # But they are cleaned again once new items were added.
+            self.pickler.store_media_items(self.store_guid, parent, children)
+            self.pickler.purge_store("plugin.video.retrospect", age=0)
+            self.assertEqual(2, len(PickleStoreFile(path).read()["children"]))
+
+    def test_purge_existing_stores(self):
+        parent, children = self.__get_items(10)
+        legacy_path = self.__write_legacy_store(parent, children)
+        path = os.path.join(self.output_folder, "pickles", "01", "23", "0123abcd-1234-5678-9012-abcdefabcdef.store.i")
+        os.makedirs(os.path.dirname(path))
+        PickleStoreFile(path).write({"parent": parent, "children": {}})
+
+        # Stores from before the manifest existed are added to it.
+        self.pickler.purge_store("plugin.video.retrospect")
+        self.assertEqual(2, len(self.__get_manifest().get_expired(time.time() + 1)))
+        self.pickler.purge_store("plugin.video.retrospect", age=0)
+        self.assertEqual([], self.__get_store_files())
+
+    def test_purge_time_budget(self):
+        parent, children = self.__get_items(10)
+        self.pickler.store_media_items(self.store_guid, parent, children)
+
+        self.pickler.purge_store("plugin.video.retrospect", age=0, time_budget=0)
+        self.assertEqual(1, len(self.__get_store_files()))
+
+        self.pickler.defer_purge_store("plugin.video.retrospect", age=0, time_budget=10)
+        self.pickler.wait_for_stores()
+        self.assertEqual([], self.__get_store_files())
+
+    def __get_items(self, count, offset=0):
+        from resources.lib.mediaitem import MediaItem
+
+        parent = MediaItem("Parent", "https://example.com/parent")
+        children = []
+        for i in range(offset, offset + count):
+            item = MediaItem("Item {}".format(i), "https://example.com/item/{}".format(i))
+            item.description = "Een beschrijving van de aflevering met nummer {}".format(i)
+            item.thumb = "https://images.example.com/{}/640.jpg".format(i)
+            children.append(item)
+        return parent, children
+
+    def __get_pickler(self):
+        return type(self.pickler)(self.output_folder)
+
+    def __get_store_id(self, item):
+        return "{}--{}".format(self.store_guid, item.guid)
+
+    def __get_pickle_path(self, ext):
+        return os.path.join(self.output_folder, "pickles", self.store_guid[0:2],
+                            self.store_guid[2:4], "{}.{}".format(self.store_guid, ext))
+
+    def __get_manifest(self):
+        from resources.lib.picklemanifest import PickleManifest
+        return PickleManifest(os.path.join(self.output_folder, "pickles"))
+
+    def __get_store_files(self):
+        return glob.glob(os.path.join(self.output_folder, "pickles", "*", "*", "*"))
+
+    def __get_values(self, item):
+        return dict(item._MediaItem__get_values())
+
+    def __write_legacy_store(self, parent, children):
+        path = self.__get_pickle_path("store.z")
+        os.makedirs(os.path.dirname(path))
+        content = {"parent": parent, "children": {item.guid: item for item in children}}
+        with io.open(path, "wb") as fp:
+            fp.write(zlib.compress(pickle.dumps(content, protocol=pickle.HIGHEST_PROTOCOL),
+                                   zlib.Z_BEST_COMPRESSION))
+        return path
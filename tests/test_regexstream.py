@@ -0,0 +1,80 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import tracemalloc
+import unittest
+
+from resources.lib.logger import Logger
+from resources.lib.retroconfig import Config
+from resources.lib.textures import TextureHandler
+from resources.lib.urihandler import UriHandler
+from tests.benchmarks.regexstream import DICTIONARY_REGEX, get_html
+
+GROUPS_REGEX = r'<a href="([^"]+)" title="([^"]+)">(?:<b>([^<]+)</b>)?'
+GROUP_REGEX = r'<span class="date">([^<]+)</span>'
+PLAIN_REGEX = r'/video/\d+'
+MISSING_REGEX = r'<span class="missing">([^<]+)</span>'
+
+
+class TestRegexStream(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        Logger.create_logger(None, str(cls), min_log_level=0)
+        UriHandler.create_uri_handler(ignore_ssl_errors=False)
+        TextureHandler.set_texture_handler(Config, Logger.instance(), UriHandler.instance())
+
+    @classmethod
+    def tearDownClass(cls):
+        from resources.lib.addonsettings import AddonSettings
+        AddonSettings.clear_cached_addon_settings_object()
+        Logger.instance().close_log()
+
+    def test_results(self):
+        # The timings are compared by the `tests.benchmarks.regexstream` script.
+        from resources.lib.regexer import Regexer
+
+        data = get_html(100)
+        for regex in (DICTIONARY_REGEX, GROUPS_REGEX, GROUP_REGEX, PLAIN_REGEX, MISSING_REGEX,
+                      [GROUP_REGEX, MISSING_REGEX, DICTIONARY_REGEX, PLAIN_REGEX, GROUPS_REGEX],
+                      "(unbalanced"):
+            self.assertEqual(Regexer.do_regex(regex, data), list(Regexer.iter_regex(regex, data)), regex)
+
+    def test_process_folder_list(self):
+        from resources.lib.helpers.channelimporter import ChannelIndex
+        from resources.lib.mediaitem import MediaItem
+        from resources.lib.regexer import Regexer
+
+        channel = ChannelIndex.get_register().get_channel("channel.regionalnl.at5", None)
+        data = get_html(100)
+        results = []
+
+        def create_item(result_set):
+            results.append(result_set)
+            return MediaItem(result_set["title"], result_set["url"])
+
+        # noinspection PyProtectedMember
+        channel._add_data_parser("#stream", name="Stream test", preprocessor=lambda d: (data, []),
+                                 parser=DICTIONARY_REGEX, creator=create_item)
+        items = channel.process_folder_list(MediaItem("Stream", "#stream"))
+
+        self.assertEqual(100, len(items))
+        self.assertEqual(Regexer.do_regex(DICTIONARY_REGEX, data), results)
+
+    def test_memory(self):
+        from resources.lib.regexer import Regexer
+
+        data = get_html(20000)
+        sizes = []
+        for get_results in (Regexer.do_regex, Regexer.iter_regex):
+            tracemalloc.start()
+            try:
+                count = 0
+                for _ in get_results(DICTIONARY_REGEX, data):
+                    count += 1
+                sizes.append(tracemalloc.get_traced_memory()[1])
+            finally:
+                tracemalloc.stop()
+            self.assertEqual(20000, count)
+
+        Logger.info("Peak memory for %d matches: findall=%.1fMB finditer=%.2fMB",
+                    count, sizes[0] / 1024 / 1024, sizes[1] / 1024 / 1024)
+        self.assertLess(sizes[1] * 10, sizes[0])
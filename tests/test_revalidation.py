@@ -0,0 +1,53 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from urllib.parse import quote
+
+from resources.lib.urihandler import UriHandler
+from tests.benchmarks.localserver import LocalServerTestCase
+
+
+class TestRevalidation(LocalServerTestCase):
+    last_modified = "Wed, 21 Oct 2026 07:28:00 GMT"
+
+    def setUp(self):
+        super(TestRevalidation, self).setUp()
+        UriHandler.create_uri_handler(cache_dir=self.output_folder)
+
+    def test_last_modified(self):
+        url = "{}/listing?max-age=0&last-modified={}".format(
+            self.server.url, quote(self.last_modified))
+        data = UriHandler.open(url)
+        self.assertEqual(data, UriHandler.open(url))
+        self.assertEqual(200, UriHandler.instance().status.code)
+        self.assertEqual(2, self.server.requests)
+
+        cache_store = UriHandler.instance().cacheStore
+        self.assertEqual(1, cache_store.revalidations)
+        self.assertEqual(len(data.encode()), cache_store.bytesSaved)
+
+    def test_etag(self):
+        url = "{}/listing?max-age=0&etag=abc".format(self.server.url)
+        data = UriHandler.open(url)
+        self.assertEqual(data, UriHandler.open(url))
+        self.assertEqual(data, UriHandler.open(url))
+
+        cache_store = UriHandler.instance().cacheStore
+        self.assertEqual(2, cache_store.revalidations)
+        self.assertEqual(2 * len(data.encode()), cache_store.bytesSaved)
+
+    def test_not_modified_prolongs(self):
+        url = "{}/listing?max-age=60&last-modified={}".format(
+            self.server.url, quote(self.last_modified))
+        data = UriHandler.open(url)
+        self.assertEqual(data, UriHandler.open(url, force_cache_duration=0))
+        self.assertEqual(2, self.server.requests)
+
+        # The 304 response made the cached response fresh again.
+        self.assertEqual(data, UriHandler.open(url))
+        self.assertEqual(2, self.server.requests)
+
+    def test_without_validators(self):
+        url = "{}/listing?max-age=0".format(self.server.url)
+        data = UriHandler.open(url)
+        self.assertNotEqual(data, UriHandler.open(url))
+        self.assertEqual(0, UriHandler.instance().cacheStore.revalidations)
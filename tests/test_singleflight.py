@@ -0,0 +1,118 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import json
+import threading
+
+from resources.lib.connectivity.singleflight import SingleFlight
+from resources.lib.urihandler import UriHandler, UriRequest
+from tests.benchmarks.localserver import LocalServerTestCase
+
+
+class TestSingleFlight(LocalServerTestCase):
+    def test_identical_gets_coalesced(self):
+        UriHandler.create_uri_handler()
+
+        url = "{}/guide-channels?delay=0.3".format(self.server.url)
+        results = UriHandler.open_many([url] * 6, max_workers=6)
+
+        self.assertEqual(1, self.server.requests)
+        self.assertEqual(1, len(set(r.data for r in results)))
+        self.assertEqual([200] * 6, [r.status.code for r in results])
+        self.assertEqual(1, UriHandler.instance().singleFlight.flights)
+        self.assertEqual(5, UriHandler.instance().singleFlight.hits)
+
+    def test_callers_get_own_response(self):
+        UriHandler.create_uri_handler()
+
+        url = "{}/guide-channels?delay=0.3".format(self.server.url)
+        responses = [None] * 3
+
+        def __get(index):
+            # noinspection PyUnresolvedReferences
+            responses[index] = UriHandler.instance()._RequestsHandler__requests(
+                url, None, None, None, None, None, None, False, False, None, "")
+
+        threads = [threading.Thread(target=__get, args=(i, )) for i in range(len(responses))]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(1, self.server.requests)
+        self.assertEqual(len(responses), len(set(id(r) for r in responses)))
+        self.assertEqual(1, len(set(r.content for r in responses)))
+
+        # Changes to one response do not affect the others.
+        responses[0].encoding = "latin-1"
+        responses[0].headers["x-changed"] = "1"
+        self.assertNotEqual("latin-1", responses[1].encoding)
+        self.assertNotIn("x-changed", responses[2].headers)
+
+    def test_cold_cache_stampede(self):
+        UriHandler.create_uri_handler(cache_dir=self.output_folder)
+
+        url = "{}/token?delay=0.3&max-age=60".format(self.server.url)
+        results = UriHandler.open_many([url] * 4, max_workers=4)
+        self.assertEqual(1, self.server.requests)
+        self.assertEqual(1, len(set(r.data for r in results)))
+
+        # Once stored, it is served from the cache.
+        UriHandler.open(url)
+        self.assertEqual(1, self.server.requests)
+        self.assertEqual(1, UriHandler.instance().cacheStore.cacheHits)
+
+    def test_different_headers_not_coalesced(self):
+        UriHandler.create_uri_handler()
+
+        url = "{}/token?delay=0.2".format(self.server.url)
+        requests = [
+            UriRequest(url, additional_headers={"authorization": "a"}),
+            UriRequest(url, additional_headers={"authorization": "b"}),
+            UriRequest(url, additional_headers={"authorization": "a"}),
+        ]
+        results = UriHandler.open_many(requests, max_workers=3)
+        self.assertEqual(2, self.server.requests)
+        self.assertEqual(results[0].data, results[2].data)
+        self.assertEqual(1, UriHandler.instance().singleFlight.hits)
+
+    def test_sequential_gets_not_coalesced(self):
+        UriHandler.create_uri_handler()
+
+        url = "{}/path".format(self.server.url)
+        first = json.loads(UriHandler.open(url))
+        second = json.loads(UriHandler.open(url))
+        self.assertEqual(2, self.server.requests)
+        self.assertNotEqual(first["time"], second["time"])
+        self.assertEqual(0, UriHandler.instance().singleFlight.hits)
+
+    def test_error_is_shared(self):
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        errors = []
+
+        def __fail():
+            started.set()
+            release.wait()
+            raise ValueError("failed")
+
+        def __call():
+            try:
+                flight.do(("key", ), __fail)
+            except ValueError as e:
+                errors.append(e)
+
+        leader = threading.Thread(target=__call)
+        leader.start()
+        started.wait()
+        follower = threading.Thread(target=__call)
+        follower.start()
+        while flight.hits == 0:
+            pass
+        release.set()
+        leader.join()
+        follower.join()
+
+        self.assertEqual(2, len(errors))
+        self.assertIs(errors[0], errors[1])
+        self.assertEqual(1, flight.flights)
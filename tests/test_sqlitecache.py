@@ -0,0 +1,154 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import os
+import threading
+import time
+from unittest import mock
+
+from resources.lib.connectivity.sqlitestreamcache import SqliteStreamCache
+from resources.lib.connectivity.streamcache import StreamCache
+from resources.lib.urihandler import UriHandler
+from tests.benchmarks.localserver import LocalServerTestCase
+
+
+class TestSqliteCache(LocalServerTestCase):
+    def test_set_and_get(self):
+        cache = SqliteStreamCache(self.output_folder)
+        self.__store(cache, "abc", b"body", b"{}")
+
+        self.assertTrue(cache.has_cache_key("abc.body"))
+        self.assertFalse(cache.has_cache_key("def.body"))
+        self.assertEqual(b"body", cache.get("abc.body").read())
+        self.assertRaises(KeyError, cache.get, "def.body")
+
+        entry = cache.get_entry("abc.body", "abc.meta")
+        self.assertEqual(b"body", entry.body.read())
+        self.assertEqual(b"{}", entry.meta.read())
+        self.assertAlmostEqual(time.time(), entry.stored, delta=5)
+        self.assertIsNone(cache.get_entry("def.body", "def.meta"))
+        cache.close()
+
+    def test_single_file(self):
+        cache = SqliteStreamCache(self.output_folder)
+        for i in range(50):
+            self.__store(cache, "key{}".format(i), b"body", b"{}")
+
+        self.assertFalse(os.path.isdir(os.path.join(self.output_folder, "www")))
+        self.assertTrue(all(f.startswith(SqliteStreamCache.DatabaseName)
+                            for f in os.listdir(self.output_folder)))
+        cache.close()
+
+    def test_expiry(self):
+        cache = SqliteStreamCache(self.output_folder)
+        self.__store(cache, "abc", b"body", b"{}")
+        self.assertFalse(cache.is_expired("abc.meta", 60))
+        self.assertTrue(cache.is_expired("abc.meta", -1))
+        self.assertFalse(cache.is_expired("def.meta", -1))
+
+        cache.clean_up(60)
+        self.assertTrue(cache.has_cache_key("abc.body"))
+        cache.clean_up(0)
+        self.assertFalse(cache.has_cache_key("abc.body"))
+        cache.close()
+
+    @mock.patch("resources.lib.connectivity.sqlitestreamcache.ACCESS_RESOLUTION", 0)
+    def test_lru_eviction(self):
+        cache = SqliteStreamCache(self.output_folder, max_size=1100)
+        self.__store(cache, "first", b"x" * 300, b"{}")
+        self.__store(cache, "second", b"x" * 300, b"{}")
+
+        # Use the first one, so the second one is the least recently used one.
+        time.sleep(0.01)
+        self.assertIsNotNone(cache.get_entry("first.body", "first.meta"))
+        self.__store(cache, "third", b"x" * 300, b"{}")
+        self.__store(cache, "fourth", b"x" * 300, b"{}")
+
+        self.assertFalse(cache.has_cache_key("second.body"))
+        self.assertFalse(cache.has_cache_key("second.meta"))
+        self.assertTrue(cache.has_cache_key("first.body"))
+        self.assertTrue(cache.has_cache_key("fourth.body"))
+        cache.close()
+
+    def test_threads(self):
+        cache = SqliteStreamCache(self.output_folder)
+        errors = []
+
+        def __work(index):
+            try:
+                for i in range(20):
+                    key = "t{}-{}".format(index, i)
+                    self.__store(cache, key, key.encode(), b"{}")
+                    self.assertEqual(key.encode(), cache.get("{}.body".format(key)).read())
+            except Exception as ex:
+                errors.append(ex)
+
+        threads = [threading.Thread(target=__work, args=(i, )) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual([], errors)
+        # The worker threads returned their connections to a bounded pool.
+        pool = cache._SqliteStreamCache__pool
+        self.assertLessEqual(len(pool._SqlitePool__idle_connections), pool.maxIdleConnections)
+        cache.close()
+        self.assertEqual([], pool._SqlitePool__idle_connections)
+
+    def test_running_total(self):
+        cache = SqliteStreamCache(self.output_folder, max_size=1100)
+        # Replacing a value does not count twice.
+        for _ in range(10):
+            self.__store(cache, "first", b"x" * 300, b"{}")
+        self.__store(cache, "second", b"x" * 300, b"{}")
+        self.assertTrue(cache.has_cache_key("first.body"))
+        self.assertEqual(604, cache._SqliteStreamCache__total_size)
+        cache.close()
+
+        # A new store starts with the size of the existing values.
+        cache = SqliteStreamCache(self.output_folder, max_size=1100)
+        self.assertEqual(604, cache._SqliteStreamCache__total_size)
+        cache.clean_up(0)
+        self.assertEqual(0, cache._SqliteStreamCache__total_size)
+        cache.close()
+
+    def test_uri_handler(self):
+        UriHandler.create_uri_handler(cache_dir=self.output_folder, cache_backend="sqlite")
+        self.assertIsInstance(UriHandler.instance().cacheStore, SqliteStreamCache)
+
+        url = "{}/manifest?max-age=60".format(self.server.url)
+        data = UriHandler.open(url)
+        self.assertEqual(data, UriHandler.open(url))
+        self.assertEqual(1, self.server.requests)
+        self.assertEqual(1, UriHandler.instance().cacheStore.cacheHits)
+
+        # Expired content with an etag is revalidated.
+        url = "{}/etag?max-age=0&etag=abc".format(self.server.url)
+        data = UriHandler.open(url)
+        self.assertEqual(data, UriHandler.open(url))
+        self.assertEqual(3, self.server.requests)
+        self.assertEqual(2, UriHandler.instance().cacheStore.cacheHits)
+
+        UriHandler.clean_up_cache(0)
+        UriHandler.open(url)
+        self.assertEqual(4, self.server.requests)
+        self.assertEqual(2, UriHandler.instance().cacheStore.cacheHits)
+
+    def test_hits_and_misses(self):
+        # Both cache stores find the same entries.
+        for cache in (StreamCache(os.path.join(self.output_folder, "file")),
+                      SqliteStreamCache(os.path.join(self.output_folder, "sqlite"))):
+            for i in range(20):
+                self.__store(cache, "key{}".format(i), b"x" * 2048, b"{}")
+
+            for i in range(20):
+                entry = cache.get_entry("key{}.body".format(i), "key{}.meta".format(i))
+                self.assertEqual(b"x" * 2048, entry.body.read())
+                self.assertIsNone(cache.get_entry("miss{}.body".format(i), "miss{}.meta".format(i)))
+            cache.close()
+
+    def __store(self, cache, key, body, meta):
+        with cache.set("{}.body".format(key)) as fp:
+            fp.write(body)
+        with cache.set("{}.meta".format(key)) as fp:
+            fp.write(meta)
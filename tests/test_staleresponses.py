@@ -0,0 +1,120 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+from urllib.parse import quote
+
+import requests
+
+from resources.lib.connectivity.cachehttpadapter import CacheHTTPAdapter
+from resources.lib.connectivity.streamcache import StreamCache
+from resources.lib.urihandler import UriHandler
+from tests.benchmarks.localserver import LocalServer, LocalServerTestCase
+
+
+class TestStaleResponses(LocalServerTestCase):
+    def test_stale_while_revalidate(self):
+        UriHandler.create_uri_handler(cache_dir=self.output_folder)
+        url = self.__get_url("max-age=0, stale-while-revalidate=60", delay=0.5)
+        data = UriHandler.open(url)
+        self.assertEqual([self.__get_path(url)], self.server.paths)
+
+        # The stale response is returned, and refreshed in the background.
+        self.assertEqual(data, UriHandler.open(url))
+        self.__wait_for_refreshes()
+        self.assertEqual([self.__get_path(url)] * 2, self.server.paths)
+        self.assertNotEqual(data, UriHandler.open(url))
+        self.assertEqual(2, self.server.requests)
+
+    def test_background_refresh(self):
+        UriHandler.create_uri_handler(cache_dir=self.output_folder)
+        url = "{}/listing?max-age=0&delay=0.5".format(self.server.url)
+        data = UriHandler.open(url)
+        self.assertEqual(["/listing?max-age=0&delay=0.5"], self.server.paths)
+
+        # The expired response is returned, and refreshed in the background.
+        self.assertEqual(data, UriHandler.open(url, background_refresh=True))
+        self.__wait_for_refreshes()
+        self.assertEqual(["/listing?max-age=0&delay=0.5"] * 2, self.server.paths)
+        self.assertNotEqual(data, UriHandler.open(url, background_refresh=True))
+
+    def test_close_waits_for_refreshes(self):
+        UriHandler.create_uri_handler(cache_dir=self.output_folder)
+        url = "{}/listing?max-age=0&delay=0.5".format(self.server.url)
+        data = UriHandler.open(url)
+        self.assertEqual(data, UriHandler.open(url, background_refresh=True))
+
+        # The refresh is finished and stored before the cache store is closed.
+        UriHandler.instance().close()
+        self.assertEqual(2, self.server.requests)
+        UriHandler._UriHandler__handler = None
+        UriHandler.create_uri_handler(cache_dir=self.output_folder)
+        self.assertNotEqual(data, UriHandler.open(url, background_refresh=True))
+        self.assertTrue(UriHandler.instance().cacheStore.cacheHits)
+
+    def test_expired_without_policy(self):
+        UriHandler.create_uri_handler(cache_dir=self.output_folder)
+        url = "{}/listing?max-age=0".format(self.server.url)
+        data = UriHandler.open(url)
+        self.assertNotEqual(data, UriHandler.open(url))
+        self.assertEqual(2, self.server.requests)
+
+    def test_stale_if_error_on_server_error(self):
+        UriHandler.create_uri_handler(cache_dir=self.output_folder)
+        url = self.__get_url("max-age=0, stale-if-error=60")
+        data = UriHandler.open(url)
+
+        self.server.forced_status = 503
+        self.assertEqual(data, UriHandler.open(url))
+        self.assertEqual(200, UriHandler.instance().status.code)
+        self.assertEqual(2, self.server.requests)
+
+    def test_stale_if_error_on_network_error(self):
+        UriHandler.create_uri_handler(cache_dir=self.output_folder)
+        server = LocalServer(use_tls=False).start()
+        url = "{}/listing?cache-control={}".format(
+            server.url, quote("max-age=0, stale-if-error=60"))
+        data = UriHandler.open(url)
+        server.stop()
+
+        # Use a new handler, the pooled connection would still be served.
+        UriHandler.instance().close()
+        UriHandler._UriHandler__handler = None
+        UriHandler.create_uri_handler(cache_dir=self.output_folder)
+        self.assertEqual(data, UriHandler.open(url))
+        self.assertFalse(UriHandler.instance().status.error)
+
+    def test_stale_if_error_window(self):
+        UriHandler.create_uri_handler(cache_dir=self.output_folder)
+        url = self.__get_url("max-age=0, stale-if-error=0")
+        UriHandler.open(url)
+
+        self.server.forced_status = 503
+        UriHandler.open(url)
+        self.assertEqual(503, UriHandler.instance().status.code)
+
+    def test_bounded_refresh_queue(self):
+        adapter = CacheHTTPAdapter(StreamCache(self.output_folder), max_pending_refreshes=1)
+        session = requests.Session()
+        session.mount("http://", adapter)
+
+        urls = ["{}/item{}?max-age=0&delay=0.5".format(self.server.url, i) for i in range(3)]
+        for url in urls:
+            session.get(url)
+
+        adapter.set_request_options(background_refresh=True)
+        for url in urls:
+            session.get(url)
+        adapter.wait_for_refreshes()
+        session.close()
+
+        # The first refresh blocks the worker, the second one is queued and the third is dropped.
+        self.assertLessEqual(self.server.requests, len(urls) + 2)
+
+    def __get_url(self, cache_control, delay=0):
+        return "{}/listing?cache-control={}&delay={}".format(
+            self.server.url, quote(cache_control), delay)
+
+    def __get_path(self, url):
+        return url[len(self.server.url):]
+
+    def __wait_for_refreshes(self):
+        UriHandler.instance().wait_for_refreshes()
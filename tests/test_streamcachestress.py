@@ -0,0 +1,261 @@
+# SPDX-License-Identifier: GPL-3.0-or-later
+
+import hashlib
+import multiprocessing
+import random
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from resources.lib.connectivity.sqlitestreamcache import SqliteStreamCache
+from resources.lib.connectivity.streamcache import StreamCache
+from resources.lib.logger import Logger
+
+# A small set of keys, so the threads and processes overlap.
+KEYS = ["{}.body".format(i) for i in range(4)]
+THREADS = 4
+PROCESSES = 3
+ITERATIONS = 150
+
+
+def hammer_process(store_class, cache_path, seed, results):
+    """ Hammers a cache store from multiple threads within a new process.
+
+    :param type store_class:                    The cache store class to use.
+    :param str cache_path:                      The path of the cache.
+    :param int seed:                            The seed for the random values.
+    :param multiprocessing.Queue results:       The queue for the (errors, reads, writes) result.
+
+    """
+
+    store = store_class(cache_path)
+    results.put(hammer_threads(store, seed))
+
+
+def hammer_entries_process(store_class, cache_path, seed, results):
+    """ Writes and reads the body and meta data of entries from multiple threads within a new
+    process.
+
+    :param type store_class:                    The cache store class to use.
+    :param str cache_path:                      The path of the cache.
+    :param int seed:                            The seed for the random values.
+    :param multiprocessing.Queue results:       The queue for the (errors, reads, writes) result.
+
+    """
+
+    store = store_class(cache_path)
+    results.put(hammer_threads(store, seed, hammer_entries))
+
+
+def hammer_threads(store, seed, target=None):
+    """ Hammers a cache store from multiple threads.
+
+    :param StreamCache|SqliteStreamCache store:     The cache store to use.
+    :param int seed:                                The seed for the random values.
+    :param target:                                  The method that hammers the store from a
+                                                    single thread (`hammer` by default).
+
+    :return: The number of torn (invalid) reads, the number of reads and writes.
+    :rtype: tuple[int,int,int]
+
+    """
+
+    target = target or hammer
+    totals = [0, 0, 0]
+    lock = threading.Lock()
+
+    def __hammer(thread_seed):
+        result = target(store, thread_seed)
+        with lock:
+            for i, value in enumerate(result):
+                totals[i] += value
+
+    threads = [threading.Thread(target=__hammer, args=(seed * 100 + i,)) for i in range(THREADS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return tuple(totals)
+
+
+def hammer(store, seed):
+    """ Randomly writes and reads self-validating values to and from overlapping keys.
+
+    :param StreamCache|SqliteStreamCache store:     The cache store to use.
+    :param int seed:                                The seed for the random values.
+
+    :return: The number of torn (invalid) reads, the number of reads and writes.
+    :rtype: tuple[int,int,int]
+
+    """
+
+    rnd = random.Random(seed)
+    errors = reads = writes = 0
+    for _ in range(ITERATIONS):
+        key = rnd.choice(KEYS)
+        if rnd.random() < 0.5:
+            body = bytes([rnd.randint(0, 255)]) * rnd.randint(1, 64 * 1024)
+            with store.set(key) as fp:
+                # Write in parts to give readers a chance to see partial values.
+                fp.write(hashlib.md5(body).digest())
+                fp.write(body[:len(body) // 2])
+                time.sleep(0)
+                fp.write(body[len(body) // 2:])
+            writes += 1
+            continue
+
+        try:
+            value = store.get(key).read()
+        except (OSError, KeyError):
+            # Not written yet
+            continue
+
+        reads += 1
+        if hashlib.md5(value[16:]).digest() != value[:16]:
+            errors += 1
+    return errors, reads, writes
+
+
+def hammer_entries(store, seed):
+    """ Randomly writes and reads entries with a body and the checksum of the body as meta data,
+    with overlapping keys.
+
+    :param StreamCache|SqliteStreamCache store:     The cache store to use.
+    :param int seed:                                The seed for the random values.
+
+    :return: The number of torn (mismatching) reads, the number of reads and writes.
+    :rtype: tuple[int,int,int]
+
+    """
+
+    rnd = random.Random(seed)
+    errors = reads = writes = 0
+    for _ in range(ITERATIONS):
+        key = rnd.choice(KEYS).rsplit(".", 1)[0]
+        body_key, meta_key = "{}.body".format(key), "{}.meta".format(key)
+        if rnd.random() < 0.5:
+            body = bytes([rnd.randint(0, 255)]) * rnd.randint(1, 16 * 1024)
+            body_fp, meta_fp = store.set(body_key), store.set(meta_key)
+            body_fp.write(body)
+            meta_fp.write(hashlib.md5(body).digest())
+            with store.lock_entry(meta_key):
+                store.store_entry(body_fp, meta_fp)
+            writes += 1
+            continue
+
+        entry = store.get_entry(body_key, meta_key)
+        if entry is None:
+            # Not written yet
+            continue
+
+        reads += 1
+        if hashlib.md5(entry.body.read()).digest() != entry.meta.read():
+            errors += 1
+    return errors, reads, writes
+
+
+class TestStreamCacheStress(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        Logger.create_logger(None, str(cls), min_log_level=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        Logger.instance().close_log()
+
+    def setUp(self):
+        self.output_folder = tempfile.mkdtemp(prefix="retro_test_")
+
+    def tearDown(self):
+        shutil.rmtree(self.output_folder)
+
+    def test_file_cache_threads(self):
+        store = StreamCache(self.output_folder)
+        errors, reads, writes = hammer_threads(store, 1)
+        Logger.info("%s: %s reads and %s writes", store, reads, writes)
+        self.assertEqual(0, errors)
+        self.assertGreater(reads, 0)
+
+    def test_file_cache_processes(self):
+        self.__test_processes(StreamCache)
+
+    def test_sqlite_cache_processes(self):
+        self.__test_processes(SqliteStreamCache)
+
+    def test_entries_not_torn(self):
+        for store_class in (StreamCache, SqliteStreamCache):
+            store = store_class(self.output_folder)
+            errors = []
+
+            def __write(seed):
+                rnd = random.Random(seed)
+                for _ in range(ITERATIONS):
+                    body = bytes([rnd.randint(0, 255)]) * rnd.randint(1, 16 * 1024)
+                    body_fp, meta_fp = store.set("entry.body"), store.set("entry.meta")
+                    body_fp.write(body)
+                    meta_fp.write(hashlib.md5(body).digest())
+                    with store.lock_entry("entry.meta"):
+                        store.store_entry(body_fp, meta_fp)
+
+            def __read():
+                for _ in range(ITERATIONS * 2):
+                    entry = store.get_entry("entry.body", "entry.meta")
+                    if entry is not None and hashlib.md5(entry.body.read()).digest() != entry.meta.read():
+                        errors.append(entry)
+
+            threads = [threading.Thread(target=__write, args=(i, )) for i in range(THREADS)]
+            threads += [threading.Thread(target=__read) for _ in range(THREADS)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+            # The body and meta data of an entry always belong together.
+            self.assertEqual(0, len(errors), store_class.__name__)
+            store.close()
+
+    def test_sqlite_cache_entries_processes(self):
+        # The body and meta data of an entry always belong together, also across processes.
+        self.__test_processes(SqliteStreamCache, hammer_entries_process)
+
+    def test_no_partial_writes_published(self):
+        for store_class in (StreamCache, SqliteStreamCache):
+            store = store_class(self.output_folder)
+            with store.set(KEYS[0]) as fp:
+                fp.write(b"complete")
+
+            with self.assertRaises(ValueError):
+                with store.set(KEYS[0]) as fp:
+                    fp.write(b"partial")
+                    raise ValueError()
+
+            self.assertEqual(b"complete", store.get(KEYS[0]).read(), store_class.__name__)
+            store.close()
+
+    def __test_processes(self, store_class, target=hammer_process):
+        # Make sure the store exists before the processes start.
+        store_class(self.output_folder)
+
+        context = multiprocessing.get_context("spawn")
+        results = context.Queue()
+        processes = [
+            context.Process(target=target,
+                            args=(store_class, self.output_folder, seed, results))
+            for seed in range(PROCESSES)
+        ]
+        start = time.perf_counter()
+        for p in processes:
+            p.start()
+        totals = [results.get(timeout=120) for _ in processes]
+        for p in processes:
+            p.join()
+
+        errors, reads, writes = (sum(values) for values in zip(*totals))
+        Logger.info("%s: %s processes with %s threads did %s reads and %s writes in %.2fs",
+                    store_class.__name__, PROCESSES, THREADS, reads, writes,
+                    time.perf_counter() - start)
+        self.assertEqual([0] * PROCESSES, [p.exitcode for p in processes])
+        self.assertEqual(0, errors)
+        self.assertGreater(reads, 0)
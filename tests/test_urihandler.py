@@ -111,6 +111,20 @@ class TestUriHandler(unittest.TestCase):
         self.assertEqual(['httpbingo.org'], data_object["headers"]["Host"])
         self.assertEqual(200, UriHandler.instance().status.code)
 
+    def test_open_many(self):
+        UriHandler.create_uri_handler()
+
+        urls = [self.base_url + "/get?index={}".format(i) for i in range(4)]
+        urls.append(self.base_url + "/status/404")
+        results = UriHandler.open_many(urls, max_workers=3)
+        self.assertEqual(5, len(results))
+        for i in range(4):
+            data_object = json.loads(results[i].data)
+            self.assertEqual([str(i)], data_object["args"]["index"])
+            self.assertEqual(200, results[i].status.code)
+        self.assertEqual(404, results[4].status.code)
+        self.assertTrue(results[4].status.error)
+
     def test_gzip(self):
         UriHandler.create_uri_handler()
 